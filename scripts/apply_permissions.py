@@ -11,13 +11,517 @@ Usage:
     apply_permissions.py --validate ~/.claude/settings.json
 """
 
+import os
+import re
 import json
 import sys
+import gzip
+import time
+import base64
+import hashlib
+import random
+import difflib
 import argparse
+import tempfile
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Set, Tuple, Optional
-import shutil
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Set, Tuple, Optional
+
+from rule_patterns import RuleIndex, normalize_pattern, parse_rule, rule_covers
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes stay atomic, but are not serialized
+    fcntl = None
+
+
+def stage_file(path: Path, content: bytes, durable: bool = False) -> str:
+    """
+    Write content to a temporary file beside path, ready to be renamed over it.
+
+    The temporary file gets the mode of the file it will replace (mkstemp
+    creates 0600), or the umask default for a new file.
+
+    Args:
+        path: File the content is meant for
+        content: File content
+        durable: Flush the content to disk before returning
+
+    Returns:
+        Name of the temporary file
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return tmp_name
+
+
+def sync_directory(directory: Path):
+    """Flush a directory's entries (renames into it) to disk, where supported."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_bytes_atomic(path: Path, content: bytes, durable: bool = False):
+    """
+    Replace a file through a temporary file and rename.
+
+    Readers see either the old or the new content, never a partly
+    written file.
+
+    Args:
+        path: File to write
+        content: File content
+        durable: Also flush the content and the rename to disk, so a crash
+            leaves either the old or the new file
+    """
+    tmp_name = stage_file(path, content, durable)
+    try:
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    if durable:
+        sync_directory(path.parent)
+
+
+class BackupStore:
+    """
+    Content-addressed store of settings file snapshots.
+
+    Each distinct file content is kept once, gzip-compressed, under
+    objects/<sha256[:2]>/<sha256>.gz; an index maps every settings file
+    to its snapshots (id, time, hash, size), newest last. A snapshot whose
+    content equals the file's latest one is not recorded again, and one
+    equal to any older content only adds an index entry.
+
+    Snapshots are whole files, not deltas: every new version costs its
+    full compressed size, O(file) rather than O(change). Settings files
+    are a few KB, so this is traded for restores that read one object.
+
+    Retention keeps the newest KEEP snapshots of each file and drops those
+    older than MAX_AGE_DAYS (the newest one always stays, and imported
+    legacy copies are only dropped by count); objects no snapshot refers
+    to any more are deleted.
+
+    Backups made by earlier versions (settings.<timestamp>.backup copies
+    beside the file) are imported as snapshots by import_legacy; the
+    copies themselves are left in place.
+    """
+
+    INDEX = 'index.json'
+    VERSION = 1
+
+    LEGACY_FORMAT = '%Y%m%d_%H%M%S'
+
+    KEEP = 50
+    MAX_AGE_DAYS = 90
+
+    def __init__(self, directory: Path):
+        """
+        Initialize backup store.
+
+        Args:
+            directory: Store location
+        """
+        self.directory = directory
+        self.index_path = directory / self.INDEX
+        self.files: Dict[str, List[Dict]] = {}
+        self.imported: Dict[str, List[str]] = {}
+        self.next_id = 1
+
+    @classmethod
+    def for_settings(cls, settings_path: Path) -> 'BackupStore':
+        """
+        Store holding the backups of a settings file.
+
+        Files in a .claude directory use its backups/ subdirectory; others
+        (~/.claude.json) use the .claude/backups/ directory beside them.
+        """
+        parent = settings_path.absolute().parent
+        if parent.name != '.claude':
+            parent = parent / '.claude'
+        return cls(parent / 'backups')
+
+    @staticmethod
+    def key(settings_path: Path) -> str:
+        """Index key of a settings file."""
+        return str(settings_path.resolve())
+
+    def object_path(self, digest: str) -> Path:
+        """Location of the compressed content with the given hash."""
+        return self.directory / 'objects' / digest[:2] / f'{digest}.gz'
+
+    def load(self):
+        """Load the index, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if isinstance(data, dict) and data.get('version') == self.VERSION:
+            self.files = data.get('files', {})
+            self.imported = data.get('imported', {})
+            self.next_id = data.get('next_id', 1)
+
+    def save(self):
+        """Write the index."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {
+            'version': self.VERSION,
+            'next_id': self.next_id,
+            'files': self.files,
+            'imported': self.imported,
+        }
+        write_bytes_atomic(self.index_path, json.dumps(data, indent=1).encode())
+
+    def snapshots(self, settings_path: Path) -> List[Dict]:
+        """Snapshots of a settings file, oldest first."""
+        return self.files.get(self.key(settings_path), [])
+
+    def add(self, settings_path: Path, content: bytes) -> Tuple[Dict, bool]:
+        """
+        Record a snapshot of a settings file's content.
+
+        Args:
+            settings_path: Settings file the content belongs to
+            content: File content
+
+        Returns:
+            Tuple of (snapshot, created); created is False when the content
+            equals the file's latest snapshot, which is returned instead
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        snapshots = self.files.setdefault(self.key(settings_path), [])
+        if snapshots and snapshots[-1]['hash'] == digest:
+            return (snapshots[-1], False)
+
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # mtime=0 keeps the compressed bytes a function of the content
+            write_bytes_atomic(path, gzip.compress(content, mtime=0))
+
+        snapshot = {
+            'id': self.next_id,
+            'time': datetime.now().astimezone().isoformat(timespec='microseconds'),
+            'hash': digest,
+            'size': len(content),
+        }
+        self.next_id += 1
+        snapshots.append(snapshot)
+        return (snapshot, True)
+
+    @classmethod
+    def legacy_backups(cls, settings_path: Path) -> List[Tuple[Path, datetime]]:
+        """Backup copies of a settings file made by earlier versions, oldest first."""
+        pattern = re.compile(rf'{re.escape(settings_path.stem)}\.(\d{{8}}_\d{{6}})\.backup')
+        try:
+            entries = list(os.scandir(settings_path.parent))
+        except OSError:
+            return []
+
+        backups = []
+        for entry in entries:
+            match = pattern.fullmatch(entry.name)
+            if match and entry.is_file():
+                try:
+                    stamp = datetime.strptime(match.group(1), cls.LEGACY_FORMAT).astimezone()
+                except ValueError:
+                    continue
+                backups.append((Path(entry.path), stamp))
+
+        backups.sort(key=lambda backup: backup[1])
+        return backups
+
+    def import_legacy(self, settings_path: Path) -> int:
+        """
+        Record a settings file's legacy backup copies as snapshots.
+
+        Each copy is imported once, at the time in its name; snapshots stay
+        ordered by time, so an old copy never becomes the 'latest' one.
+
+        Args:
+            settings_path: Settings file whose copies to import
+
+        Returns:
+            Number of snapshots added
+        """
+        key = self.key(settings_path)
+        imported = self.imported.setdefault(key, [])
+        added = 0
+        for path, stamp in self.legacy_backups(settings_path):
+            if path.name in imported:
+                continue
+            try:
+                content = path.read_bytes()
+            except OSError:
+                continue
+
+            digest = hashlib.sha256(content).hexdigest()
+            object_path = self.object_path(digest)
+            if not object_path.exists():
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                write_bytes_atomic(object_path, gzip.compress(content, mtime=0))
+
+            self.files.setdefault(key, []).append({
+                'id': self.next_id,
+                'time': stamp.isoformat(timespec='microseconds'),
+                'hash': digest,
+                'size': len(content),
+                'legacy': path.name,
+            })
+            self.next_id += 1
+            imported.append(path.name)
+            added += 1
+
+        if added:
+            self.files[key].sort(key=lambda snapshot: datetime.fromisoformat(snapshot['time']))
+        elif not imported:
+            del self.imported[key]
+        return added
+
+    def read(self, digest: str) -> bytes:
+        """
+        Content of a snapshot.
+
+        Raises:
+            OSError: If the object is missing or unreadable
+            ValueError: If it does not match its hash
+        """
+        with open(self.object_path(digest), 'rb') as f:
+            content = gzip.decompress(f.read())
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise ValueError(f"Backup object {digest[:12]} is corrupt")
+        return content
+
+    def prune(self, keep: Optional[int] = None, max_age_days: Optional[float] = None) -> int:
+        """
+        Apply the retention policy to every file in the index.
+
+        Args:
+            keep: Snapshots kept per file (default: KEEP)
+            max_age_days: Age after which snapshots are dropped (default: MAX_AGE_DAYS)
+
+        Returns:
+            Number of snapshots removed
+        """
+        keep = self.KEEP if keep is None else keep
+        max_age_days = self.MAX_AGE_DAYS if max_age_days is None else max_age_days
+        cutoff = datetime.now().astimezone() - timedelta(days=max_age_days)
+
+        removed = 0
+        for key, snapshots in list(self.files.items()):
+            kept = snapshots[-max(1, keep):]
+            kept = [
+                snapshot for snapshot in kept[:-1]
+                if snapshot.get('legacy') or datetime.fromisoformat(snapshot['time']) >= cutoff
+            ] + kept[-1:]
+            removed += len(snapshots) - len(kept)
+            if kept:
+                self.files[key] = kept
+            else:
+                del self.files[key]
+
+        if removed:
+            self._collect_objects()
+        return removed
+
+    def _collect_objects(self):
+        """Delete objects no snapshot refers to."""
+        referenced = {snapshot['hash'] for snapshots in self.files.values() for snapshot in snapshots}
+        objects = self.directory / 'objects'
+        try:
+            buckets = list(os.scandir(objects))
+        except OSError:
+            return
+
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.gz') and entry.name[:-3] not in referenced:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+
+
+class TransactionJournal:
+    """
+    Record of a multi-file apply being committed.
+
+    Written and flushed to disk before the first settings file is replaced
+    and removed once the last one is. For every target it holds the
+    original content (None for a new file), the hash of the new content
+    and the staged temporary file, so a transaction interrupted by a crash
+    can be rolled back with PermissionManager.recover_transactions().
+
+    The owning process holds an exclusive lock on a '<id>.lock' file beside
+    the journal for as long as the transaction runs (and records its pid),
+    so recovery only takes over journals whose owner died or gave up.
+    """
+
+    DIRECTORY = Path.home() / '.claude' / 'transactions'
+    VERSION = 1
+
+    def __init__(self, directory: Optional[Path] = None):
+        """
+        Initialize transaction journal.
+
+        Args:
+            directory: Journal location (default: ~/.claude/transactions)
+        """
+        self.directory = directory or self.DIRECTORY
+        self.id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{os.urandom(3).hex()}"
+        self.path = self.directory / f'{self.id}.json'
+        self.lock_file = None
+
+    @staticmethod
+    def entry(target: Path, original: Optional[bytes], content: bytes, staged: str) -> Dict:
+        """Journal entry for one target file."""
+        return {
+            'target': str(target),
+            'original': base64.b64encode(original).decode() if original is not None else None,
+            'hash': hashlib.sha256(content).hexdigest(),
+            'staged': staged,
+        }
+
+    @staticmethod
+    def original(entry: Dict) -> Optional[bytes]:
+        """Original content recorded in an entry."""
+        return base64.b64decode(entry['original']) if entry['original'] is not None else None
+
+    def save(self, entries: List[Dict]):
+        """Write the journal durably, taking ownership of it first."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.lock_file is None:
+            # The lock file is new and unique, so this never waits
+            self.lock_file = self.claim(self.path)
+        data = {
+            'version': self.VERSION,
+            'id': self.id,
+            'pid': os.getpid(),
+            'entries': entries,
+        }
+        write_bytes_atomic(self.path, json.dumps(data).encode(), durable=True)
+
+    def remove(self):
+        """Delete the journal once the transaction is finished."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        self.release()
+
+    def release(self):
+        """Give up ownership; a journal still present can then be recovered."""
+        if self.lock_file is None:
+            return
+        if not self.path.exists():
+            try:
+                self.lock_path(self.path).unlink()
+            except FileNotFoundError:
+                pass
+        self.lock_file.close()
+        self.lock_file = None
+
+    @staticmethod
+    def lock_path(journal_path: Path) -> Path:
+        """Owner lock file of a journal."""
+        return journal_path.with_suffix('.lock')
+
+    @classmethod
+    def claim(cls, journal_path: Path):
+        """
+        Take ownership of a journal without waiting.
+
+        Args:
+            journal_path: Journal file
+
+        Returns:
+            Open lock file (ownership lasts until it is closed), or None if
+            the transaction's process still holds it
+        """
+        lock_file = open(cls.lock_path(journal_path), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    @classmethod
+    def abandoned(cls, journal_path: Path) -> bool:
+        """Whether a journal's owner died or gave up on it (it needs recovery)."""
+        try:
+            lock_file = cls.claim(journal_path)
+        except OSError:
+            return True
+        if lock_file is None:
+            return False
+        lock_file.close()
+        return True
+
+    @classmethod
+    def read(cls, journal_path: Path) -> Optional[Dict]:
+        """Parsed journal, or None if it is gone, unreadable or of another version."""
+        try:
+            data = json.loads(journal_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if isinstance(data, dict) and data.get('version') == cls.VERSION:
+            return data
+        return None
+
+    @classmethod
+    def pending(cls, directory: Optional[Path] = None) -> List[Tuple[Path, List[Dict]]]:
+        """
+        Journals of unfinished transactions, including ones still running.
+
+        Returns:
+            List of (journal_path, entries), oldest first
+        """
+        found = []
+        for path in sorted((directory or cls.DIRECTORY).glob('*.json')):
+            data = cls.read(path)
+            if data is not None:
+                found.append((path, data.get('entries', [])))
+        return found
 
 
 class PermissionManager:
@@ -35,10 +539,88 @@ class PermissionManager:
         'project_local': Path.cwd() / '.claude' / 'settings.local.json'
     }
 
+    # Seconds to wait for another process to release a settings file
+    LOCK_TIMEOUT = 10.0
+
+    # First and longest pause between attempts to take the lock
+    LOCK_BACKOFF = (0.005, 0.1)
+
     def __init__(self):
         self.settings_path: Optional[Path] = None
         self.settings: Dict = {}
 
+        # Settings locks held by this manager: path -> (file, depth)
+        self._locks: Dict[Path, Tuple[object, int]] = {}
+
+    @staticmethod
+    def _target(settings_path: Path) -> Path:
+        """File actually written for a settings path (symlinks followed)."""
+        return settings_path.resolve() if settings_path.is_symlink() else settings_path
+
+    @contextmanager
+    def lock_settings(self, settings_path: Path) -> Iterator[None]:
+        """
+        Hold an exclusive advisory lock on a settings file.
+
+        The lock is taken on a '.<name>.lock' file next to the settings file,
+        which survives the rename done by write_settings. While another
+        process holds it, attempts are retried with exponential backoff.
+        Nested use for the same file from this manager is allowed.
+
+        Args:
+            settings_path: Path to settings file
+
+        Raises:
+            TimeoutError: If the lock is not released within LOCK_TIMEOUT
+        """
+        target = self._target(settings_path)
+        lock_path = target.with_name(f'.{target.name}.lock')
+
+        if target in self._locks:
+            lock_file, depth = self._locks[target]
+            self._locks[target] = (lock_file, depth + 1)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(lock_path, 'a')
+            try:
+                self._acquire(lock_file, lock_path)
+            except BaseException:
+                lock_file.close()
+                raise
+            self._locks[target] = (lock_file, 1)
+
+        try:
+            yield
+        finally:
+            lock_file, depth = self._locks[target]
+            if depth > 1:
+                self._locks[target] = (lock_file, depth - 1)
+            else:
+                del self._locks[target]
+                # Closing the file releases the lock
+                lock_file.close()
+
+    def _acquire(self, lock_file, lock_path: Path):
+        """Take the lock on an open lock file, retrying with backoff."""
+        if fcntl is None:
+            return
+
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        delay, max_delay = self.LOCK_BACKOFF
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                pass
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out waiting for lock on {lock_path}")
+            # Jitter keeps waiting processes from retrying in lockstep
+            time.sleep(min(remaining, delay * random.uniform(0.5, 1.5)))
+            delay = min(delay * 2, max_delay)
+
     def detect_settings_file(self, prefer_global: bool = False) -> Path:
         """
         Detect which settings file to use based on context.
@@ -67,24 +649,219 @@ class PermissionManager:
         global_user.parent.mkdir(parents=True, exist_ok=True)
         return global_user
 
-    def create_backup(self, settings_path: Path) -> Path:
+    def create_backup(self, settings_path: Path, quiet: bool = False) -> Optional[Dict]:
         """
-        Create timestamped backup of settings file.
+        Snapshot settings file into its backup store.
+
+        Unchanged content is not stored again, and old snapshots are pruned
+        according to the store's retention policy.
 
         Args:
             settings_path: Path to settings file
+            quiet: Do not report the snapshot
 
         Returns:
-            Path to backup file
+            Snapshot record (id, time, hash, size), or None if the file
+            does not exist
         """
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = settings_path.with_suffix(f'.{timestamp}.backup')
+        try:
+            content = settings_path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        store = BackupStore.for_settings(settings_path)
+        # The index is shared by all settings files of the directory
+        with self.lock_settings(store.index_path):
+            store.load()
+            snapshot, created = store.add(settings_path, content)
+            if created:
+                store.prune()
+                store.save()
+
+        if quiet:
+            pass
+        elif created:
+            print(f"📁 Backup created: snapshot {snapshot['id']} ({snapshot['hash'][:12]}) in {store.directory}")
+        else:
+            print(f"📁 Backup unchanged: snapshot {snapshot['id']} ({snapshot['hash'][:12]})")
+        return snapshot
 
-        if settings_path.exists():
-            shutil.copy2(settings_path, backup_path)
-            print(f"📁 Backup created: {backup_path}")
+    def open_backups(self, settings_path: Path) -> BackupStore:
+        """
+        Load the backup store of a settings file.
+
+        Legacy settings.<timestamp>.backup copies not yet in the store are
+        imported first, so they can be listed, compared and restored like
+        any other snapshot.
+
+        Args:
+            settings_path: Path to settings file
+
+        Returns:
+            Loaded backup store
+        """
+        store = BackupStore.for_settings(settings_path)
+        if not BackupStore.legacy_backups(settings_path):
+            store.load()
+            return store
+
+        try:
+            with self.lock_settings(store.index_path):
+                store.load()
+                if store.import_legacy(settings_path):
+                    store.save()
+        except (TimeoutError, OSError) as e:
+            print(f"⚠️  Could not import legacy backups: {e}", file=sys.stderr)
+            store = BackupStore.for_settings(settings_path)
+            store.load()
+        return store
+
+    def list_backups(self, settings_path: Path) -> List[Dict]:
+        """
+        Snapshots of a settings file, oldest first.
+
+        Read from the backup store's index (see open_backups); snapshots
+        whose content equals the current file are marked 'current'.
+
+        Args:
+            settings_path: Path to settings file
+
+        Returns:
+            Snapshot records (id, time, hash, size, current; legacy names
+            the copy an imported snapshot came from)
+        """
+        store = self.open_backups(settings_path)
+
+        try:
+            current = hashlib.sha256(settings_path.read_bytes()).hexdigest()
+        except OSError:
+            current = None
+
+        return [
+            {**snapshot, 'current': snapshot['hash'] == current}
+            for snapshot in store.snapshots(settings_path)
+        ]
+
+    def find_backup(self, settings_path: Path, ref: str) -> Tuple[BackupStore, Dict]:
+        """
+        Look up a snapshot of a settings file.
+
+        Args:
+            settings_path: Path to settings file
+            ref: Snapshot id, 'latest', or a prefix of at least 4 characters
+                of the snapshot's hash
+
+        Returns:
+            Tuple of (store, snapshot)
+
+        Raises:
+            LookupError: If no snapshot, or more than one, matches
+        """
+        store = self.open_backups(settings_path)
+        snapshots = store.snapshots(settings_path)
+
+        if ref == 'latest':
+            matches = snapshots[-1:]
+        elif ref.isdigit():
+            matches = [snapshot for snapshot in snapshots if snapshot['id'] == int(ref)]
+        elif len(ref) >= 4:
+            matches = [snapshot for snapshot in snapshots if snapshot['hash'].startswith(ref.lower())]
+            # The same content can be snapshotted more than once
+            matches = list({snapshot['hash']: snapshot for snapshot in matches}.values())
+        else:
+            matches = []
+
+        if not matches:
+            raise LookupError(f"No backup '{ref}' of {settings_path}")
+        if len(matches) > 1:
+            raise LookupError(f"Backup '{ref}' is ambiguous: matches {len(matches)} snapshots")
+        return (store, matches[-1])
 
-        return backup_path
+    def diff_backup(self, settings_path: Path, ref: str) -> Tuple[str, Dict[str, Tuple[List[str], List[str]]]]:
+        """
+        Compare a snapshot with the current settings file.
+
+        Args:
+            settings_path: Path to settings file
+            ref: Snapshot reference (see find_backup)
+
+        Returns:
+            Tuple of (unified diff from snapshot to current file, rule
+            changes); rule changes map 'allowedTools' and 'deny' to the
+            rules (added, removed) since the snapshot
+
+        Raises:
+            LookupError: If the snapshot does not exist
+            OSError, ValueError: If its content cannot be read
+        """
+        store, snapshot = self.find_backup(settings_path, ref)
+        old = store.read(snapshot['hash']).decode()
+        try:
+            new = settings_path.read_text()
+        except FileNotFoundError:
+            new = ''
+
+        diff = ''.join(difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            fromfile=f"backup {snapshot['id']} ({snapshot['time']})",
+            tofile=str(settings_path),
+        ))
+
+        def rules(text: str, key: str) -> List[str]:
+            try:
+                return json.loads(text).get('permissions', {}).get(key, [])
+            except (ValueError, AttributeError):
+                return []
+
+        changes = {}
+        for key in ('allowedTools', 'deny'):
+            before, after = rules(old, key), rules(new, key)
+            before_set, after_set = set(before), set(after)
+            changes[key] = (
+                [rule for rule in after if rule not in before_set],
+                [rule for rule in before if rule not in after_set],
+            )
+        return (diff, changes)
+
+    def restore_backup(self, settings_path: Path, ref: str, create_backup: bool = True) -> bool:
+        """
+        Restore a settings file from a snapshot.
+
+        The snapshot's content is validated and written back byte for byte
+        through the atomic write path, under the file's lock. The current
+        content is snapshotted first, so a restore can itself be undone.
+
+        Args:
+            settings_path: Path to settings file
+            ref: Snapshot reference (see find_backup)
+            create_backup: Whether to snapshot the current content first
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            with self.lock_settings(settings_path):
+                store, snapshot = self.find_backup(settings_path, ref)
+                content = store.read(snapshot['hash'])
+
+                errors = self.validate_settings(json.loads(content))
+                if errors:
+                    print(f"❌ Backup {snapshot['id']} is not valid:")
+                    for error in errors:
+                        print(f"   - {error}")
+                    return False
+
+                if create_backup:
+                    self.create_backup(settings_path)
+                write_bytes_atomic(self._target(settings_path), content, durable=True)
+        except (LookupError, TimeoutError, OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return False
+
+        print(f"✅ Restored {settings_path} from backup {snapshot['id']} ({snapshot['time']})")
+        print("\n⚠️  Note: Restart Claude Code for changes to take effect.")
+        return True
 
     def read_settings(self, settings_path: Path) -> Dict:
         """
@@ -112,14 +889,17 @@ class PermissionManager:
         """
         Write settings to file with proper formatting.
 
+        The settings are written to a temporary file in the same directory,
+        flushed to disk and renamed over the original, under the file's
+        lock. Readers see either the old or the new settings, never a
+        partly written file, and a crash leaves the old file in place.
+
         Args:
             settings_path: Path to settings file
             settings: Settings dictionary
         """
-        settings_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(settings_path, 'w') as f:
-            json.dump(settings, f, indent=2)
+        with self.lock_settings(settings_path):
+            write_bytes_atomic(self._target(settings_path), json.dumps(settings, indent=2).encode(), durable=True)
 
         print(f"✅ Settings written to: {settings_path}")
 
@@ -189,6 +969,36 @@ class PermissionManager:
 
         return errors
 
+    @staticmethod
+    def canonical_rule(rule: str) -> str:
+        """
+        Normalize how a permission rule is written, without changing what it matches.
+
+        Surrounding whitespace is dropped from the tool, and an empty
+        pattern ('Bash()') becomes the bare tool name. The pattern is
+        rewritten by normalize_pattern in rule_patterns.py, the same
+        function the decision engine compiles patterns with, so
+        'Bash(npm  "test")' is 'Bash(npm test)' and 'Read(./src/**)' is
+        'Read(src/**)'.
+
+        Args:
+            rule: Permission rule string
+
+        Returns:
+            Canonical rule string (the stripped input if it is not a
+            'Tool' or 'Tool(pattern)' rule)
+        """
+        rule = rule.strip()
+        if '(' not in rule:
+            return rule
+        if not rule.endswith(')'):
+            return rule
+
+        tool, pattern = rule[:-1].split('(', 1)
+        tool = tool.strip()
+        pattern = normalize_pattern(tool, pattern)
+        return f"{tool}({pattern})" if pattern else tool
+
     def merge_permissions(
         self,
         existing: List[str],
@@ -198,27 +1008,92 @@ class PermissionManager:
         """
         Merge new permissions with existing ones.
 
+        New rules are added in canonical form, and skipped when an existing
+        rule (or one added before them) already matches everything they do,
+        e.g. 'Bash(git status )' next to 'Bash(git status)' or 'Bash(git *)'.
+        Existing rules are kept as written; a new rule added by this merge
+        is dropped again if a later, broader one covers it.
+
         Args:
             existing: Existing permission rules
             new: New permission rules to add
-            remove_duplicates: Whether to remove duplicate rules
+            remove_duplicates: Whether to skip duplicate and covered rules
 
         Returns:
             Merged list of permissions
         """
-        if remove_duplicates:
-            # Use set to remove duplicates while preserving order
-            seen = set(existing)
-            merged = list(existing)
+        if not remove_duplicates:
+            return existing + new
+
+        merged = list(existing)
+        index = RuleIndex([self.canonical_rule(rule) for rule in existing])
+        seen = set(index.rules)
+
+        # Rules added by this merge, as (rule, tool, pattern); few enough
+        # to compare directly
+        added: List[Tuple[str, str, str]] = []
+
+        for rule in new:
+            canonical = self.canonical_rule(rule)
+            if canonical in seen:
+                continue
+
+            tool, pattern = parse_rule(canonical)
+            if index.covering(tool, pattern):
+                continue
+            if any(other_tool == tool and rule_covers(tool, other, pattern) for _, other_tool, other in added):
+                continue
+
+            # A broader new rule replaces narrower ones added before it
+            narrower = {
+                other_rule for other_rule, other_tool, other in added
+                if other_tool == tool and rule_covers(tool, pattern, other)
+            }
+            if narrower:
+                merged = [other for other in merged if other not in narrower]
+                added = [entry for entry in added if entry[0] not in narrower]
+                seen -= narrower
 
-            for rule in new:
-                if rule not in seen:
-                    merged.append(rule)
-                    seen.add(rule)
+            merged.append(canonical)
+            seen.add(canonical)
+            added.append((canonical, tool, pattern))
 
-            return merged
-        else:
-            return existing + new
+        return merged
+
+    def merge_settings(self, settings: Dict, allow_rules: List[str], deny_rules: List[str]) -> Dict:
+        """
+        Merge rules into a settings dictionary.
+
+        Args:
+            settings: Settings dictionary (modified in place)
+            allow_rules: Permission rules to allow
+            deny_rules: Permission rules to deny
+
+        Returns:
+            The updated settings
+        """
+        # Ensure permissions structure exists
+        if 'permissions' not in settings:
+            settings['permissions'] = {}
+        if 'allowedTools' not in settings['permissions']:
+            settings['permissions']['allowedTools'] = []
+        if 'deny' not in settings['permissions']:
+            settings['permissions']['deny'] = []
+
+        # Merge new permissions
+        if allow_rules:
+            settings['permissions']['allowedTools'] = self.merge_permissions(
+                settings['permissions']['allowedTools'],
+                allow_rules
+            )
+
+        if deny_rules:
+            settings['permissions']['deny'] = self.merge_permissions(
+                settings['permissions']['deny'],
+                deny_rules
+            )
+
+        return settings
 
     def add_permissions(
         self,
@@ -256,33 +1131,36 @@ class PermissionManager:
                 print(f"❌ Validation error: {error}")
                 return False
 
+        # Read, merge and write under the lock, so concurrent sessions
+        # adding rules to the same file do not lose each other's changes
+        try:
+            with self.lock_settings(settings_path):
+                return self._add_locked(allow_rules, deny_rules, settings_path, create_backup)
+        except TimeoutError as e:
+            print(f"❌ {e}")
+            return False
+
+    def _add_locked(
+        self,
+        allow_rules: List[str],
+        deny_rules: List[str],
+        settings_path: Path,
+        create_backup: bool
+    ) -> bool:
+        """Read-modify-write part of add_permissions; caller holds the lock."""
         # Create backup if requested
         if create_backup:
             self.create_backup(settings_path)
 
-        # Read existing settings
+        # Read existing settings and merge new permissions
         settings = self.read_settings(settings_path)
-
-        # Ensure permissions structure exists
-        if 'permissions' not in settings:
-            settings['permissions'] = {}
-        if 'allowedTools' not in settings['permissions']:
-            settings['permissions']['allowedTools'] = []
-        if 'deny' not in settings['permissions']:
-            settings['permissions']['deny'] = []
-
-        # Merge new permissions
-        if allow_rules:
-            settings['permissions']['allowedTools'] = self.merge_permissions(
-                settings['permissions']['allowedTools'],
-                allow_rules
-            )
-
-        if deny_rules:
-            settings['permissions']['deny'] = self.merge_permissions(
-                settings['permissions']['deny'],
-                deny_rules
-            )
+        counts = {
+            key: len(settings.get('permissions', {}).get(key, []))
+            for key in ('allowedTools', 'deny')
+        }
+        settings = self.merge_settings(settings, allow_rules, deny_rules)
+        added_allow = settings['permissions']['allowedTools'][counts['allowedTools']:]
+        added_deny = settings['permissions']['deny'][counts['deny']:]
 
         # Validate complete settings
         errors = self.validate_settings(settings)
@@ -296,23 +1174,301 @@ class PermissionManager:
         self.write_settings(settings_path, settings)
 
         # Report what was added
-        print(f"\n🔧 Added {len(allow_rules)} allow rule(s)")
-        print(f"🛡️  Added {len(deny_rules)} deny rule(s)")
+        skipped = len(allow_rules) + len(deny_rules) - len(added_allow) - len(added_deny)
+        print(f"\n🔧 Added {len(added_allow)} allow rule(s)")
+        print(f"🛡️  Added {len(added_deny)} deny rule(s)")
+        if skipped:
+            print(f"♻️  Skipped {skipped} rule(s) already covered by existing ones")
 
-        if allow_rules:
+        if added_allow:
             print("\n✅ Allowed:")
-            for rule in allow_rules:
+            for rule in added_allow:
                 print(f"   - {rule}")
 
-        if deny_rules:
+        if added_deny:
             print("\n🚫 Denied:")
-            for rule in deny_rules:
+            for rule in added_deny:
                 print(f"   - {rule}")
 
         print("\n⚠️  Note: Restart Claude Code for changes to take effect.")
 
         return True
 
+    def apply_transaction(
+        self,
+        targets: List[Path],
+        allow_rules: List[str] = None,
+        deny_rules: List[str] = None,
+        create_backup: bool = True,
+        workers: int = 1,
+        use_cache: bool = True,
+        journal_dir: Optional[Path] = None,
+        strict: bool = False
+    ) -> bool:
+        """
+        Add permissions to several settings files as one transaction.
+
+        All targets are locked, their merged settings staged to temporary
+        files beside them and validated in parallel with validate_config.
+        Only if every file passes are they renamed into place, with a
+        journal on disk for the duration; if a rename fails, the files
+        already replaced get their original content back.
+
+        Args:
+            targets: Settings files to update
+            allow_rules: List of permission rules to allow
+            deny_rules: List of permission rules to deny
+            create_backup: Whether to snapshot each file before replacing it
+            workers: Processes validating the staged files
+            use_cache: Reuse and record results in the ValidationCache
+            journal_dir: Journal location (default: ~/.claude/transactions)
+            strict: Also reject allow/deny conflicts; by default they pass,
+                as deny rules take precedence and profiles rely on that
+
+        Returns:
+            True if every file was updated, False if none was
+        """
+        allow_rules = allow_rules or []
+        deny_rules = deny_rules or []
+
+        for rule in allow_rules + deny_rules:
+            is_valid, error = self.validate_permission_rule(rule)
+            if not is_valid:
+                print(f"❌ Validation error: {error}")
+                return False
+
+        # Locks are taken in a fixed order, so transactions over
+        # overlapping sets of files cannot deadlock
+        files = sorted({self._target(Path(path).absolute()) for path in targets}, key=str)
+        try:
+            with ExitStack() as locks:
+                for path in files:
+                    locks.enter_context(self.lock_settings(path))
+                return self._apply_locked(
+                    files, allow_rules, deny_rules, create_backup, workers, use_cache, journal_dir, strict
+                )
+        except TimeoutError as e:
+            print(f"❌ {e}")
+            return False
+
+    def _apply_locked(
+        self,
+        files: List[Path],
+        allow_rules: List[str],
+        deny_rules: List[str],
+        create_backup: bool,
+        workers: int,
+        use_cache: bool,
+        journal_dir: Optional[Path],
+        strict: bool
+    ) -> bool:
+        """Stage, validate and commit part of apply_transaction; caller holds the locks."""
+        start = time.perf_counter()
+        entries: List[Dict] = []
+
+        # Stage: merged content next to each target, not yet in place
+        for path in files:
+            try:
+                try:
+                    original = path.read_bytes()
+                    settings = json.loads(original)
+                    before = json.loads(original)
+                except FileNotFoundError:
+                    original = None
+                    settings = self.read_settings(path)
+                    before = None
+                if not isinstance(settings, dict):
+                    raise ValueError("expected a JSON object")
+
+                settings = self.merge_settings(settings, allow_rules, deny_rules)
+                if settings == before:
+                    continue
+
+                errors = self.validate_settings(settings)
+                if errors:
+                    raise ValueError('; '.join(errors))
+
+                content = json.dumps(settings, indent=2).encode()
+                entries.append(TransactionJournal.entry(path, original, content, stage_file(path, content, True)))
+            except (OSError, ValueError) as e:
+                self._discard(entries)
+                print(f"❌ Cannot stage {path}: {e}")
+                return False
+        staged_at = time.perf_counter()
+
+        # Validate: the staged files are checked exactly as they will be written
+        workers = max(1, min(workers, len(entries)))
+        if entries:
+            from validate_config import iter_validate
+
+            targets = {entry['staged']: entry['target'] for entry in entries}
+            invalid = []
+            for record in iter_validate([Path(entry['staged']) for entry in entries], workers, use_cache):
+                errors = [
+                    error for error in record['errors']
+                    if strict or not error.startswith('Conflict: ')
+                ]
+                if errors:
+                    invalid.append((targets[record['file']], errors))
+            if invalid:
+                self._discard(entries)
+                print(f"❌ {len(invalid)} file(s) failed validation, nothing was changed:")
+                for target, errors in sorted(invalid):
+                    print(f"   - {target}: {'; '.join(errors)}")
+                return False
+        validated_at = time.perf_counter()
+
+        # Commit: journal first, then rename every staged file into place
+        journal = TransactionJournal(journal_dir)
+        if entries:
+            try:
+                if create_backup:
+                    for entry in entries:
+                        self.create_backup(Path(entry['target']), quiet=True)
+                journal.save(entries)
+            except (OSError, TimeoutError) as e:
+                self._discard(entries)
+                journal.remove()
+                print(f"❌ Cannot prepare commit: {e}")
+                return False
+
+        committed: List[Dict] = []
+        try:
+            for entry in entries:
+                os.replace(entry['staged'], entry['target'])
+                committed.append(entry)
+            for directory in {Path(entry['target']).parent for entry in entries}:
+                sync_directory(directory)
+        except OSError as e:
+            print(f"❌ Commit failed at {entries[len(committed)]['target']}: {e}")
+            self._discard(entries[len(committed):])
+            if self._rollback(committed):
+                journal.remove()
+                print(f"↩️  Rolled back {len(committed)} file(s); nothing was changed")
+            else:
+                journal.release()
+                print(f"⚠️  Rollback incomplete; run with --recover to finish it (journal: {journal.path})")
+            return False
+
+        journal.remove()
+        elapsed = time.perf_counter() - start
+
+        print(f"✅ Updated {len(entries)} of {len(files)} file(s) ({len(files) - len(entries)} already up to date)")
+        print(f"🔧 {len(allow_rules)} allow rule(s), 🛡️  {len(deny_rules)} deny rule(s)")
+        rate = len(files) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"📊 {len(files)} file(s) in {elapsed:.2f}s ({rate:.1f}/s): "
+            f"staged {staged_at - start:.2f}s, validated {validated_at - staged_at:.2f}s "
+            f"({workers} workers), committed {time.perf_counter() - validated_at:.2f}s"
+        )
+        print("\n⚠️  Note: Restart Claude Code for changes to take effect.")
+        return True
+
+    @staticmethod
+    def _discard(entries: List[Dict]):
+        """Delete staged files that were not renamed into place."""
+        for entry in entries:
+            try:
+                os.unlink(entry['staged'])
+            except OSError:
+                pass
+
+    @staticmethod
+    def _rollback(entries: List[Dict]) -> bool:
+        """Put the original content back into replaced files; False if any could not be."""
+        ok = True
+        for entry in reversed(entries):
+            target = Path(entry['target'])
+            original = TransactionJournal.original(entry)
+            try:
+                if original is None:
+                    target.unlink()
+                else:
+                    write_bytes_atomic(target, original, durable=True)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"❌ Cannot roll back {target}: {e}")
+                ok = False
+        return ok
+
+    def recover_transactions(self, journal_dir: Optional[Path] = None) -> int:
+        """
+        Roll back transactions interrupted while committing.
+
+        Only journals whose owning process died or gave up are taken over;
+        a transaction still running is left alone. Files still holding the
+        transaction's new content get their original content back; files
+        changed since are left alone.
+
+        Args:
+            journal_dir: Journal location (default: ~/.claude/transactions)
+
+        Returns:
+            Number of files rolled back
+        """
+        restored = 0
+        for journal_path, entries in TransactionJournal.pending(journal_dir):
+            owner = TransactionJournal.claim(journal_path)
+            if owner is None:
+                print(f"⏳ Skipping {journal_path.stem}: its transaction is still running")
+                continue
+            try:
+                count = self._recover_claimed(journal_path, entries)
+            except TimeoutError as e:
+                print(f"⚠️  Skipping {journal_path.stem}: {e}")
+                count = None
+            finally:
+                if not journal_path.exists():
+                    try:
+                        TransactionJournal.lock_path(journal_path).unlink()
+                    except FileNotFoundError:
+                        pass
+                owner.close()
+            restored += count or 0
+
+        return restored
+
+    def _recover_claimed(self, journal_path: Path, entries: List[Dict]) -> Optional[int]:
+        """
+        Roll back one journal the caller has claimed.
+
+        Returns:
+            Files restored, or None if the journal was already finished or
+            could not be fully rolled back
+        """
+        files = sorted({Path(entry['target']) for entry in entries}, key=str)
+
+        with ExitStack() as locks:
+            for path in files:
+                locks.enter_context(self.lock_settings(path))
+
+            # The owner may have finished between listing and claiming:
+            # only a journal still present under the locks is acted on
+            data = TransactionJournal.read(journal_path)
+            if data is None:
+                return None
+            entries = data.get('entries', [])
+            self._discard(entries)
+
+            replaced = []
+            for entry in entries:
+                try:
+                    current = hashlib.sha256(Path(entry['target']).read_bytes()).hexdigest()
+                except OSError:
+                    continue
+                if current == entry['hash']:
+                    replaced.append(entry)
+
+            if not self._rollback(replaced):
+                print(f"⚠️  Could not fully roll back {journal_path.name}; it is kept for another attempt")
+                return None
+
+            journal_path.unlink()
+
+        print(f"↩️  Rolled back {journal_path.stem}: {len(replaced)} of {len(entries)} file(s) restored")
+        return len(replaced)
+
     def load_profile(self, profile_name: str) -> Tuple[List[str], List[str]]:
         """
         Load permission profile from assets.
@@ -341,6 +1497,21 @@ class PermissionManager:
         return (profile.get('allowedTools', []), profile.get('deny', []))
 
 
+# --layer names and the CONFIG_LOCATIONS they refer to
+LAYERS = {
+    'global': 'global_user',
+    'project': 'project',
+    'local': 'project_local',
+}
+
+
+def settings_target(path: Path) -> Path:
+    """Settings file a transaction target refers to: a file, or a repository directory."""
+    if path.is_dir():
+        return path / '.claude' / 'settings.json'
+    return path
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Manage Claude Code permissions',
@@ -364,6 +1535,15 @@ Examples:
 
   # Use global settings instead of project
   %(prog)s --global --add "Read"
+
+  # List backups, compare one with the current settings, restore it
+  %(prog)s --list-backups
+  %(prog)s --diff 12
+  %(prog)s --restore 12
+
+  # Apply a profile to several layers, or to many repositories, all or nothing
+  %(prog)s --profile development --layer global --layer project --layer local
+  %(prog)s --profile ci-cd --targets-from repos.txt --workers 8
         """
     )
 
@@ -414,10 +1594,75 @@ Examples:
         help='Validate settings file without modifying it'
     )
 
+    parser.add_argument(
+        '--list-backups',
+        action='store_true',
+        help='List backups of the settings file'
+    )
+
+    parser.add_argument(
+        '--diff',
+        metavar='BACKUP',
+        help="Show changes from a backup (id, hash prefix or 'latest') to the current settings"
+    )
+
+    parser.add_argument(
+        '--restore',
+        metavar='BACKUP',
+        help="Restore the settings file from a backup (id, hash prefix or 'latest')"
+    )
+
+    parser.add_argument(
+        '--target',
+        action='append',
+        metavar='PATH',
+        help='Settings file, or repository directory (its .claude/settings.json), '
+             'to update in one transaction (can be used multiple times)'
+    )
+
+    parser.add_argument(
+        '--layer',
+        action='append',
+        choices=sorted(LAYERS),
+        help='Settings layer to update in one transaction (can be used multiple times)'
+    )
+
+    parser.add_argument(
+        '--targets-from',
+        metavar='FILE',
+        type=Path,
+        help="Read transaction targets from FILE, one per line ('-' for stdin)"
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar='N',
+        help='Transactions: number of validation processes (default: CPU count)'
+    )
+
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        help='Transactions: also reject files with allow/deny conflicts'
+    )
+
+    parser.add_argument(
+        '--recover',
+        action='store_true',
+        help='Roll back transactions interrupted by a crash'
+    )
+
     args = parser.parse_args()
 
     manager = PermissionManager()
 
+    if args.recover:
+        restored = manager.recover_transactions()
+        print(f"✅ Recovery complete: {restored} file(s) restored")
+        return 0
+
     # Handle validation mode
     if args.validate:
         if not args.validate.exists():
@@ -436,6 +1681,44 @@ Examples:
             print(f"✅ {args.validate} is valid")
             return 0
 
+    # Handle backup commands
+    if args.list_backups or args.diff or args.restore:
+        settings_path = args.settings
+        if settings_path is None:
+            settings_path = manager.detect_settings_file(prefer_global=args.use_global)
+
+        if args.restore:
+            success = manager.restore_backup(settings_path, args.restore, create_backup=not args.no_backup)
+            return 0 if success else 1
+
+        if args.diff:
+            try:
+                diff, changes = manager.diff_backup(settings_path, args.diff)
+            except (LookupError, OSError, ValueError) as e:
+                print(f"❌ {e}")
+                return 1
+
+            print(diff or f"✅ {settings_path} is identical to backup {args.diff}")
+            for key, label in (('allowedTools', 'allow'), ('deny', 'deny')):
+                added, removed = changes[key]
+                if added or removed:
+                    print(f"🔧 {label}: +{len(added)} -{len(removed)} rule(s) since the backup")
+            return 0
+
+        backups = manager.list_backups(settings_path)
+        if not backups:
+            print(f"📁 No backups of {settings_path}")
+            return 0
+
+        print(f"📁 Backups of {settings_path} (newest first):")
+        for backup in reversed(backups):
+            marker = '  ← current' if backup['current'] else ''
+            if backup.get('legacy'):
+                marker = f"  ({backup['legacy']}){marker}"
+            stamp = backup['time'][:19].replace('T', ' ')
+            print(f"   {backup['id']:>5}  {stamp}  {backup['hash'][:12]}  {backup['size']:>7} bytes{marker}")
+        return 0
+
     # Collect rules to add
     allow_rules = args.add or []
     deny_rules = args.deny or []
@@ -452,6 +1735,35 @@ Examples:
         parser.print_help()
         return 1
 
+    # Transactional apply across several files
+    targets = [manager.CONFIG_LOCATIONS[LAYERS[layer]] for layer in args.layer or []]
+    specs = list(args.target or [])
+    if args.targets_from:
+        try:
+            lines = sys.stdin.readlines() if str(args.targets_from) == '-' else \
+                args.targets_from.read_text().splitlines()
+        except OSError as e:
+            print(f"❌ Cannot read targets: {e}")
+            return 1
+        specs.extend(line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#'))
+    targets.extend(settings_target(Path(spec).expanduser()) for spec in specs)
+
+    if targets:
+        # Journals of transactions still running elsewhere do not block this one
+        if any(TransactionJournal.abandoned(path) for path, _ in TransactionJournal.pending()):
+            print("⚠️  An earlier transaction was interrupted; run with --recover to roll it back")
+            return 1
+
+        success = manager.apply_transaction(
+            targets,
+            allow_rules=allow_rules,
+            deny_rules=deny_rules,
+            create_backup=not args.no_backup,
+            workers=max(1, args.workers),
+            strict=args.strict
+        )
+        return 0 if success else 1
+
     # Determine settings file
     settings_path = args.settings
     if settings_path is None:
@@ -0,0 +1,1084 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks for Claude Code Permissions Scripts
+
+Times the optimized code paths against the straightforward implementations
+they replaced, so regressions show up as numbers rather than anecdotes.
+
+Usage:
+    benchmark.py detect [directory] [--repeat N] [--jobs N] [--git-index]
+    benchmark.py conflicts [--rules N] [--verify N] [--repeat N]
+    benchmark.py security [--rules N] [--patterns N] [--repeat N]
+    benchmark.py evaluate [--rules N] [--queries N] [--verify N] [--repeat N]
+    benchmark.py hook [--rules N] [--calls N] [--spawn N] [--budget-ms MS]
+    benchmark.py daemon [--rules N] [--queries N] [--spawn N]
+    benchmark.py redundancy [--rules N] [--verify N] [--repeat N]
+    benchmark.py writes [--processes N] [--writes N] [--legacy]
+    benchmark.py backups [--applications N] [--rules N]
+    benchmark.py transaction [--repos N] [--rules N] [--workers N]
+    benchmark.py merge [--rules N] [--applications N] [--queries N]
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import shutil
+import subprocess
+import contextlib
+import multiprocessing
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from collections import Counter
+
+from apply_permissions import BackupStore, PermissionManager
+from detect_project import ProjectDetector
+from validate_config import PermissionValidator
+from permission_client import connect, query
+from permission_engine import PermissionEngine, escapes_project, normalize_path, split_command
+from permission_hook import RuleSetCache, decide
+from rule_patterns import (
+    PATH_TOOLS, AhoCorasick, RuleIndex, command_words, compile_pattern, normalize_command, parse_rule,
+    patterns_overlap, pattern_covers, rule_covers
+)
+
+
+def time_call(func: Callable, repeat: int) -> Tuple[float, object]:
+    """
+    Run a callable several times and keep the best wall-clock time.
+
+    Args:
+        func: Zero-argument callable to time
+        repeat: Number of runs
+
+    Returns:
+        Tuple of (best_seconds, last_result)
+    """
+    best = float('inf')
+    result = None
+
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return (best, result)
+
+
+def legacy_detect(directory: Path, max_depth: int = 3) -> Tuple[Dict[str, List[str]], Counter, int]:
+    """
+    Indicator and extension detection as done before the scandir walker.
+
+    One exists()/glob() per indicator, then a pathlib walk with an
+    is_dir()/is_file() stat per entry.
+
+    Returns:
+        Tuple of (indicator_matches, extension_counts, filesystem_calls)
+    """
+    calls = 0
+    found = {}
+
+    for project_type, indicators in ProjectDetector.INDICATORS.items():
+        matches = []
+        for indicator in indicators:
+            calls += 1
+            if '*' in indicator:
+                matches.extend(p.name for p in directory.glob(indicator))
+            elif (directory / indicator).exists():
+                matches.append(indicator)
+        if matches:
+            found[project_type] = matches
+
+    extensions = Counter()
+
+    def scan_dir(dir_path: Path, depth: int):
+        nonlocal calls
+        if depth > max_depth:
+            return
+
+        try:
+            calls += 1
+            for item in dir_path.iterdir():
+                calls += 1
+                if item.is_dir():
+                    name = item.name
+                    if name.startswith('.') or name in ProjectDetector.SKIP_DIRS:
+                        continue
+                    scan_dir(item, depth + 1)
+                else:
+                    calls += 1
+                    if item.is_file() and item.suffix:
+                        extensions[item.suffix] += 1
+        except PermissionError:
+            pass
+
+    scan_dir(directory, 0)
+    return (found, extensions, calls)
+
+
+def bench_detect(args) -> int:
+    """Compare the legacy two-pass detection with the single-pass scanner."""
+    directory = Path(args.directory).resolve()
+    if not directory.is_dir():
+        print(f"❌ Not a directory: {directory}", file=sys.stderr)
+        return 1
+
+    # The legacy walk knows nothing about .gitignore
+    detector = ProjectDetector(directory, respect_gitignore=False)
+
+    legacy_time, (legacy_ind, legacy_ext, legacy_calls) = time_call(
+        lambda: legacy_detect(directory), args.repeat
+    )
+    scan_time, (scan_ind, scan_ext) = time_call(detector.scan, args.repeat)
+
+    # scandir needs one listing per directory; symlinks are the only
+    # entries that still cost a stat()
+    scan_calls = detector.scan_stats['directories']
+
+    print(f"📁 {directory}")
+    print(f"   Files counted: {sum(scan_ext.values())} in {detector.scan_stats['directories']} directories")
+    print()
+    print(f"   legacy  : {legacy_time * 1000:9.2f} ms  ~{legacy_calls} filesystem calls")
+    print(f"   scandir : {scan_time * 1000:9.2f} ms  ~{scan_calls} filesystem calls")
+    if scan_time > 0:
+        print(f"   speedup : {legacy_time / scan_time:9.2f}x")
+
+    if (legacy_ind, legacy_ext) != (scan_ind, scan_ext):
+        print("❌ Results differ between legacy and scandir paths", file=sys.stderr)
+        return 1
+
+    if args.jobs > 1:
+        parallel = ProjectDetector(directory, jobs=args.jobs, respect_gitignore=False)
+        parallel_time, parallel_result = time_call(parallel.scan, args.repeat)
+        print(f"   {args.jobs:>2} jobs : {parallel_time * 1000:9.2f} ms")
+
+        if parallel_result != (scan_ind, scan_ext):
+            print("❌ Results differ between serial and parallel scans", file=sys.stderr)
+            return 1
+
+    pruned = ProjectDetector(directory)
+    pruned_time, _ = time_call(pruned.scan, args.repeat)
+    print(f"   gitignore: {pruned_time * 1000:7.2f} ms  "
+          f"({pruned.scan_stats['entries']} entries walked, {pruned.scan_stats['ignored']} pruned)")
+
+    if args.git_index:
+        indexed = ProjectDetector(directory, use_git_index=True)
+        index_time, (_, index_ext) = time_call(indexed.scan, args.repeat)
+
+        if 'git_index_entries' not in indexed.scan_stats:
+            print("   git index: not a git worktree, walker used")
+        else:
+            # Counts legitimately differ: the index only lists tracked files
+            print(f"   git index: {index_time * 1000:7.2f} ms  "
+                  f"({sum(index_ext.values())} tracked files counted)")
+
+    print("✅ Results identical")
+    return 0
+
+
+def synthetic_rules(count: int, seed: int) -> List[str]:
+    """
+    Generate a reproducible rule list resembling large enterprise settings.
+
+    Mostly distinct Bash commands and path globs, with a sprinkling of
+    duplicates, bare tool names and broad wildcards so every conflict kind
+    occurs.
+    """
+    rng = random.Random(seed)
+    commands = ['npm run', 'git', 'docker', 'kubectl', 'make', 'pytest', 'cargo', 'go']
+    extensions = ['py', 'ts', 'go', 'rs', 'key', 'pem', 'env', 'json']
+    rules = []
+
+    for _ in range(count):
+        roll = rng.random()
+        n = rng.randrange(count)
+        if roll < 0.001:
+            rules.append(rng.choice(['Bash', 'Read', 'WebSearch']))
+        elif roll < 0.002:
+            rules.append(f"{rng.choice(['Read', 'Write'])}(**/*.{rng.choice(extensions)})")
+        elif roll < 0.45:
+            rules.append(f"Bash({rng.choice(commands)} task-{n}:*)")
+        elif roll < 0.75:
+            rules.append(f"{rng.choice(['Read', 'Write', 'Edit'])}(src/module-{n}/**)")
+        elif roll < 0.95:
+            rules.append(f"{rng.choice(['Read', 'Write'])}(data/file-{n}.{rng.choice(extensions)})")
+        else:
+            rules.append(f"WebFetch(domain:host-{n}.example.com)")
+
+    return rules
+
+
+def legacy_check_conflicts(allow_rules: List[str], deny_rules: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Conflict check as done before rules were indexed: every allow rule
+    against every deny rule, re-parsing the deny rule each time, with the
+    substring test for overlaps.
+
+    Returns:
+        Tuple of (conflicts, warnings)
+    """
+    conflicts = []
+    warnings = []
+
+    def normalize_rule(rule: str) -> Tuple[str, str]:
+        if '(' not in rule:
+            return (rule, '')
+        tool, pattern = rule.split('(', 1)
+        return (tool, pattern.rstrip(')'))
+
+    for allow in allow_rules:
+        allow_tool, allow_pattern = normalize_rule(allow)
+
+        for deny in deny_rules:
+            deny_tool, deny_pattern = normalize_rule(deny)
+
+            if allow_tool == deny_tool:
+                if allow_pattern == deny_pattern:
+                    conflicts.append(f"Exact conflict: '{allow}' is both allowed and denied")
+                elif not allow_pattern or not deny_pattern:
+                    conflicts.append(f"Broad conflict: '{allow}' vs '{deny}'")
+                elif allow_pattern in deny_pattern or deny_pattern in allow_pattern:
+                    warnings.append(f"Potential overlap: '{allow}' and '{deny}' may conflict")
+
+    return (conflicts, warnings)
+
+
+def pairwise_overlaps(allow_rules: List[str], deny_rules: List[str]) -> List[str]:
+    """
+    Overlap warnings from running the automata on every same-tool pair,
+    the reference the pruned candidate search must agree with.
+    """
+    warnings = []
+
+    deny_by_tool = {}
+    for deny in deny_rules:
+        deny_tool, deny_pattern = parse_rule(deny)
+        if deny_pattern:
+            deny_by_tool.setdefault(deny_tool, []).append((deny, deny_pattern))
+
+    for allow in allow_rules:
+        allow_tool, allow_pattern = parse_rule(allow)
+        if not allow_pattern:
+            continue
+
+        for deny, deny_pattern in deny_by_tool.get(allow_tool, []):
+            if deny_pattern == allow_pattern:
+                continue
+
+            example = patterns_overlap(allow_tool, allow_pattern, deny_pattern)
+            if example is None:
+                continue
+
+            if pattern_covers(allow_tool, deny_pattern, allow_pattern):
+                warnings.append(
+                    f"Allow rule '{allow}' has no effect: everything it matches is denied by '{deny}'"
+                )
+            else:
+                warnings.append(f"Potential overlap: '{allow}' and '{deny}' both match '{example}'")
+
+    return warnings
+
+
+def indexed_check_conflicts(allow_rules: List[str], deny_rules: List[str]) -> Tuple[List[str], List[str]]:
+    """Run PermissionValidator.check_conflicts, returning (conflicts, warnings)."""
+    validator = PermissionValidator()
+    conflicts = validator.check_conflicts(allow_rules, deny_rules)
+    return (conflicts, validator.warnings)
+
+
+def bench_conflicts(args) -> int:
+    """Compare all-pairs conflict checking with the indexed check."""
+    allow_rules = synthetic_rules(args.rules, seed=1)
+    deny_rules = synthetic_rules(args.rules, seed=2)
+
+    # The all-pairs check is too slow to run in full at 10k x 10k; time a
+    # slice of the allow rules and scale up
+    sample = allow_rules[:max(1, min(args.rules, args.verify))]
+    legacy_time, _ = time_call(lambda: legacy_check_conflicts(sample, deny_rules), 1)
+    legacy_estimate = legacy_time * len(allow_rules) / len(sample)
+
+    indexed_time, (conflicts, warnings) = time_call(
+        lambda: indexed_check_conflicts(allow_rules, deny_rules), args.repeat
+    )
+
+    print(f"📋 {len(allow_rules)} allow x {len(deny_rules)} deny rules")
+    print(f"   Conflicts: {len(conflicts)}, overlap warnings: {len(warnings)}")
+    print()
+    print(f"   all pairs: {legacy_estimate * 1000:10.2f} ms"
+          f"{'  (extrapolated)' if len(sample) < len(allow_rules) else ''}")
+    print(f"   indexed  : {indexed_time * 1000:10.2f} ms")
+    if indexed_time > 0:
+        print(f"   speedup  : {legacy_estimate / indexed_time:10.2f}x")
+
+    # On a smaller set the all-pairs checks can finish: conflicts must be
+    # identical to the legacy check, overlaps identical to running the
+    # automata on every pair (the substring test was only a heuristic)
+    verify_allow = allow_rules[:args.verify]
+    verify_deny = deny_rules[:args.verify]
+    legacy_conflicts, legacy_warnings = legacy_check_conflicts(verify_allow, verify_deny)
+    verify_conflicts, verify_warnings = indexed_check_conflicts(verify_allow, verify_deny)
+
+    if legacy_conflicts != verify_conflicts:
+        print(f"❌ Conflicts differ on {args.verify} x {args.verify} rules", file=sys.stderr)
+        return 1
+    if pairwise_overlaps(verify_allow, verify_deny) != verify_warnings:
+        print(f"❌ Overlaps differ from the all-pairs automaton check on {args.verify} x {args.verify} rules",
+              file=sys.stderr)
+        return 1
+
+    print(f"✅ Results identical on {len(verify_allow)} x {len(verify_deny)} rules "
+          f"({len(legacy_warnings)} substring vs {len(verify_warnings)} automaton overlap warnings)")
+    return 0
+
+
+def bench_security(args) -> int:
+    """Compare per-keyword substring searches with one Aho-Corasick pass per rule."""
+    rules = [rule.lower() for rule in synthetic_rules(args.rules, seed=3)]
+
+    rng = random.Random(4)
+    keywords = [pattern.lower() for pattern in PermissionValidator.SENSITIVE_PATTERNS]
+    keywords += [cmd.lower() for cmd in PermissionValidator.DANGEROUS_COMMANDS]
+    while len(keywords) < args.patterns:
+        keywords.append(f"{rng.choice(['deploy', 'secret', 'purge', 'wipe'])}-{rng.randrange(100000)}")
+
+    def substring_scan():
+        return [{position for position, keyword in enumerate(keywords) if keyword in rule} for rule in rules]
+
+    scanner = AhoCorasick(keywords)
+
+    def automaton_scan():
+        return [scanner.find_all(rule) for rule in rules]
+
+    legacy_time, legacy_hits = time_call(substring_scan, args.repeat)
+    scan_time, scan_hits = time_call(automaton_scan, args.repeat)
+
+    print(f"🔎 {len(rules)} rules x {len(keywords)} security keywords")
+    print(f"   Hits: {sum(map(len, scan_hits))}")
+    print()
+    print(f"   substring     : {legacy_time * 1000:9.2f} ms")
+    print(f"   aho-corasick  : {scan_time * 1000:9.2f} ms")
+    if scan_time > 0:
+        print(f"   speedup       : {legacy_time / scan_time:9.2f}x")
+
+    if legacy_hits != scan_hits:
+        print("❌ Results differ between substring and automaton scans", file=sys.stderr)
+        return 1
+
+    print("✅ Results identical")
+    return 0
+
+
+def synthetic_calls(rules: List[str], count: int, seed: int) -> List[Tuple[str, str]]:
+    """
+    Generate tool calls against a rule list: roughly half derived from a
+    rule (so they usually match something), the rest arbitrary.
+    """
+    rng = random.Random(seed)
+    calls = []
+
+    for _ in range(count):
+        if rng.random() < 0.5:
+            tool, pattern = parse_rule(rng.choice(rules))
+            argument = pattern.replace(':*', ' --verbose').replace('**', 'lib/main.py').replace('*', 'x')
+        else:
+            tool = rng.choice(['Bash', 'Read', 'Write', 'Edit', 'WebFetch'])
+            argument = rng.choice([
+                f"npm run task-{rng.randrange(100000)}",
+                f"npm run task-{rng.randrange(100000)} && rm -rf build",
+                f"npm  run 'task-{rng.randrange(100000)}'",
+                f"src/../data/file-{rng.randrange(100000)}.json",
+                f"src/other-{rng.randrange(100000)}/main.py",
+                f"data/file-{rng.randrange(100000)}.json",
+                f"domain:host-{rng.randrange(100000)}.example.com",
+            ])
+        calls.append((tool, argument))
+
+    return calls
+
+
+def linear_match(rules: List[str], tool: str, argument: str):
+    """First rule of the list matching a single argument, testing each in turn."""
+    for rule in rules:
+        rule_tool, pattern = parse_rule(rule)
+        if rule_tool == tool and (not pattern.strip() or compile_pattern(tool, pattern).matches(argument)):
+            return rule
+    return None
+
+
+def linear_exact(rules: List[str], tool: str, argument: str, broad: bool = True):
+    """First rule of the list naming exactly an argument (or, if broad, the whole tool)."""
+    for rule in rules:
+        rule_tool, pattern = parse_rule(rule)
+        if rule_tool != tool:
+            continue
+        if not pattern.strip():
+            if broad:
+                return rule
+        elif compile_pattern(tool, pattern).literal and compile_pattern(tool, pattern).source == argument:
+            return rule
+    return None
+
+
+def linear_evaluate(allow_rules: List[str], deny_rules: List[str], tool: str, argument: str):
+    """Decide a tool call by testing every rule in turn (deny list first)."""
+    segments = split_command(argument) if tool == 'Bash' and argument else []
+    if segments:
+        words = [(' '.join(parts), static) for parts, static in map(command_words, segments)]
+        whole = normalize_command(argument)
+        for text in [argument, whole] + segments + [text for text, _ in words]:
+            rule = linear_match(deny_rules, tool, text)
+            if rule is not None:
+                return ('deny', rule)
+        if len(segments) > 1:
+            rule = linear_exact(allow_rules, tool, whole, broad=False)
+            if rule is not None:
+                return ('allow', rule)
+        rules = [
+            linear_match(allow_rules, tool, text) if static else linear_exact(allow_rules, tool, text)
+            for text, static in words
+        ]
+        return ('ask', None) if None in rules else ('allow', rules[0])
+
+    if argument and tool in PATH_TOOLS:
+        argument = normalize_path(argument)
+    rule = linear_match(deny_rules, tool, argument)
+    if rule is not None:
+        return ('deny', rule)
+    if argument and tool in PATH_TOOLS and escapes_project(argument):
+        return ('ask', None)
+    rule = linear_match(allow_rules, tool, argument)
+    return ('ask', None) if rule is None else ('allow', rule)
+
+
+# Respellings of 'npm publish' / 'git push' the shell runs as those commands
+EVASIONS = [
+    'npm  publish', 'npm\tpublish', 'npm "publish"', "npm 'publish'", 'npm pub\\lish',
+    'git  push', 'git "push" origin', 'npm test && npm  publish', 'echo $(npm "publish")',
+]
+
+# Commands whose words are only known once the shell expands them
+EXPANSIONS = ['npm $CMD', 'npm $(echo publish)', 'npm pub{lish,}', "npm $'publish'", 'git `echo push`']
+
+
+def bench_evaluate(args) -> int:
+    """Compare rule-by-rule evaluation with the compiled decision engine."""
+    allow_rules = synthetic_rules(args.rules, seed=5)
+    deny_rules = synthetic_rules(args.rules // 10, seed=6)
+    calls = synthetic_calls(allow_rules + deny_rules, args.queries, seed=7)
+
+    compile_time, engine = time_call(lambda: PermissionEngine(allow_rules, deny_rules), 1)
+
+    def compiled():
+        evaluate = engine.evaluate
+        return [evaluate(tool, argument) for tool, argument in calls]
+
+    engine_time, decisions = time_call(compiled, args.repeat)
+
+    # Rule-by-rule evaluation is slow at this size; time a slice and scale up
+    sample = calls[:max(1, min(len(calls), args.verify))]
+    linear_time, expected = time_call(
+        lambda: [linear_evaluate(allow_rules, deny_rules, tool, argument) for tool, argument in sample], 1
+    )
+    linear_per_call = linear_time / len(sample)
+    engine_per_call = engine_time / len(calls)
+
+    counts = Counter(decision for decision, _ in decisions)
+    print(f"⚖️  {len(allow_rules)} allow / {len(deny_rules)} deny rules, {len(calls)} tool calls")
+    print(f"   Decisions: {counts['allow']} allow, {counts['deny']} deny, {counts['ask']} ask")
+    print(f"   Compile  : {compile_time * 1000:10.2f} ms")
+    print()
+    print(f"   rule by rule: {linear_per_call * 1e6:10.2f} µs/call")
+    print(f"   compiled    : {engine_per_call * 1e6:10.2f} µs/call "
+          f"({len(calls) / engine_time if engine_time > 0 else 0:,.0f} calls/s)")
+    if engine_per_call > 0:
+        print(f"   speedup     : {linear_per_call / engine_per_call:10.2f}x")
+
+    if decisions[:len(sample)] != expected:
+        print(f"❌ Decisions differ from rule-by-rule evaluation on {len(sample)} calls", file=sys.stderr)
+        return 1
+
+    print(f"✅ Decisions identical on {len(sample)} calls")
+
+    # Spellings of a denied command must not get past the deny list
+    guarded = PermissionEngine(['Bash(npm:*)', 'Bash(git *)'], ['Bash(npm publish:*)', 'Bash(git push:*)'])
+    evasions = [
+        command for command in EVASIONS
+        if guarded.evaluate('Bash', command)[0] != 'deny'
+    ] + [
+        command for command in EXPANSIONS
+        if guarded.evaluate('Bash', command)[0] == 'allow'
+    ]
+    if evasions:
+        print(f"❌ Deny rules evaded by: {', '.join(map(repr, evasions))}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {len(EVASIONS)} respellings denied, {len(EXPANSIONS)} expansions not allowed")
+    return 0
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Value below which the given fraction of the (non-empty) values fall."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_hook(args) -> int:
+    """Measure PreToolUse hook latency, in process and as a spawned command."""
+    allow_rules = synthetic_rules(args.rules, seed=8)
+    deny_rules = synthetic_rules(args.rules // 10, seed=9)
+    calls = synthetic_calls(allow_rules + deny_rules, args.calls, seed=10)
+    hook = Path(__file__).parent / 'permission_hook.py'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Path(tmp) / 'settings.json'
+        settings.write_text(json.dumps({'permissions': {'allowedTools': allow_rules, 'deny': deny_rules}}))
+        cache_dir = Path(tmp) / 'cache'
+        sources = [settings]
+
+        def event(tool: str, argument: str) -> Dict:
+            key = {'Bash': 'command', 'WebFetch': 'url'}.get(tool, 'file_path')
+            if tool == 'WebFetch':
+                argument = f"https://{argument[len('domain:'):]}/"
+            return {'hook_event_name': 'PreToolUse', 'cwd': tmp, 'tool_name': tool, 'tool_input': {key: argument}}
+
+        events = [event(tool, argument) for tool, argument in calls]
+
+        cold_time, _ = time_call(lambda: decide(events[0], sources, cache_dir), 1)
+
+        # The hook process runs without cyclic garbage collection
+        gc.disable()
+        warm = []
+        for item in events:
+            start = time.perf_counter()
+            decide(item, sources, cache_dir)
+            warm.append(time.perf_counter() - start)
+        gc.enable()
+
+        uncached = []
+        for item in events[:args.spawn]:
+            start = time.perf_counter()
+            decide(item, sources, cache_dir, use_cache=False)
+            uncached.append(time.perf_counter() - start)
+
+        spawned = []
+        for item in events[:args.spawn]:
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, str(hook), '--settings', str(settings), '--cache-dir', str(cache_dir)],
+                input=json.dumps(item), capture_output=True, text=True, check=True
+            )
+            spawned.append(time.perf_counter() - start)
+
+        cache_size = RuleSetCache(sources, cache_dir).path.stat().st_size
+
+    def row(label: str, values: List[float]):
+        print(f"   {label:<22}: p50 {percentile(values, 0.5) * 1000:8.3f} ms   "
+              f"p99 {percentile(values, 0.99) * 1000:8.3f} ms   ({len(values)} calls)")
+
+    print(f"🪝 {len(allow_rules)} allow / {len(deny_rules)} deny rules "
+          f"(compiled rule set: {cache_size / 1024:.0f} KiB)")
+    print(f"   First call (compile) : {cold_time * 1000:8.3f} ms")
+    print()
+    row('re-parse settings', uncached)
+    row('precompiled', warm)
+    row('spawned hook process', spawned)
+
+    budget = percentile(warm, 0.99) * 1000
+    if budget > args.budget_ms:
+        print(f"❌ In-process p99 {budget:.3f} ms exceeds the {args.budget_ms} ms budget", file=sys.stderr)
+        return 1
+
+    print(f"✅ In-process p99 within the {args.budget_ms} ms budget "
+          f"(the rest of a spawned call is interpreter startup)")
+    return 0
+
+
+def bench_daemon(args) -> int:
+    """Compare spawning the validate/evaluate scripts with querying a running daemon."""
+    scripts = Path(__file__).parent
+    rules = synthetic_rules(args.rules, seed=11)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Path(tmp) / 'settings.json'
+        settings.write_text(json.dumps({'permissions': {'allowedTools': rules, 'deny': ['Bash(rm -rf *)']}}))
+        socket_path = Path(tmp) / 'daemon.sock'
+
+        daemon = subprocess.Popen(
+            [sys.executable, str(scripts / 'permission_daemon.py'), '--socket', str(socket_path), '--no-cache'],
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while (sock := connect(socket_path, 1.0)) is None:
+                if time.monotonic() > deadline or daemon.poll() is not None:
+                    print("❌ Daemon did not start", file=sys.stderr)
+                    return 1
+                time.sleep(0.05)
+            sock.close()
+
+            requests = {
+                'validate': {'command': 'validate', 'file': str(settings)},
+                'evaluate': {'command': 'evaluate', 'tool': 'Bash', 'argument': 'npm test',
+                             'settings': [str(settings)]},
+            }
+            commands = {
+                'validate': [str(scripts / 'validate_config.py'), str(settings), '--no-cache'],
+                'evaluate': [str(scripts / 'permission_engine.py'), str(settings), 'Bash', 'npm test'],
+            }
+
+            results = {}
+            for name, request in requests.items():
+                spawned = []
+                for _ in range(args.spawn):
+                    start = time.perf_counter()
+                    subprocess.run([sys.executable] + commands[name], capture_output=True, check=False)
+                    spawned.append(time.perf_counter() - start)
+
+                queried = []
+                for _ in range(args.queries):
+                    start = time.perf_counter()
+                    response = query(request, socket_path, fallback=False)
+                    queried.append(time.perf_counter() - start)
+                    if not response['ok']:
+                        print(f"❌ Daemon error: {response['error']}", file=sys.stderr)
+                        return 1
+
+                results[name] = (spawned, queried)
+        finally:
+            query({'command': 'stop'}, socket_path, 5.0, fallback=False)
+            daemon.wait(10)
+
+    print(f"🔌 {len(rules)} rules per settings file")
+    print()
+    for name, (spawned, queried) in results.items():
+        print(f"   {name:<9} spawned script: p50 {percentile(spawned, 0.5) * 1000:8.2f} ms   "
+              f"daemon query: p50 {percentile(queried, 0.5) * 1000:7.3f} ms  "
+              f"p99 {percentile(queried, 0.99) * 1000:7.3f} ms")
+    return 0
+
+
+def pairwise_redundant(rules: List[str]) -> Dict[int, int]:
+    """Redundant rules as found by comparing every pair of same-tool rules."""
+    parsed = [parse_rule(rule) for rule in rules]
+    by_tool: Dict[str, List[int]] = {}
+    for position, (tool, _) in enumerate(parsed):
+        by_tool.setdefault(tool, []).append(position)
+
+    covering = {}
+    for position, (tool, pattern) in enumerate(parsed):
+        covering[position] = [
+            other for other in by_tool[tool]
+            if other != position and rule_covers(tool, parsed[other][1], pattern)
+        ]
+
+    redundant = {}
+    for position, others in covering.items():
+        tool, pattern = parsed[position]
+        for other in others:
+            if other < position or not rule_covers(tool, pattern, parsed[other][1]):
+                redundant[position] = other
+                break
+
+    for position in redundant:
+        redundant[position] = next(
+            (other for other in covering[position] if other not in redundant), redundant[position]
+        )
+    return redundant
+
+
+def bench_redundancy(args) -> int:
+    """Compare all-pairs subsumption checks with the indexed redundancy pass."""
+    rules = synthetic_rules(args.rules, seed=12)
+
+    # Coverage decisions are memoized; clear them so every run pays for its own
+    def indexed(subset: List[str]) -> Dict[int, int]:
+        pattern_covers.cache_clear()
+        return PermissionValidator._redundant_rules(RuleIndex(subset))
+
+    def pairs(subset: List[str]) -> Dict[int, int]:
+        pattern_covers.cache_clear()
+        return pairwise_redundant(subset)
+
+    # All pairs is quadratic; time a slice and scale up
+    sample = rules[:max(1, min(len(rules), args.verify))]
+    pairwise_time, expected = time_call(lambda: pairs(sample), 1)
+    pairwise_estimate = pairwise_time * (len(rules) / len(sample)) ** 2
+
+    indexed_time, redundant = time_call(lambda: indexed(rules), args.repeat)
+
+    print(f"♻️  {len(rules)} rules, {len(redundant)} redundant")
+    print()
+    print(f"   all pairs: {pairwise_estimate * 1000:10.2f} ms"
+          f"{'  (extrapolated)' if len(sample) < len(rules) else ''}")
+    print(f"   indexed  : {indexed_time * 1000:10.2f} ms")
+    if indexed_time > 0:
+        print(f"   speedup  : {pairwise_estimate / indexed_time:10.2f}x")
+
+    if indexed(sample) != expected:
+        print(f"❌ Redundant rules differ from the all-pairs check on {len(sample)} rules", file=sys.stderr)
+        return 1
+
+    print(f"✅ Results identical on {len(sample)} rules")
+    return 0
+
+
+def legacy_add(settings_path: Path, rule: str):
+    """Unlocked read-modify-write, rewriting the file in place as before."""
+    settings = {'permissions': {'allowedTools': [], 'deny': []}}
+    if settings_path.exists():
+        with open(settings_path, 'r') as f:
+            settings = json.load(f)
+    settings['permissions']['allowedTools'].append(rule)
+    with open(settings_path, 'w') as f:
+        json.dump(settings, f, indent=2)
+
+
+def _writes_worker(task: Tuple[str, int, int, bool]) -> int:
+    """Add one rule per write to a shared settings file; returns failed writes."""
+    path, worker, writes, legacy = task
+    settings_path = Path(path)
+    manager = PermissionManager()
+    failures = 0
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(writes):
+            rule = f"Bash(job-{worker}-{i})"
+            try:
+                if legacy:
+                    legacy_add(settings_path, rule)
+                elif not manager.add_permissions([rule], settings_path=settings_path, create_backup=False):
+                    failures += 1
+            except (OSError, ValueError):
+                # A torn read of a half-written file
+                failures += 1
+    return failures
+
+
+def bench_writes(args) -> int:
+    """Hammer one settings file with concurrent add_permissions calls from many processes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        settings_path = Path(tmp) / 'settings.json'
+        tasks = [(str(settings_path), worker, args.writes, args.legacy) for worker in range(args.processes)]
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            failures = sum(pool.map(_writes_worker, tasks))
+        elapsed = time.perf_counter() - start
+
+        try:
+            rules = set(json.loads(settings_path.read_text())['permissions']['allowedTools'])
+            corrupt = False
+        except (OSError, ValueError, KeyError):
+            rules, corrupt = set(), True
+        leftovers = [p.name for p in Path(tmp).iterdir() if p.name.endswith('.tmp')]
+
+    expected = {f"Bash(job-{task[1]}-{i})" for task in tasks for i in range(args.writes)}
+    lost = len(expected - rules)
+    total = len(expected)
+
+    print(f"✍️  {args.processes} processes x {args.writes} writes"
+          f" ({'legacy in-place writes' if args.legacy else 'locked atomic writes'})")
+    print()
+    print(f"   elapsed      : {elapsed:8.2f} s  ({total / elapsed:.0f} writes/s)")
+    print(f"   failed writes: {failures:8d}")
+    print(f"   lost rules   : {lost:8d} of {total}")
+    print(f"   final file   : {'corrupt' if corrupt else 'valid JSON'}")
+
+    if corrupt or lost or failures or leftovers:
+        print(f"❌ Concurrent writes lost updates{' (temp files left behind)' if leftovers else ''}",
+              file=sys.stderr)
+        return 1
+
+    print("✅ Every write survived")
+    return 0
+
+
+def directory_usage(directory: Path) -> Tuple[int, int]:
+    """Number of files and their total size below a directory."""
+    files = [path for path in directory.rglob('*') if path.is_file() and not path.name.endswith('.lock')]
+    return (len(files), sum(path.stat().st_size for path in files))
+
+
+def bench_backups(args) -> int:
+    """Compare per-write backup copies with the content-addressed backup store."""
+    with open(Path(__file__).parent.parent / 'assets' / 'permission_profiles.json', 'r') as f:
+        profiles = json.load(f)
+    rng = random.Random(13)
+    base = synthetic_rules(args.rules, seed=13)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = Path(tmp) / 'legacy' / '.claude'
+        store_dir = Path(tmp) / 'store' / '.claude'
+        legacy_dir.mkdir(parents=True)
+        store_dir.mkdir(parents=True)
+        manager = PermissionManager()
+
+        # Profiles get re-applied over and over, so most writes repeat earlier content
+        contents = []
+        for _ in range(args.applications):
+            profile = profiles[rng.choice(sorted(profiles))]
+            settings = {'permissions': {'allowedTools': base + profile.get('allowedTools', []),
+                                        'deny': profile.get('deny', [])}}
+            contents.append(json.dumps(settings, indent=2).encode())
+
+        legacy_path = legacy_dir / 'settings.json'
+        start = time.perf_counter()
+        for i, content in enumerate(contents):
+            legacy_path.write_bytes(content)
+            shutil.copy2(legacy_path, legacy_dir / f'settings.{i:06d}.backup')
+        legacy_time = time.perf_counter() - start
+
+        store_path = store_dir / 'settings.json'
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for content in contents:
+                store_path.write_bytes(content)
+                manager.create_backup(store_path)
+        store_time = time.perf_counter() - start
+
+        legacy_files, legacy_bytes = directory_usage(legacy_dir)
+        store_files, store_bytes = directory_usage(store_dir / 'backups')
+
+        store = BackupStore.for_settings(store_path)
+        store.load()
+        restorable = all(store.read(snapshot['hash']) in contents for snapshot in store.snapshots(store_path))
+
+    print(f"📁 {args.applications} profile applications, {len(contents[0]) // 1024} KB settings file")
+    print()
+    print(f"   copies : {legacy_files - 1:6d} files {legacy_bytes / 1024:10.1f} KB  {legacy_time * 1000:8.1f} ms")
+    print(f"   store  : {store_files:6d} files {store_bytes / 1024:10.1f} KB  {store_time * 1000:8.1f} ms")
+
+    if not restorable:
+        print("❌ A stored snapshot does not match any written content", file=sys.stderr)
+        return 1
+    return 0
+
+
+def bench_transaction(args) -> int:
+    """Apply a profile to many repositories file by file and as one transaction."""
+    manager = PermissionManager()
+    allow_rules, deny_rules = manager.load_profile('development')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        layouts = {}
+        for name in ('sequential', 'transaction'):
+            files = []
+            for repo in range(args.repos):
+                settings_path = Path(tmp) / name / f'repo{repo:04d}' / '.claude' / 'settings.json'
+                settings_path.parent.mkdir(parents=True)
+                rules = synthetic_rules(args.rules, seed=repo)
+                settings_path.write_text(json.dumps({'permissions': {'allowedTools': rules, 'deny': []}}))
+                files.append(settings_path)
+            layouts[name] = files
+
+        # Journals and backup indexes stay inside the scratch directory
+        journal_dir = Path(tmp) / 'journal'
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for settings_path in layouts['sequential']:
+                manager.add_permissions(allow_rules, deny_rules, settings_path=settings_path)
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            ok = manager.apply_transaction(
+                layouts['transaction'], allow_rules, deny_rules,
+                workers=args.workers, use_cache=False, journal_dir=journal_dir
+            )
+            transaction_time = time.perf_counter() - start
+
+        same = all(
+            json.loads(a.read_text()) == json.loads(b.read_text())
+            for a, b in zip(layouts['sequential'], layouts['transaction'])
+        )
+
+    print(f"🚚 development profile applied to {args.repos} repositories ({args.rules} rules each)")
+    print()
+    print(f"   file by file   : {sequential_time:8.2f} s  ({args.repos / sequential_time:7.1f} repos/s, syntax check only)")
+    print(f"   one transaction: {transaction_time:8.2f} s  ({args.repos / transaction_time:7.1f} repos/s, "
+          f"full validation on {args.workers} workers)")
+
+    if not ok or not same:
+        print("❌ The transaction did not produce the same settings", file=sys.stderr)
+        return 1
+
+    print("✅ Results identical")
+    return 0
+
+
+def exact_merge(existing: List[str], new: List[str]) -> List[str]:
+    """Merge deduplicating by exact string, as before canonical rules."""
+    seen = set(existing)
+    merged = list(existing)
+    for rule in new:
+        if rule not in seen:
+            merged.append(rule)
+            seen.add(rule)
+    return merged
+
+
+def bench_merge(args) -> int:
+    """Repeatedly merge profiles written slightly differently, with and without subsumption."""
+    manager = PermissionManager()
+    rng = random.Random(14)
+    base = synthetic_rules(args.rules, seed=14)
+    with open(Path(__file__).parent.parent / 'assets' / 'permission_profiles.json', 'r') as f:
+        profiles = [profile.get('allowedTools', []) for profile in json.load(f).values()]
+
+    def variant(rule: str) -> str:
+        # The same rule as a different tool or person might write it
+        choice = rng.randrange(5)
+        if choice == 1 and rule.endswith(')'):
+            return rule[:-1] + ' )'
+        if choice == 2:
+            return rule.replace(' ', '  ', 1)
+        if choice == 4 and rule.startswith('Bash(') and ' ' in rule:
+            # Quoting and tabs the shell reads as the same words
+            first, rest = rule[5:-1].split(' ', 1)
+            return f'Bash("{first}"\t{rest})' if '*' not in first else rule
+        if choice == 3 and rule.startswith(('Read(', 'Write(', 'Edit(')) and not rule.startswith(('Read(/', 'Read(~')):
+            return rule.replace('(', '(./', 1)
+        return rule
+
+    # Exact merging of canonical rules tells the two effects apart: it
+    # decides like the subsuming merge, which only drops covered rules
+    exact, canonical, subsuming = list(base), list(base), list(base)
+    exact_time = subsuming_time = 0.0
+    for _ in range(args.applications):
+        rules = [variant(rule) for rule in rng.choice(profiles) + rng.sample(base, min(50, len(base)))]
+
+        start = time.perf_counter()
+        exact = exact_merge(exact, rules)
+        exact_time += time.perf_counter() - start
+
+        canonical = exact_merge(canonical, [manager.canonical_rule(rule) for rule in rules])
+
+        start = time.perf_counter()
+        subsuming = manager.merge_permissions(subsuming, rules)
+        subsuming_time += time.perf_counter() - start
+
+    # Merge, then evaluate: the rules as written, their canonical forms and
+    # the subsuming merge must all decide alike, spellings included
+    calls = synthetic_calls(canonical + exact, args.queries, seed=14)
+    written_engine = PermissionEngine(exact, [])
+    canonical_engine = PermissionEngine(canonical, [])
+    subsuming_engine = PermissionEngine(subsuming, [])
+    mismatches = sum(
+        1 for tool, argument in calls
+        if len({
+            written_engine.evaluate(tool, argument)[0],
+            canonical_engine.evaluate(tool, argument)[0],
+            subsuming_engine.evaluate(tool, argument)[0],
+        }) > 1
+    )
+
+    print(f"♻️  {args.applications} profile applications onto {len(base)} rules")
+    print()
+    print(f"   exact-string merge: {len(exact):7d} rules  {exact_time * 1000:8.1f} ms")
+    print(f"   canonical strings : {len(canonical):7d} rules")
+    print(f"   subsuming merge   : {len(subsuming):7d} rules  {subsuming_time * 1000:8.1f} ms")
+
+    if mismatches:
+        print(f"❌ {mismatches} of {len(calls)} decisions differ between the rules as written, "
+              f"canonical and merged", file=sys.stderr)
+        return 1
+
+    print(f"✅ Decisions identical on {len(calls)} calls")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark Claude Code permissions scripts',
+        epilog='For exact syscall counts run the same command under `strace -c -f`.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    detect = subparsers.add_parser('detect', help='Project detection traversal')
+    detect.add_argument('directory', nargs='?', default='.', help='Directory to scan')
+    detect.add_argument('--repeat', type=int, default=5, help='Runs per variant (best time wins)')
+    detect.add_argument('--jobs', type=int, default=1, help='Also time the parallel walker with N threads')
+    detect.add_argument('--git-index', action='store_true', help='Also time enumeration from .git/index')
+    detect.set_defaults(func=bench_detect)
+
+    conflicts = subparsers.add_parser('conflicts', help='Allow/deny conflict checking')
+    conflicts.add_argument('--rules', type=int, default=10000, help='Rules per list (default: 10000)')
+    conflicts.add_argument('--verify', type=int, default=500,
+                           help='Rules per list compared against the all-pairs checks (default: 500)')
+    conflicts.add_argument('--repeat', type=int, default=3, help='Runs of the indexed check (best time wins)')
+    conflicts.set_defaults(func=bench_conflicts)
+
+    security = subparsers.add_parser('security', help='Security keyword scanning')
+    security.add_argument('--rules', type=int, default=10000, help='Rules to scan (default: 10000)')
+    security.add_argument('--patterns', type=int, default=500,
+                          help='Keywords, padded with synthetic ones (default: 500)')
+    security.add_argument('--repeat', type=int, default=3, help='Runs per variant (best time wins)')
+    security.set_defaults(func=bench_security)
+
+    evaluate = subparsers.add_parser('evaluate', help='Permission decisions per tool call')
+    evaluate.add_argument('--rules', type=int, default=10000,
+                          help='Allow rules, with a tenth as many deny rules (default: 10000)')
+    evaluate.add_argument('--queries', type=int, default=100000, help='Tool calls to decide (default: 100000)')
+    evaluate.add_argument('--verify', type=int, default=200,
+                          help='Calls also decided rule by rule (default: 200)')
+    evaluate.add_argument('--repeat', type=int, default=3, help='Runs of the compiled engine (best time wins)')
+    evaluate.set_defaults(func=bench_evaluate)
+
+    hook = subparsers.add_parser('hook', help='PreToolUse hook latency percentiles')
+    hook.add_argument('--rules', type=int, default=2000,
+                      help='Allow rules, with a tenth as many deny rules (default: 2000)')
+    hook.add_argument('--calls', type=int, default=1000, help='In-process hook calls (default: 1000)')
+    hook.add_argument('--spawn', type=int, default=50,
+                      help='Calls spawning the hook script, and re-parsing settings (default: 50)')
+    hook.add_argument('--budget-ms', type=float, default=1.0,
+                      help='Maximum in-process p99 latency (default: 1.0)')
+    hook.set_defaults(func=bench_hook)
+
+    daemon = subparsers.add_parser('daemon', help='Daemon queries against spawned scripts')
+    daemon.add_argument('--rules', type=int, default=500, help='Rules in the settings file (default: 500)')
+    daemon.add_argument('--queries', type=int, default=200, help='Queries per command (default: 200)')
+    daemon.add_argument('--spawn', type=int, default=20, help='Script runs per command (default: 20)')
+    daemon.set_defaults(func=bench_daemon)
+
+    redundancy = subparsers.add_parser('redundancy', help='Redundant rule detection')
+    redundancy.add_argument('--rules', type=int, default=10000, help='Rules in the list (default: 10000)')
+    redundancy.add_argument('--verify', type=int, default=1000,
+                            help='Rules also checked pair by pair (default: 1000)')
+    redundancy.add_argument('--repeat', type=int, default=3, help='Runs of the indexed pass (best time wins)')
+    redundancy.set_defaults(func=bench_redundancy)
+
+    writes = subparsers.add_parser('writes', help='Concurrent settings writes from many processes')
+    writes.add_argument('--processes', type=int, default=16, help='Writing processes (default: 16)')
+    writes.add_argument('--writes', type=int, default=50, help='Writes per process (default: 50)')
+    writes.add_argument('--legacy', action='store_true',
+                        help='Use the old unlocked in-place write to show what it loses')
+    writes.set_defaults(func=bench_writes)
+
+    backups = subparsers.add_parser('backups', help='Backup copies against the backup store')
+    backups.add_argument('--applications', type=int, default=500, help='Profile applications (default: 500)')
+    backups.add_argument('--rules', type=int, default=200, help='Project rules besides the profile (default: 200)')
+    backups.set_defaults(func=bench_backups)
+
+    transaction = subparsers.add_parser('transaction', help='Fleet-wide transactional apply')
+    transaction.add_argument('--repos', type=int, default=200, help='Repositories (default: 200)')
+    transaction.add_argument('--rules', type=int, default=100, help='Rules per repository (default: 100)')
+    transaction.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                             help='Validation processes (default: CPU count)')
+    transaction.set_defaults(func=bench_transaction)
+
+    merge = subparsers.add_parser('merge', help='Rule list growth under repeated profile merges')
+    merge.add_argument('--rules', type=int, default=1000, help='Rules already in the list (default: 1000)')
+    merge.add_argument('--applications', type=int, default=100, help='Profile applications (default: 100)')
+    merge.add_argument('--queries', type=int, default=20000, help='Calls compared afterwards (default: 20000)')
+    merge.set_defaults(func=bench_merge)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
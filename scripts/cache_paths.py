@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Cache Location for the Claude Code Permissions Scripts
+
+Every cache the scripts keep - detection listings, validation results,
+compiled hook rule sets - lives under one per-user directory, never in
+~/.claude (Claude Code's own configuration) or in a scanned project:
+$XDG_CACHE_HOME/claude-permissions, or ~/.cache/claude-permissions.
+
+Usage:
+    from cache_paths import cache_directory
+
+    path = cache_directory() / 'validate.json'
+"""
+
+import os
+from pathlib import Path
+
+
+def cache_directory() -> Path:
+    """Per-user cache directory of the permission scripts."""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'claude-permissions'
@@ -7,13 +7,594 @@ appropriate permission templates.
 
 Usage:
     detect_project.py [directory]
+    detect_project.py --jobs 8 ~/src/monorepo
+    detect_project.py --cache
+    detect_project.py --git-index
+    detect_project.py --sample --file-budget 2000
+    detect_project.py --workspace --json --permissions
+    detect_project.py --batch --paths-from repos.txt --output fleet.jsonl
 """
 
+import os
+import re
+import math
 import sys
 import json
+import time
+import queue
+import select
+import struct
+import hashlib
+import threading
+from fnmatch import fnmatchcase, translate
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
-from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Iterator, Tuple, Optional
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache_paths import cache_directory
+
+
+class DetectionCache:
+    """
+    On-disk cache of per-directory scan results keyed by directory mtime/inode.
+
+    A directory's mtime changes whenever an entry is added, removed or renamed
+    in it, so an unchanged (mtime, inode) pair means its listing - and with it
+    the extension counts and subdirectories - is unchanged.
+
+    Cache files live outside the scanned tree, one per project root, so
+    detection never writes into the user's working tree. Without a path
+    the records are only kept in memory, for a caller (like the daemon)
+    that passes the same instance to every ProjectDetector of a root.
+    """
+
+    DIRECTORY = cache_directory()
+    VERSION = 2
+
+    # Directories modified this recently are not cached: a second change
+    # within the same timestamp tick would otherwise go unnoticed
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, path: Optional[Path], settings: Dict):
+        """
+        Initialize detection cache.
+
+        Args:
+            path: Cache file location (None: in memory only)
+            settings: Scan parameters the cached records depend on
+        """
+        self.path = path
+        self.settings = settings
+        self.records: Dict[str, Dict] = {}
+        self.visited: Dict[str, Dict] = {}
+        self.dirty = False
+
+    @classmethod
+    def path_for(cls, root: Path) -> Path:
+        """Cache file of a project root."""
+        key = hashlib.sha256(str(root.resolve()).encode()).hexdigest()[:16]
+        return cls.DIRECTORY / f'detect-{key}.json'
+
+    def load(self):
+        """Load records from disk, discarding them if the scan settings changed."""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') == self.VERSION and data.get('settings') == self.settings:
+            self.records = data.get('directories', {})
+
+    def lookup(self, key: str, st: os.stat_result) -> Optional[Dict]:
+        """
+        Return the cached record for a directory if it is still current.
+
+        Args:
+            key: Directory path relative to the scan root
+            st: Fresh stat() result for the directory
+        """
+        record = self.records.get(key)
+        if record is None or record['mtime_ns'] != st.st_mtime_ns or record['ino'] != st.st_ino:
+            return None
+
+        self.visited[key] = record
+        return record
+
+    def begin(self):
+        """Start a new walk of the tree."""
+        self.visited = {}
+        self.dirty = False
+
+    def store(self, key: str, st: os.stat_result, record: Dict):
+        """
+        Remember the scan result for a directory.
+
+        Args:
+            key: Directory path relative to the scan root
+            st: stat() result taken before the directory was listed
+            record: Scan result (extensions, subdirs, indicator names)
+        """
+        self.dirty = True
+        if time.time_ns() - st.st_mtime_ns < self.RACY_WINDOW_NS:
+            return
+
+        record['mtime_ns'] = st.st_mtime_ns
+        record['ino'] = st.st_ino
+        self.visited[key] = record
+
+    def save(self, partial: bool = False):
+        """
+        Keep the records seen during this scan, dropping vanished directories,
+        and write them unless the cache is in memory only.
+
+        Args:
+            partial: The scan stopped early; keep records it didn't reach
+        """
+        if partial:
+            if not self.dirty:
+                return
+            directories = {**self.records, **self.visited}
+        elif not self.dirty and len(self.visited) == len(self.records):
+            return
+        else:
+            directories = self.visited
+
+        self.records = directories
+        self.dirty = False
+        if self.path is None:
+            return
+
+        data = {
+            'version': self.VERSION,
+            'settings': self.settings,
+            'directories': directories,
+        }
+
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Unwritable cache directory: detection still works, just uncached
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+
+class GitIndex:
+    """
+    Minimal reader for the git index file (.git/index).
+
+    Parses index versions 2-4 directly, without running git, to list the
+    tracked paths of a worktree. Tracked paths never include ignored build
+    output, which makes them a cheap and accurate input for detection.
+    """
+
+    # Entry mode bits (object type)
+    MODE_TYPE_MASK = 0o170000
+    MODE_GITLINK = 0o160000
+    MODE_SPARSE_DIR = 0o040000
+
+    def __init__(self, worktree: Path, git_dir: Path):
+        """
+        Initialize git index reader.
+
+        Args:
+            worktree: Top-level directory of the worktree
+            git_dir: The repository's git directory
+        """
+        self.worktree = worktree
+        self.git_dir = git_dir
+
+    @classmethod
+    def find(cls, directory: Path) -> Optional['GitIndex']:
+        """
+        Locate the worktree containing a directory.
+
+        Handles both a .git directory and a .git file pointing elsewhere
+        (linked worktrees, submodules).
+
+        Args:
+            directory: Directory inside a worktree
+
+        Returns:
+            GitIndex for the enclosing worktree, or None if not in a repository
+        """
+        for candidate in [directory, *directory.parents]:
+            dot_git = candidate / '.git'
+
+            if dot_git.is_dir():
+                return cls(candidate, dot_git)
+
+            if dot_git.is_file():
+                try:
+                    content = dot_git.read_text().strip()
+                except OSError:
+                    return None
+                if not content.startswith('gitdir:'):
+                    return None
+                git_dir = Path(content[len('gitdir:'):].strip())
+                return cls(candidate, (candidate / git_dir).resolve())
+
+        return None
+
+    def _hash_size(self) -> int:
+        """Object id length in bytes (SHA-1 unless the repo uses SHA-256)."""
+        try:
+            config = (self.git_dir / 'config').read_text()
+        except OSError:
+            return 20
+
+        for line in config.splitlines():
+            key, _, value = line.partition('=')
+            if key.strip().lower() == 'objectformat' and value.strip().lower() == 'sha256':
+                return 32
+
+        return 20
+
+    def paths(self) -> List[str]:
+        """
+        Read tracked file paths from the index.
+
+        Returns:
+            Paths relative to the worktree, '/'-separated, in index order
+
+        Raises:
+            OSError: If the index can't be read
+            ValueError: If the index is malformed or uses a layout this
+                reader doesn't cover (split or sparse index)
+        """
+        with open(self.git_dir / 'index', 'rb') as f:
+            data = f.read()
+
+        if len(data) < 12 or data[:4] != b'DIRC':
+            raise ValueError('not a git index file')
+
+        version, count = struct.unpack_from('>II', data, 4)
+        if version not in (2, 3, 4):
+            raise ValueError(f'unsupported index version {version}')
+
+        hash_size = self._hash_size()
+        # ctime, mtime, dev, ino, mode, uid, gid, size, object id
+        flags_offset = 40 + hash_size
+        unpack_uint32 = struct.Struct('>I').unpack_from
+        unpack_uint16 = struct.Struct('>H').unpack_from
+
+        paths = []
+        previous = b''
+        offset = 12
+
+        for _ in range(count):
+            mode = unpack_uint32(data, offset + 24)[0]
+            flags = unpack_uint16(data, offset + flags_offset)[0]
+            name_start = offset + flags_offset + 2
+            if version >= 3 and flags & 0x4000:
+                name_start += 2  # extended flags
+
+            if version == 4:
+                # Prefix-compressed name: varint count of bytes to strip from
+                # the previous name, then a NUL-terminated suffix
+                byte = data[name_start]
+                name_start += 1
+                strip = byte & 0x7f
+                while byte & 0x80:
+                    byte = data[name_start]
+                    name_start += 1
+                    strip = ((strip + 1) << 7) | (byte & 0x7f)
+
+                name_end = data.index(b'\0', name_start)
+                name = previous[:len(previous) - strip] + data[name_start:name_end]
+                offset = name_end + 1
+            else:
+                name_length = flags & 0xfff
+                if name_length == 0xfff:
+                    name_end = data.index(b'\0', name_start)
+                else:
+                    name_end = name_start + name_length
+                name = data[name_start:name_end]
+                # Entries are NUL-padded to a multiple of 8 bytes
+                offset += (name_end - offset + 8) & ~7
+
+            object_type = mode & self.MODE_TYPE_MASK
+            if object_type == self.MODE_SPARSE_DIR:
+                raise ValueError('sparse index is not supported')
+
+            # Skip submodules and the extra stages of merge conflicts
+            if object_type != self.MODE_GITLINK and name != previous:
+                paths.append(name.decode('utf-8', 'surrogateescape'))
+            previous = name
+
+        # Extensions: a split index keeps most entries in a shared file
+        while offset + 8 <= len(data) - hash_size:
+            signature = data[offset:offset + 4]
+            if signature == b'link':
+                raise ValueError('split index is not supported')
+            size = unpack_uint32(data, offset + 4)[0]
+            offset += 8 + size
+
+        return paths
+
+
+class IgnoreRules:
+    """
+    Compiled patterns from one .gitignore-style file.
+
+    Patterns are translated to regular expressions once. Files without
+    negated patterns are folded into a single alternation per match kind,
+    so the common case costs one regex match per entry.
+    """
+
+    def __init__(self, lines: List[str], base: str = ''):
+        """
+        Compile ignore patterns.
+
+        Args:
+            lines: Lines of the ignore file
+            base: Worktree-relative directory of the file ('' or 'a/b/')
+        """
+        self.base = base
+        # (regex, negated, directory_only, anchored) in file order
+        self.rules: List[Tuple[str, bool, bool, bool]] = []
+
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+
+            directory_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = '/' in line
+            self.rules.append((self._translate(line.lstrip('/')), negated, directory_only, anchored))
+
+        self._has_negation = any(rule[1] for rule in self.rules)
+        self._compiled = [
+            (re.compile(regex), negated, directory_only, anchored)
+            for regex, negated, directory_only, anchored in self.rules
+        ]
+
+        if not self._has_negation:
+            # Index: [is_dir][anchored] -> combined regex or None
+            self._combined = [[None, None], [None, None]]
+            for is_dir in (0, 1):
+                for anchored in (0, 1):
+                    parts = [
+                        regex for regex, _, directory_only, rule_anchored in self.rules
+                        if rule_anchored == bool(anchored) and (is_dir or not directory_only)
+                    ]
+                    if parts:
+                        self._combined[is_dir][anchored] = re.compile('|'.join(f'(?:{p})' for p in parts))
+
+    @classmethod
+    def from_file(cls, path: str, base: str = '') -> 'IgnoreRules':
+        """Compile the patterns of an ignore file."""
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            return cls(f.readlines(), base)
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translate one gitignore glob into a regular expression."""
+        out = []
+        i = 0
+        n = len(pattern)
+
+        while i < n:
+            c = pattern[i]
+
+            if c == '*':
+                if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/') \
+                        and (i + 2 == n or pattern[i + 2] == '/'):
+                    if i + 2 == n:
+                        out.append('.*')        # trailing '/**': everything inside
+                        i += 2
+                    else:
+                        out.append('(?:.*/)?')  # '**/': zero or more directories
+                        i += 3
+                    continue
+                while i < n and pattern[i] == '*':
+                    i += 1
+                out.append('[^/]*')
+                continue
+
+            if c == '?':
+                out.append('[^/]')
+            elif c == '[':
+                # A ']' right after '[' or '[!' is part of the set
+                start = i + 1
+                if start < n and pattern[start] in '!^':
+                    start += 1
+                if start < n and pattern[start] == ']':
+                    start += 1
+                end = pattern.find(']', start)
+
+                if end < 0:
+                    out.append(re.escape(c))
+                else:
+                    body = pattern[i + 1:end]
+                    if body[:1] in ('!', '^'):
+                        body = '^' + body[1:]
+                    body = body.replace('\\', '\\\\').replace('[', '\\[')
+                    out.append('[' + body + ']')
+                    i = end
+            elif c == '\\' and i + 1 < n:
+                i += 1
+                out.append(re.escape(pattern[i]))
+            else:
+                out.append(re.escape(c))
+            i += 1
+
+        return ''.join(out)
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Decide whether a path is ignored by this file.
+
+        Args:
+            path: Worktree-relative path
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated pattern,
+            None if no pattern matches
+        """
+        if not path.startswith(self.base):
+            return None
+
+        rel = path[len(self.base):]
+        name = rel[rel.rfind('/') + 1:]
+
+        if not self._has_negation:
+            anchored_re, name_re = self._combined[is_dir][1], self._combined[is_dir][0]
+            if (anchored_re and anchored_re.fullmatch(rel)) or (name_re and name_re.fullmatch(name)):
+                return True
+            return None
+
+        # Last matching pattern wins
+        for regex, negated, directory_only, anchored in reversed(self._compiled):
+            if directory_only and not is_dir:
+                continue
+            if regex.fullmatch(rel if anchored else name):
+                return not negated
+
+        return None
+
+    @staticmethod
+    def is_ignored(rules: Tuple['IgnoreRules', ...], path: str, is_dir: bool) -> bool:
+        """
+        Decide whether a path is ignored by a hierarchy of ignore files.
+
+        Args:
+            rules: Ignore files ordered from lowest to highest precedence
+                (info/exclude, then .gitignore files from the top down)
+            path: Worktree-relative path
+            is_dir: Whether the path is a directory
+        """
+        for ignore_file in reversed(rules):
+            verdict = ignore_file.match(path, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+
+class TemplateIndex:
+    """
+    Parsed project templates with memoized permission lists.
+
+    The on-disk index is shared by every detector in the process and is
+    only re-parsed when project_templates.json changes (mtime/size). Each
+    template's allow/deny lists are flattened once at load time, and the
+    merged, de-duplicated lists for a combination of types are memoized on
+    first use, so repeated lookups are a dictionary hit.
+    """
+
+    PATH = Path(__file__).parent.parent / 'references' / 'project_templates.json'
+
+    _shared: Dict[Path, 'TemplateIndex'] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, templates: Dict, signature: Optional[Tuple[int, int]] = None):
+        """
+        Index a templates dictionary.
+
+        Args:
+            templates: Parsed project templates
+            signature: (mtime_ns, size) of the source file, if any
+        """
+        self.templates = templates
+        self.signature = signature
+        self._combinations: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+        # Per-type (allow, deny) in template order: file patterns, then commands
+        self._type_rules: Dict[str, Tuple[List[str], List[str]]] = {}
+        for ptype, template in templates.items():
+            if not isinstance(template, dict):
+                continue
+            allow, deny = [], []
+            for section in ('file_patterns', 'commands'):
+                if section in template:
+                    allow.extend(template[section].get('allow', []))
+                    deny.extend(template[section].get('deny', []))
+            self._type_rules[ptype] = (allow, deny)
+
+    @classmethod
+    def load(cls, path: Path = None) -> 'TemplateIndex':
+        """
+        Return the shared index for a templates file, re-parsing it if changed.
+
+        Args:
+            path: Templates file (defaults to references/project_templates.json)
+
+        Returns:
+            TemplateIndex (empty if the file does not exist)
+        """
+        path = path or cls.PATH
+
+        try:
+            st = path.stat()
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+
+        with cls._lock:
+            index = cls._shared.get(path)
+            if index is not None and index.signature == signature:
+                return index
+
+            templates = {}
+            if signature is not None:
+                with open(path, 'r') as f:
+                    templates = json.load(f)
+
+            index = cls(templates, signature)
+            cls._shared[path] = index
+            return index
+
+    def rules_for(self, project_types: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Merged, de-duplicated permission rules for a combination of types.
+
+        Args:
+            project_types: Project types (order determines rule order)
+
+        Returns:
+            Tuple of (allow_rules, deny_rules)
+        """
+        key = tuple(project_types)
+        merged = self._combinations.get(key)
+
+        if merged is None:
+            allow_rules = []
+            deny_rules = []
+            for ptype in key:
+                if ptype in self._type_rules:
+                    allow, deny = self._type_rules[ptype]
+                    allow_rules.extend(allow)
+                    deny_rules.extend(deny)
+
+            # Remove duplicates while preserving order
+            merged = (tuple(dict.fromkeys(allow_rules)), tuple(dict.fromkeys(deny_rules)))
+            self._combinations[key] = merged
+
+        return (list(merged[0]), list(merged[1]))
 
 
 class ProjectDetector:
@@ -52,22 +633,98 @@ class ProjectDetector:
         'kotlin': ['.kt', '.kts'],
     }
 
-    def __init__(self, directory: Path = None):
+    # Entry names worth reporting from a directory listing, derived from INDICATORS
+    _INDICATOR_NAMES = {i for indicators in INDICATORS.values() for i in indicators if '*' not in i}
+    _INDICATOR_GLOB = re.compile('|'.join(
+        translate(i) for indicators in INDICATORS.values() for i in indicators if '*' in i
+    ))
+
+    # Extension -> project type lookup derived from EXTENSIONS
+    _EXTENSION_TYPES = {ext: ptype for ptype, exts in EXTENSIONS.items() for ext in exts}
+
+    # Build/dependency directories that are never descended into
+    # (hidden directories are skipped as well)
+    SKIP_DIRS = {'node_modules', 'target', 'build', 'dist', '__pycache__', 'venv'}
+
+    # Tools whose rule patterns are file paths
+    FILE_TOOLS = {'Read', 'Write', 'Edit', 'NotebookEdit'}
+
+    # Depth limit when discovering sub-projects in workspace mode
+    WORKSPACE_MAX_DEPTH = 6
+
+    # Pending directories allowed per worker thread in parallel mode
+    QUEUE_SIZE_PER_JOB = 64
+
+    # Sampling mode: re-rank after this many new files, and stop once the
+    # top SAMPLE_RANK_DEPTH types kept their order for SAMPLE_STABLE_CHECKS
+    # consecutive checks with the requested confidence
+    SAMPLE_CHECK_INTERVAL = 200
+    SAMPLE_RANK_DEPTH = 3
+    SAMPLE_STABLE_CHECKS = 3
+
+    def __init__(
+        self,
+        directory: Path = None,
+        jobs: int = 1,
+        use_cache: bool = False,
+        use_git_index: bool = False,
+        respect_gitignore: bool = True,
+        sample: bool = False,
+        file_budget: int = 5000,
+        confidence: float = 0.99,
+        templates: Optional[Dict] = None,
+        cache: Optional[DetectionCache] = None
+    ):
         """
         Initialize project detector.
 
         Args:
             directory: Directory to scan (defaults to current directory)
+            jobs: Number of threads used to walk the tree (1 = serial)
+            use_cache: Reuse per-directory results stored under
+                ~/.cache/claude-permissions/ (never inside the project)
+            use_git_index: Enumerate tracked files from .git/index instead of
+                walking the tree (falls back to the walker outside git)
+            respect_gitignore: Prune files and subtrees matched by the
+                .gitignore hierarchy while walking
+            sample: Stop walking once the language ranking is stable
+                (always uses the serial walker)
+            file_budget: Maximum number of files counted in sampling mode
+            confidence: Ranking confidence at which sampling stops early
+            templates: Preloaded project templates (read from references/
+                on demand if None)
+            cache: Detection cache the caller keeps between detections of
+                this directory (e.g. in memory); used instead of use_cache
         """
         self.directory = directory or Path.cwd()
-
-    def detect_by_indicators(self) -> Dict[str, List[str]]:
+        self.jobs = max(1, jobs)
+        self.use_cache = use_cache
+        self.use_git_index = use_git_index
+        self.respect_gitignore = respect_gitignore
+        self.sample = sample
+        self.file_budget = file_budget
+        self.confidence = confidence
+        self.templates = templates
+        self._injected_index: Optional[TemplateIndex] = None
+        self.cache: Optional[DetectionCache] = None
+        self._kept_cache = cache
+        self.scan_stats: Dict[str, float] = {}
+        self._root = str(self.directory)
+        self._root_ignore: Optional[Tuple] = None
+        self._ignores: Dict[str, Tuple] = {}
+        self._ignore_prefix = ''
+
+    def _match_indicators(self, names: List[str]) -> Dict[str, List[str]]:
         """
-        Detect project types by scanning for indicator files.
+        Match root directory entry names against the indicator table.
+
+        Args:
+            names: Entry names found in the root directory
 
         Returns:
             Dictionary mapping project type to found indicators
         """
+        name_set = set(names)
         found = {}
 
         for project_type, indicators in self.INDICATORS.items():
@@ -76,52 +733,533 @@ class ProjectDetector:
             for indicator in indicators:
                 # Handle glob patterns (e.g., *.csproj)
                 if '*' in indicator:
-                    pattern_matches = list(self.directory.glob(indicator))
-                    if pattern_matches:
-                        matches.extend([p.name for p in pattern_matches])
-                else:
-                    # Exact file match
-                    if (self.directory / indicator).exists():
-                        matches.append(indicator)
+                    matches.extend(n for n in names if fnmatchcase(n, indicator))
+                elif indicator in name_set:
+                    matches.append(indicator)
 
             if matches:
                 found[project_type] = matches
 
         return found
 
-    def count_file_extensions(self, max_depth: int = 3) -> Counter:
+    def detect_by_indicators(self) -> Dict[str, List[str]]:
         """
-        Count source file extensions in directory.
+        Detect project types by scanning for indicator files.
+
+        Returns:
+            Dictionary mapping project type to found indicators
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return {}
+
+        return self._match_indicators(names)
+
+    def _read_directory(
+        self,
+        path: str,
+        stats: Counter,
+        ignore: Optional[Tuple]
+    ) -> Optional[Tuple[Counter, List[str], List[str], Optional[Tuple]]]:
+        """
+        Read one directory with a single os.scandir call.
+
+        Entry types come from the cached DirEntry data, so no extra stat()
+        is needed per entry (symlinks excepted). Entries matched by the
+        .gitignore hierarchy are skipped, so ignored subtrees are never
+        descended into.
 
         Args:
-            max_depth: Maximum directory depth to scan
+            path: Directory path
+            stats: Counter updated with traversal statistics
+            ignore: Ignore state inherited from the parent directory
+                (None when .gitignore files are not honoured)
 
         Returns:
-            Counter of file extensions
+            Tuple of (extension_counts, subdir_names, indicator_names, ignore),
+            or None if the directory can't be read
+            - subdir_names: subdirectories that may be descended into
+            - indicator_names: entries that look like project indicators
+            - ignore: ignore state including this directory's .gitignore
         """
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return None
+
+        stats['directories'] += 1
+        stats['entries'] += len(entries)
+
+        rules = None
+        if ignore is not None:
+            prefix = self._ignore_path(path)
+            if any(entry.name == '.gitignore' for entry in entries):
+                ignore = self._extend_ignore(ignore, path, prefix)
+            rules = ignore[0]
+
         extensions = Counter()
+        subdirs = []
+        names = []
 
-        def scan_dir(dir_path: Path, depth: int):
-            if depth > max_depth:
-                return
+        for entry in entries:
+            name = entry.name
+            if name in self._INDICATOR_NAMES or self._INDICATOR_GLOB.fullmatch(name):
+                names.append(name)
 
             try:
-                for item in dir_path.iterdir():
-                    # Skip hidden directories and common build/dependency dirs
-                    if item.is_dir():
-                        name = item.name
-                        if name.startswith('.') or name in ['node_modules', 'target', 'build', 'dist', '__pycache__', 'venv']:
-                            continue
-                        scan_dir(item, depth + 1)
-                    elif item.is_file():
-                        ext = item.suffix
-                        if ext:
-                            extensions[ext] += 1
-            except PermissionError:
-                pass  # Skip directories we can't read
-
-        scan_dir(self.directory, 0)
-        return extensions
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_dir:
+                # Skip hidden directories and common build/dependency dirs
+                if not name.startswith('.') and name not in self.SKIP_DIRS:
+                    if rules and IgnoreRules.is_ignored(rules, prefix + name, True):
+                        stats['ignored'] += 1
+                        continue
+                    subdirs.append(name)
+            else:
+                # Same rule as Path.suffix
+                dot = name.rfind('.')
+                if 0 < dot < len(name) - 1 and entry.is_file():
+                    if rules and IgnoreRules.is_ignored(rules, prefix + name, False):
+                        stats['ignored'] += 1
+                        continue
+                    extensions[name[dot:]] += 1
+
+        return (extensions, subdirs, names, ignore)
+
+    def _ignore_path(self, path: str) -> str:
+        """Worktree-relative prefix ('a/b/') for entries of a directory."""
+        rel = path[len(self._root) + 1:]
+        return self._ignore_prefix + (rel.replace(os.sep, '/') + '/' if rel else '')
+
+    def _extend_ignore(self, ignore: Tuple, path: str, base: str) -> Tuple:
+        """
+        Add a directory's .gitignore to the inherited ignore state.
+
+        Args:
+            ignore: Inherited (rules, fingerprint) state
+            path: Directory that may contain a .gitignore file
+            base: Worktree-relative prefix of the directory ('a/b/')
+
+        Returns:
+            New (rules, fingerprint) state; the fingerprint changes whenever
+            any .gitignore on the path from the worktree top level changes
+        """
+        gitignore = os.path.join(path, '.gitignore')
+        try:
+            st = os.stat(gitignore)
+            rules = IgnoreRules.from_file(gitignore, base)
+        except OSError:
+            return ignore
+
+        fingerprint = hashlib.sha1(
+            f'{ignore[1]}|{base}:{st.st_mtime_ns}:{st.st_size}'.encode('utf-8', 'surrogateescape')
+        ).hexdigest()[:16]
+        return (ignore[0] + (rules,), fingerprint)
+
+    def _initial_ignore_state(self) -> Tuple:
+        """
+        Ignore state for the scan root.
+
+        Includes .git/info/exclude and the .gitignore files of directories
+        between the worktree top level and the scan root; the root's own
+        .gitignore is picked up while it is listed.
+        """
+        self._ignore_prefix = ''
+        ignore = ((), '')
+
+        index = GitIndex.find(self.directory)
+        if index is None:
+            return ignore
+
+        exclude = index.git_dir / 'info' / 'exclude'
+        try:
+            st = exclude.stat()
+            ignore = ((IgnoreRules.from_file(str(exclude), ''),), f'{st.st_mtime_ns}:{st.st_size}')
+        except OSError:
+            pass
+
+        parent = index.worktree
+        base = ''
+        for part in self.directory.relative_to(index.worktree).parts:
+            ignore = self._extend_ignore(ignore, str(parent), base)
+            parent = parent / part
+            base += part + '/'
+
+        self._ignore_prefix = base
+        return ignore
+
+    def _list_directory(
+        self,
+        path: str,
+        depth: int,
+        max_depth: int,
+        stats: Counter
+    ) -> Tuple[Counter, List[Tuple[str, int]], List[str]]:
+        """
+        Scan one directory, answering from the detection cache when possible.
+
+        Args:
+            path: Directory path
+            depth: Depth of the directory below the scan root
+            max_depth: Maximum directory depth to scan
+            stats: Counter updated with traversal statistics
+
+        Returns:
+            Tuple of (extension_counts, subdirectories, indicator_names)
+            - subdirectories: (path, depth) pairs still to be scanned
+            - indicator_names: entries that look like project indicators
+        """
+        cache = self.cache
+        record = None
+
+        ignore = None
+        if self._root_ignore is not None:
+            ignore = self._root_ignore if depth == 0 else self._ignores[os.path.dirname(path)]
+
+        if cache is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return (Counter(), [], [])
+
+            key = path[len(self._root) + 1:] or '.'
+            record = cache.lookup(key, st)
+
+            if record is not None and ignore is not None:
+                # Cached counts are only valid under the same ignore rules
+                if record['gitignore']:
+                    ignore = self._extend_ignore(ignore, path, self._ignore_path(path))
+                if ignore[1] != record['ignore']:
+                    record = None
+
+            if record is not None:
+                stats['cache_hits'] += 1
+                result = (Counter(record['extensions']), record['subdirs'], record['names'], ignore)
+            else:
+                stats['cache_misses'] += 1
+
+        if record is None:
+            parent_ignore = ignore
+            result = self._read_directory(path, stats, ignore)
+            if result is None:
+                return (Counter(), [], [])  # Skip directories we can't read
+
+            if cache is not None:
+                extensions, subdir_names, names, ignore = result
+                cache.store(key, st, {
+                    'extensions': dict(extensions),
+                    'subdirs': subdir_names,
+                    'names': names,
+                    'gitignore': ignore is not parent_ignore,
+                    'ignore': ignore[1] if ignore is not None else None,
+                })
+
+        extensions, subdir_names, names, ignore = result
+        if depth >= max_depth:
+            return (extensions, [], names)
+
+        if subdir_names and ignore is not None:
+            self._ignores[path] = ignore
+
+        subdirs = [(os.path.join(path, name), depth + 1) for name in subdir_names]
+        return (extensions, subdirs, names)
+
+    def _ranking_confidence(self, type_counts: Counter) -> float:
+        """
+        Confidence that the sampled ranking of the top types is the true one.
+
+        Treats each adjacent pair in the ranking as a binomial split and uses
+        the normal approximation P(leader ahead) = Phi((a - b) / sqrt(a + b));
+        the weakest pair bounds the confidence of the whole ranking.
+
+        Args:
+            type_counts: Sampled file counts per project type
+
+        Returns:
+            Confidence between 0.5 and 1.0 (0.0 if nothing was sampled)
+        """
+        counts = [count for _, count in type_counts.most_common(self.SAMPLE_RANK_DEPTH + 1)]
+        if not counts:
+            return 0.0
+
+        counts.append(0)
+        confidence = 1.0
+        for leader, runner_up in zip(counts[:self.SAMPLE_RANK_DEPTH], counts[1:]):
+            if leader == 0:
+                break
+            z = (leader - runner_up) / math.sqrt(leader + runner_up)
+            confidence = min(confidence, 0.5 * (1 + math.erf(z / math.sqrt(2))))
+
+        return confidence
+
+    def _scan_serial(self, max_depth: int, stats: Counter) -> Tuple[Counter, List[str]]:
+        """
+        Walk the tree on the calling thread, breadth first.
+
+        Breadth-first order lets a sampling scan see every top-level area of
+        the tree before it spends its budget deep inside one of them. In
+        sampling mode the walk stops once the file budget is spent or the
+        ranking of the top types has been stable and confident for a few
+        consecutive checks.
+        """
+        extensions = Counter()
+        root_names: List[str] = []
+
+        type_counts = Counter()
+        counted = 0
+        checked_at = 0
+        stable_checks = 0
+        last_ranking = None
+        confidence = 1.0
+
+        pending = deque([(str(self.directory), 0)])
+        while pending:
+            path, depth = pending.popleft()
+            dir_extensions, subdirs, names = self._list_directory(path, depth, max_depth, stats)
+            extensions.update(dir_extensions)
+            if depth == 0:
+                root_names.extend(names)
+            pending.extend(subdirs)
+
+            if not self.sample:
+                continue
+
+            for ext, count in dir_extensions.items():
+                counted += count
+                project_type = self._EXTENSION_TYPES.get(ext)
+                if project_type:
+                    type_counts[project_type] += count
+
+            if counted >= self.file_budget:
+                # Spending the budget on the last directory still counted every file
+                confidence = self._ranking_confidence(type_counts) if pending else 1.0
+                break
+
+            if counted - checked_at >= self.SAMPLE_CHECK_INTERVAL:
+                checked_at = counted
+                ranking = [ptype for ptype, _ in type_counts.most_common(self.SAMPLE_RANK_DEPTH)]
+                stable_checks = stable_checks + 1 if ranking == last_ranking else 0
+                last_ranking = ranking
+
+                confidence = self._ranking_confidence(type_counts) if pending else 1.0
+                if stable_checks >= self.SAMPLE_STABLE_CHECKS and confidence >= self.confidence:
+                    break
+        else:
+            # Walked everything: the counts are exact
+            confidence = 1.0
+
+        if self.sample:
+            stats['sampled_files'] = counted
+            stats['stopped_early'] = int(bool(pending))
+            stats['confidence'] = round(confidence, 4)
+
+        return (extensions, root_names)
+
+    def _scan_parallel(self, max_depth: int, stats: Counter) -> Tuple[Counter, List[str]]:
+        """
+        Walk the tree with a pool of threads sharing a bounded work queue.
+
+        os.scandir releases the GIL while listing, so threads overlap the
+        I/O latency of slow (e.g. network-backed) storage. When the queue is
+        full a worker descends into the subdirectory itself instead of
+        blocking, which keeps memory bounded without risking deadlock.
+        """
+        work = queue.Queue(maxsize=max(self.jobs, self.jobs * self.QUEUE_SIZE_PER_JOB))
+        worker_results: List[Tuple[Counter, Counter]] = []
+        root_names: List[str] = []
+
+        def worker():
+            extensions = Counter()
+            worker_stats = Counter()
+            worker_results.append((extensions, worker_stats))
+
+            while True:
+                item = work.get()
+                if item is None:
+                    work.task_done()
+                    return
+
+                try:
+                    pending = [item]
+                    while pending:
+                        path, depth = pending.pop()
+                        dir_extensions, subdirs, names = self._list_directory(
+                            path, depth, max_depth, worker_stats
+                        )
+                        extensions.update(dir_extensions)
+                        if depth == 0:
+                            root_names.extend(names)
+
+                        for subdir in subdirs:
+                            try:
+                                work.put_nowait(subdir)
+                            except queue.Full:
+                                pending.append(subdir)
+                finally:
+                    work.task_done()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.jobs)]
+        for thread in threads:
+            thread.start()
+
+        work.put((str(self.directory), 0))
+        work.join()
+
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+
+        extensions = Counter()
+        for worker_extensions, worker_stats in worker_results:
+            extensions.update(worker_extensions)
+            stats.update(worker_stats)
+
+        return (extensions, root_names)
+
+    def _scan_git_index(self, max_depth: int, stats: Counter) -> Optional[Tuple[Counter, List[str]]]:
+        """
+        Derive extension counts and root entries from the git index.
+
+        Applies the walker's depth limit and directory skip rules to the
+        tracked paths, so only the file enumeration differs.
+
+        Returns:
+            Tuple of (extension_counts, root_names), or None if the directory
+            is not inside a readable git worktree
+        """
+        index = GitIndex.find(self.directory)
+        if index is None:
+            return None
+
+        try:
+            paths = index.paths()
+        except (OSError, ValueError, IndexError, struct.error):
+            return None
+
+        prefix = self.directory.relative_to(index.worktree).as_posix()
+        prefix = '' if prefix == '.' else prefix + '/'
+
+        extensions = Counter()
+        root_names = {}
+        # Directory prefix -> whether files below it are counted
+        dir_allowed = {'': True}
+
+        for path in paths:
+            if prefix:
+                if not path.startswith(prefix):
+                    continue
+                path = path[len(prefix):]
+
+            slash = path.rfind('/')
+            dirname = path[:slash] if slash >= 0 else ''
+            name = path[slash + 1:]
+
+            root_names[path.split('/', 1)[0]] = None
+
+            allowed = dir_allowed.get(dirname)
+            if allowed is None:
+                parts = dirname.split('/')
+                allowed = len(parts) <= max_depth and not any(
+                    part.startswith('.') or part in self.SKIP_DIRS for part in parts
+                )
+                dir_allowed[dirname] = allowed
+
+            if allowed:
+                dot = name.rfind('.')
+                if 0 < dot < len(name) - 1:
+                    extensions[name[dot:]] += 1
+
+        stats['git_index_entries'] = len(paths)
+        return (extensions, list(root_names))
+
+    def _begin_walk(self, stats: Counter):
+        """Set up ignore rules and the detection cache for a tree walk."""
+        if self.respect_gitignore:
+            self._root_ignore = self._initial_ignore_state()
+            stats['ignored'] = 0
+
+        if self._kept_cache is not None:
+            self.cache = self._kept_cache
+            self.cache.begin()
+            stats.update(cache_hits=0, cache_misses=0)
+        elif self.use_cache:
+            self.cache = DetectionCache(
+                DetectionCache.path_for(self.directory),
+                {'gitignore': self.respect_gitignore}
+            )
+            self.cache.load()
+            stats.update(cache_hits=0, cache_misses=0)
+
+    def _end_walk(self, partial: bool = False):
+        """
+        Persist the detection cache and drop per-walk state.
+
+        Args:
+            partial: The walk did not cover the whole tree
+        """
+        if self.cache is not None:
+            self.cache.save(partial=partial)
+            self.cache = None
+
+        self._root_ignore = None
+        self._ignores = {}
+
+    def scan(self, max_depth: int = 3) -> Tuple[Dict[str, List[str]], Counter]:
+        """
+        Collect root indicators and extension counts in one traversal.
+
+        Uses the thread pool walker when the detector was created with
+        jobs > 1; both walkers produce identical results. With use_cache,
+        only directories whose mtime changed since the last run are listed.
+        With sample, the walk may stop before covering the whole tree.
+        With use_git_index, tracked files are read from .git/index and the
+        walkers are only used outside git worktrees.
+
+        Args:
+            max_depth: Maximum directory depth to scan
+
+        Returns:
+            Tuple of (indicator_matches, extension_counts)
+        """
+        stats = Counter(directories=0, entries=0)
+
+        if self.use_git_index:
+            result = self._scan_git_index(max_depth, stats)
+            if result is not None:
+                extensions, root_names = result
+                self.scan_stats = dict(stats)
+                return (self._match_indicators(root_names), extensions)
+
+        self._begin_walk(stats)
+        try:
+            if self.jobs > 1 and not self.sample:
+                extensions, root_names = self._scan_parallel(max_depth, stats)
+            else:
+                extensions, root_names = self._scan_serial(max_depth, stats)
+        finally:
+            # An early-stopped sample must not evict records it never reached
+            self._end_walk(partial=bool(stats.get('stopped_early')))
+
+        self.scan_stats = dict(stats)
+        return (self._match_indicators(root_names), extensions)
+
+    def count_file_extensions(self, max_depth: int = 3) -> Counter:
+        """
+        Count source file extensions in directory.
+
+        Args:
+            max_depth: Maximum directory depth to scan
+
+        Returns:
+            Counter of file extensions
+        """
+        return self.scan(max_depth)[1]
 
     def detect_by_extensions(self) -> List[str]:
         """
@@ -130,15 +1268,25 @@ class ProjectDetector:
         Returns:
             List of detected project types sorted by file count
         """
-        extension_counts = self.count_file_extensions()
+        return self._rank_extension_types(self.count_file_extensions())
 
+    def _rank_extension_types(self, extension_counts: Counter) -> List[str]:
+        """
+        Map extension counts to project types.
+
+        Args:
+            extension_counts: Counter of file extensions
+
+        Returns:
+            List of detected project types sorted by file count
+        """
         # Map extensions to project types with counts
         type_counts = Counter()
 
         for ext, count in extension_counts.items():
-            for project_type, exts in self.EXTENSIONS.items():
-                if ext in exts:
-                    type_counts[project_type] += count
+            project_type = self._EXTENSION_TYPES.get(ext)
+            if project_type:
+                type_counts[project_type] += count
 
         # Return types sorted by count (most files first)
         return [ptype for ptype, _ in type_counts.most_common()]
@@ -152,11 +1300,30 @@ class ProjectDetector:
             - detected_types: List of project types (primary first)
             - metadata: Dict with detection details
         """
-        # Detect by indicators (most reliable)
-        indicator_matches = self.detect_by_indicators()
+        # Indicators (most reliable) and file extensions (secondary check)
+        # are collected in the same traversal
+        indicator_matches, extension_counts = self.scan()
+        detected, metadata = self._combine_detections(indicator_matches, extension_counts)
+        metadata['scan_stats'] = self.scan_stats
 
-        # Detect by file extensions (secondary check)
-        extension_types = self.detect_by_extensions()
+        return (detected, metadata)
+
+    def _combine_detections(
+        self,
+        indicator_matches: Dict[str, List[str]],
+        extension_counts: Counter
+    ) -> Tuple[List[str], Dict[str, any]]:
+        """
+        Combine indicator and extension evidence into a ranked type list.
+
+        Args:
+            indicator_matches: Project type -> indicator files found
+            extension_counts: Counter of file extensions
+
+        Returns:
+            Tuple of (detected_types, metadata)
+        """
+        extension_types = self._rank_extension_types(extension_counts)
 
         # Combine results - prioritize indicator-based detection
         detected = []
@@ -188,7 +1355,7 @@ class ProjectDetector:
         # TypeScript projects always have JavaScript too
         if 'typescript' in detected and 'javascript' not in detected:
             # Check if package.json exists
-            if (self.directory / 'package.json').exists():
+            if 'package.json' in indicator_matches.get('javascript', []):
                 detected.insert(detected.index('typescript') + 1, 'javascript')
 
         metadata = {
@@ -200,6 +1367,65 @@ class ProjectDetector:
 
         return (detected, metadata)
 
+    def iter_workspace(self, max_depth: int = WORKSPACE_MAX_DEPTH) -> Iterator[Dict[str, any]]:
+        """
+        Detect every sub-project of a monorepo in one traversal.
+
+        A directory containing indicator files (package.json, go.mod, ...)
+        starts a sub-project; files are attributed to the nearest enclosing
+        sub-project. Results are yielded as soon as a sub-project's subtree
+        has been walked, so nested projects come before their parents and
+        the root comes last.
+
+        Args:
+            max_depth: Maximum directory depth to scan
+
+        Yields:
+            Dict with path (relative to the root, '.' for the root),
+            detected_types and metadata for each sub-project that has any
+        """
+        stats = Counter(directories=0, entries=0)
+
+        def walk(path: str, depth: int, project: Dict) -> Iterator[Dict]:
+            extensions, subdirs, names = self._list_directory(path, depth, max_depth, stats)
+
+            owner = project
+            if depth > 0 and names:
+                owner = {'path': path, 'names': names, 'extensions': Counter()}
+            elif depth == 0:
+                project['names'] = names
+
+            owner['extensions'].update(extensions)
+
+            for subdir, subdir_depth in subdirs:
+                yield from walk(subdir, subdir_depth, owner)
+
+            if owner is not project or depth == 0:
+                result = self._workspace_result(owner)
+                if result['detected_types']:
+                    yield result
+
+        self._begin_walk(stats)
+        try:
+            yield from walk(self._root, 0, {'path': self._root, 'names': [], 'extensions': Counter()})
+        finally:
+            self._end_walk()
+            self.scan_stats = dict(stats)
+
+    def _workspace_result(self, project: Dict) -> Dict[str, any]:
+        """Turn a sub-project's collected evidence into a detection result."""
+        detected, metadata = self._combine_detections(
+            self._match_indicators(project['names']),
+            project['extensions']
+        )
+        rel = os.path.relpath(project['path'], self._root).replace(os.sep, '/')
+
+        return {
+            'path': rel,
+            'detected_types': detected,
+            'metadata': metadata
+        }
+
     def recommend_template(self, project_types: List[str]) -> Optional[str]:
         """
         Recommend permission template based on detected types.
@@ -223,48 +1449,617 @@ class ProjectDetector:
         Returns:
             Dictionary of templates
         """
-        templates_path = Path(__file__).parent.parent / 'references' / 'project_templates.json'
+        return self._template_index().templates
 
-        if not templates_path.exists():
-            return {}
+    def _template_index(self) -> 'TemplateIndex':
+        """Index over the injected templates, or the shared on-disk one."""
+        if self.templates is None:
+            return TemplateIndex.load()
+
+        if self._injected_index is None:
+            self._injected_index = TemplateIndex(self.templates)
+        return self._injected_index
+
+    def scope_rule(self, rule: str, scope: Optional[str]) -> str:
+        """
+        Restrict a file permission rule to a sub-project directory.
+
+        'Write(src/**)' becomes 'Write(web/src/**)' and a bare 'Read' becomes
+        'Read(web/**)'. Command rules and absolute paths are left unchanged.
+        Only meant for allow rules: a scoped deny rule protects less.
+
+        Args:
+            rule: Permission rule string
+            scope: Sub-project path relative to the workspace root
+
+        Returns:
+            Scoped permission rule
+        """
+        if not scope or scope == '.':
+            return rule
+
+        if '(' not in rule:
+            return f'{rule}({scope}/**)' if rule in self.FILE_TOOLS else rule
+
+        tool, pattern = rule.split('(', 1)
+        pattern = pattern[:-1] if pattern.endswith(')') else pattern
 
-        with open(templates_path, 'r') as f:
-            return json.load(f)
+        if tool not in self.FILE_TOOLS or pattern.startswith(('/', '~')):
+            return rule
 
-    def get_permissions_for_types(self, project_types: List[str]) -> Tuple[List[str], List[str]]:
+        if pattern.startswith('./'):
+            pattern = pattern[2:]
+
+        return f'{tool}({scope}/{pattern or "**"})'
+
+    def get_permissions_for_types(
+        self,
+        project_types: List[str],
+        scope: Optional[str] = None
+    ) -> Tuple[List[str], List[str]]:
         """
         Get permission rules for detected project types.
 
         Args:
             project_types: List of detected project types
+            scope: Restrict file allow rules to this sub-project directory
+                (relative to the workspace root); deny rules are kept as
+                they are and also added in scoped form, so they only widen
 
         Returns:
             Tuple of (allow_rules, deny_rules)
         """
-        templates = self.load_templates()
+        allow_rules, deny_rules = self._template_index().rules_for(project_types)
+
+        if scope:
+            # Scoping can map distinct rules onto the same one
+            allow_rules = list(dict.fromkeys(self.scope_rule(rule, scope) for rule in allow_rules))
+            # Narrowing a deny rule would stop it protecting the rest of
+            # the workspace; 'Write(node_modules/**)' must still cover the
+            # root's node_modules next to 'Write(web/node_modules/**)'
+            deny_rules = list(dict.fromkeys(
+                scoped for rule in deny_rules for scoped in (rule, self.scope_rule(rule, scope))
+            ))
+
+        return (allow_rules, deny_rules)
 
-        allow_rules = []
-        deny_rules = []
 
-        for ptype in project_types:
-            if ptype in templates:
-                template = templates[ptype]
+class PollingBackend:
+    """Change notification by comparing directory mtimes on an interval."""
 
-                # Add file patterns
-                if 'file_patterns' in template:
-                    allow_rules.extend(template['file_patterns'].get('allow', []))
-                    deny_rules.extend(template['file_patterns'].get('deny', []))
+    name = 'poll'
 
-                # Add CLI commands
-                if 'commands' in template:
-                    allow_rules.extend(template['commands'].get('allow', []))
-                    deny_rules.extend(template['commands'].get('deny', []))
+    def __init__(self, interval: float = 1.0):
+        """
+        Initialize polling backend.
 
-        # Remove duplicates while preserving order
-        allow_rules = list(dict.fromkeys(allow_rules))
-        deny_rules = list(dict.fromkeys(deny_rules))
+        Args:
+            interval: Seconds between polls
+        """
+        self.interval = interval
+        self._mtimes: Dict[str, int] = {}
 
-        return (allow_rules, deny_rules)
+    def add(self, path: str, mtime_ns: int):
+        """Start watching a directory listed when its mtime was mtime_ns."""
+        self._mtimes[path] = mtime_ns
+
+    def remove(self, path: str):
+        """Stop watching a directory."""
+        self._mtimes.pop(path, None)
+
+    def wait(self, timeout: Optional[float] = None) -> Tuple[set, set]:
+        """
+        Wait one interval and report directories whose mtime changed.
+
+        Returns:
+            Tuple of (changed_directories, rebuild_directories); polling
+            never asks for subtree rebuilds
+        """
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+
+        changed = set()
+        for path, mtime_ns in list(self._mtimes.items()):
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime_ns:
+                changed.add(path)
+
+        return (changed, set())
+
+    def close(self):
+        """Release resources (nothing to do for polling)."""
+
+
+class InotifyBackend:
+    """
+    Change notification through Linux inotify, using ctypes (stdlib only).
+
+    Raises OSError on construction where inotify is unavailable, so callers
+    can fall back to PollingBackend.
+    """
+
+    name = 'inotify'
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ONLYDIR = 0x01000000
+
+    MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ONLYDIR
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    # Events arriving this soon after the first are handled in one batch
+    DEBOUNCE_SECONDS = 0.1
+
+    def __init__(self):
+        """Create an inotify instance."""
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify requires Linux')
+
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._paths: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+
+    def add(self, path: str, mtime_ns: int):
+        """Start watching a directory."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+
+        self._paths[wd] = path
+        self._watches[path] = wd
+
+    def remove(self, path: str):
+        """Stop watching a directory."""
+        wd = self._watches.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def wait(self, timeout: Optional[float] = None) -> Tuple[set, set]:
+        """
+        Block until events arrive and report the directories they touch.
+
+        Returns:
+            Tuple of (changed_directories, rebuild_directories)
+            - rebuild_directories: directories whose .gitignore was
+              rewritten, or every watched directory after a queue overflow
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return (set(), set())
+
+        time.sleep(self.DEBOUNCE_SECONDS)
+
+        data = b''
+        while True:
+            try:
+                chunk = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+
+        changed = set()
+        rebuild = set()
+        offset = 0
+
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + self.EVENT_HEADER.size:offset + self.EVENT_HEADER.size + length]
+            offset += self.EVENT_HEADER.size + length
+
+            if mask & self.IN_Q_OVERFLOW:
+                rebuild.update(self._watches)
+                continue
+
+            path = self._paths.get(wd)
+            if path is None:
+                continue
+
+            name = name.rstrip(b'\0')
+            if mask & self.IN_CLOSE_WRITE:
+                # Only rewritten ignore rules matter; file contents don't
+                if name == b'.gitignore':
+                    rebuild.add(path)
+            else:
+                changed.add(path)
+
+        return (changed, rebuild)
+
+    def close(self):
+        """Close the inotify instance."""
+        os.close(self._fd)
+
+
+class DetectionWatcher:
+    """
+    Keeps detection results current as files are created and deleted.
+
+    The tree is walked once; afterwards only directories reported as
+    changed by the backend are re-listed, and their old extension counts
+    are swapped for the new ones in a running total.
+    """
+
+    def __init__(self, detector: ProjectDetector, max_depth: int = 3, backend=None):
+        """
+        Initialize watcher.
+
+        Args:
+            detector: Detector configured for the watched directory
+            max_depth: Maximum directory depth to scan
+            backend: InotifyBackend/PollingBackend (inotify if available,
+                else polling)
+        """
+        self.detector = detector
+        self.max_depth = max_depth
+        self.backend = backend
+        self.stats = Counter(directories=0, entries=0)
+        self.dirs: Dict[str, Dict] = {}
+        self.totals = Counter()
+        self._last = None
+
+    def _add_tree(self, path: str, depth: int):
+        """List a directory and its subtree, registering each with the backend."""
+        pending = [(path, depth)]
+        while pending:
+            path, depth = pending.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            extensions, subdirs, names = self.detector._list_directory(
+                path, depth, self.max_depth, self.stats
+            )
+            self.dirs[path] = {
+                'depth': depth,
+                'extensions': extensions,
+                'subdirs': [subdir for subdir, _ in subdirs],
+                'names': names,
+            }
+            self.totals.update(extensions)
+
+            try:
+                self.backend.add(path, mtime_ns)
+            except OSError as e:
+                print(f"⚠️  Not watching {path}: {e}", file=sys.stderr)
+
+            pending.extend(subdirs)
+
+    def _remove_tree(self, path: str):
+        """Forget a directory and its subtree."""
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            record = self.dirs.pop(path, None)
+            if record is None:
+                continue
+
+            self.totals.subtract(record['extensions'])
+            self.backend.remove(path)
+            self.detector._ignores.pop(path, None)
+            pending.extend(record['subdirs'])
+
+    def refresh(self, path: str, rebuild: bool = False):
+        """
+        Re-list one changed directory and update the running totals.
+
+        Args:
+            path: Directory reported as changed
+            rebuild: Re-walk the whole subtree (its ignore rules changed)
+        """
+        record = self.dirs.get(path)
+        if record is None:
+            return
+
+        depth = record['depth']
+        if rebuild:
+            self._remove_tree(path)
+            self._add_tree(path, depth)
+            return
+
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return  # Gone; the parent's refresh drops the subtree
+
+        ignores = self.detector._ignores
+        old_ignore = ignores.get(path)
+        extensions, subdirs, names = self.detector._list_directory(
+            path, depth, self.max_depth, self.stats
+        )
+        self.totals.subtract(record['extensions'])
+        self.totals.update(extensions)
+
+        # A .gitignore appeared or vanished: subtrees may be pruned differently
+        new_ignore = ignores.get(path)
+        ignore_changed = (old_ignore and old_ignore[1]) != (new_ignore and new_ignore[1])
+
+        new_subdirs = [subdir for subdir, _ in subdirs]
+        for subdir in set(record['subdirs']) - set(new_subdirs):
+            self._remove_tree(subdir)
+
+        record.update(extensions=extensions, subdirs=new_subdirs, names=names)
+        try:
+            self.backend.add(path, mtime_ns)
+        except OSError as e:
+            # Unwatched, its counts would go stale: drop it from the totals
+            print(f"⚠️  Not watching {path}: {e}", file=sys.stderr)
+            self._remove_tree(path)
+            return
+
+        for subdir, subdir_depth in subdirs:
+            if ignore_changed:
+                self._remove_tree(subdir)
+            if subdir not in self.dirs:
+                self._add_tree(subdir, subdir_depth)
+
+    def result(self) -> Tuple[List[str], Dict[str, any]]:
+        """Current detection result, as detect_all would report it."""
+        root = self.dirs.get(self.detector._root, {'names': []})
+        return self.detector._combine_detections(
+            self.detector._match_indicators(root['names']),
+            +self.totals
+        )
+
+    def changed(self) -> Optional[Tuple[List[str], Dict[str, any]]]:
+        """Return the current result if it differs from the last one returned."""
+        detected, metadata = self.result()
+        key = (detected, metadata['indicators'])
+        if key == self._last:
+            return None
+
+        self._last = key
+        return (detected, metadata)
+
+    def watch(self, poll_interval: float = 1.0) -> Iterator[Tuple[List[str], Dict[str, any]]]:
+        """
+        Yield the detection result initially and whenever it changes.
+
+        Args:
+            poll_interval: Seconds between polls if inotify is unavailable
+
+        Yields:
+            Tuple of (detected_types, metadata)
+        """
+        if self.backend is None:
+            try:
+                self.backend = InotifyBackend()
+            except OSError:
+                self.backend = PollingBackend(poll_interval)
+
+        self.detector._begin_walk(self.stats)
+        try:
+            self._add_tree(self.detector._root, 0)
+            yield self.changed()
+
+            while True:
+                changed, rebuild = self.backend.wait()
+
+                # Parents first, so removed subtrees aren't refreshed
+                for path in sorted(rebuild, key=len):
+                    self.refresh(path, rebuild=True)
+                for path in sorted(changed - rebuild, key=len):
+                    self.refresh(path)
+
+                result = self.changed()
+                if result is not None:
+                    yield result
+        finally:
+            self.detector._end_walk()
+            self.backend.close()
+
+
+def run_watch(detector: ProjectDetector, args) -> int:
+    """
+    Print recommendations now and again whenever the detected types change.
+
+    Args:
+        detector: Detector for the watched directory
+        args: Parsed command line arguments
+
+    Returns:
+        Exit code
+    """
+    backend = PollingBackend(args.poll_interval) if args.poll else None
+    watcher = DetectionWatcher(detector, backend=backend)
+    announced = False
+
+    try:
+        for detected_types, metadata in watcher.watch(args.poll_interval):
+            if not args.json and not announced:
+                print(f"👀 Watching {detector.directory} ({watcher.backend.name}, Ctrl-C to stop)")
+                announced = True
+
+            output = {
+                'directory': str(detector.directory),
+                'detected_types': detected_types,
+                'metadata': metadata
+            }
+            if args.permissions:
+                allow, deny = detector.get_permissions_for_types(detected_types)
+                output['permissions'] = {
+                    'allowedTools': allow,
+                    'deny': deny
+                }
+
+            if args.json:
+                print(json.dumps(output), flush=True)
+                continue
+
+            stamp = datetime.now().strftime('%H:%M:%S')
+            summary = ', '.join(detected_types) if detected_types else 'no project type'
+            print(f"🔄 [{stamp}] Detected: {summary}", flush=True)
+            if args.permissions:
+                for rule in output['permissions']['allowedTools']:
+                    print(f"   + {rule}")
+                for rule in output['permissions']['deny']:
+                    print(f"   - {rule}")
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+# Per-process options of batch workers, set up once by _init_batch_worker
+_batch_options: Dict = {}
+
+
+def _init_batch_worker(options: Dict):
+    """Load templates once per worker process."""
+    global _batch_options
+    TemplateIndex.load()
+    _batch_options = options
+
+
+def _detect_repository(directory: str) -> Dict[str, any]:
+    """
+    Detect one repository inside a batch worker.
+
+    Args:
+        directory: Repository path
+
+    Returns:
+        JSON-serializable record with detection results and timing
+    """
+    start = time.perf_counter()
+    record = {'directory': directory}
+    options = dict(_batch_options)
+    permissions = options.pop('permissions', False)
+
+    try:
+        path = Path(directory).resolve()
+        if not path.is_dir():
+            raise NotADirectoryError(f"Not a directory: {path}")
+
+        detector = ProjectDetector(path, **options)
+        detected_types, metadata = detector.detect_all()
+        record['detected_types'] = detected_types
+        record['metadata'] = metadata
+
+        if permissions:
+            allow, deny = detector.get_permissions_for_types(detected_types)
+            record['permissions'] = {
+                'allowedTools': allow,
+                'deny': deny
+            }
+    except Exception as e:
+        record['error'] = str(e)
+
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return record
+
+
+def run_batch(directories: List[str], options: Dict, workers: int, output) -> int:
+    """
+    Detect many repositories across a process pool.
+
+    Python startup and template loading are paid once per worker rather
+    than once per repository. Records are written as JSON lines in
+    completion order. Nothing is written into the repositories: the
+    detection cache is off unless options ask for it, and then lives
+    under DetectionCache.DIRECTORY.
+
+    Args:
+        directories: Repository paths
+        options: ProjectDetector keyword arguments (plus 'permissions')
+        workers: Number of worker processes
+        output: Text stream receiving one JSON record per repository
+
+    Returns:
+        Exit code (1 if any repository failed)
+    """
+    start = time.perf_counter()
+    failed = 0
+    options = {'use_cache': False, **options}
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_batch_worker,
+        initargs=(options,)
+    ) as executor:
+        futures = [executor.submit(_detect_repository, d) for d in directories]
+        for future in as_completed(futures):
+            record = future.result()
+            if 'error' in record:
+                failed += 1
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+
+    elapsed = time.perf_counter() - start
+    rate = len(directories) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"📊 {len(directories)} repositories in {elapsed:.2f}s "
+        f"({rate:.1f}/s, {workers} workers, cache {'on' if options['use_cache'] else 'off'}, {failed} failed)",
+        file=sys.stderr
+    )
+
+    return 1 if failed else 0
+
+
+def run_workspace(detector: ProjectDetector, args) -> int:
+    """
+    Stream per-sub-project detection results for a monorepo.
+
+    Args:
+        detector: Detector for the workspace root
+        args: Parsed command line arguments
+
+    Returns:
+        Exit code
+    """
+    if not args.json:
+        print(f"📁 Scanning workspace: {detector.directory}")
+        print()
+
+    found = 0
+    for result in detector.iter_workspace():
+        found += 1
+        scope = result['path']
+
+        if args.permissions:
+            allow, deny = detector.get_permissions_for_types(result['detected_types'], scope=scope)
+            result['permissions'] = {
+                'allowedTools': allow,
+                'deny': deny
+            }
+
+        if args.json:
+            # One record per line (NDJSON) so consumers can start early
+            print(json.dumps(result), flush=True)
+            continue
+
+        print(f"📦 {scope}: {', '.join(result['detected_types'])}", flush=True)
+        if args.permissions:
+            for rule in result['permissions']['allowedTools']:
+                print(f"   + {rule}")
+            for rule in result['permissions']['deny']:
+                print(f"   - {rule}")
+            print()
+
+    if not found and not args.json:
+        print("❌ No project type detected")
+        return 1
+
+    return 0
 
 
 def main():
@@ -273,10 +2068,10 @@ def main():
 
     parser = argparse.ArgumentParser(description='Detect project type and recommend permissions')
     parser.add_argument(
-        'directory',
-        nargs='?',
-        default='.',
-        help='Directory to scan (default: current directory)'
+        'directories',
+        nargs='*',
+        metavar='directory',
+        help='Directory to scan (default: current directory); several with --batch'
     )
     parser.add_argument(
         '--json',
@@ -288,10 +2083,141 @@ def main():
         action='store_true',
         help='Output recommended permission rules'
     )
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Detect many repositories in parallel, writing one JSON line per repository'
+    )
+    parser.add_argument(
+        '--paths-from',
+        metavar='FILE',
+        help='With --batch: read repository paths from FILE, one per line (- for stdin)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar='N',
+        help='With --batch: number of worker processes (default: CPU count)'
+    )
+    parser.add_argument(
+        '--output',
+        metavar='FILE',
+        help='With --batch: write JSON lines to FILE instead of stdout'
+    )
+    parser.add_argument(
+        '--workspace',
+        action='store_true',
+        help='Detect each sub-project of a monorepo separately (NDJSON with --json)'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and re-detect whenever files are added or removed'
+    )
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='With --watch: poll directory mtimes instead of using inotify'
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=1.0,
+        metavar='SECONDS',
+        help='With --watch: seconds between polls (default: 1.0)'
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Reuse unchanged directory listings from ~/.cache/claude-permissions/ between runs'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help=argparse.SUPPRESS  # the default; kept so existing invocations still parse
+    )
+    parser.add_argument(
+        '--git-index',
+        action='store_true',
+        help='Enumerate tracked files from .git/index instead of walking the tree'
+    )
+    parser.add_argument(
+        '--no-gitignore',
+        action='store_true',
+        help='Walk directories even if .gitignore excludes them'
+    )
+    parser.add_argument(
+        '--sample',
+        action='store_true',
+        help='Stop counting files once the language ranking is statistically stable'
+    )
+    parser.add_argument(
+        '--file-budget',
+        type=int,
+        default=5000,
+        metavar='N',
+        help='Maximum files counted in --sample mode (default: 5000)'
+    )
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.99,
+        metavar='P',
+        help='Ranking confidence at which --sample stops early (default: 0.99)'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Scan the tree with N threads (default: 1, serial)'
+    )
 
     args = parser.parse_args()
 
-    directory = Path(args.directory).resolve()
+    if args.watch:
+        # The watcher lists and re-lists single directories itself
+        unsupported = [flag for flag, given in (('--jobs', args.jobs != 1),
+                                                ('--git-index', args.git_index),
+                                                ('--sample', args.sample)) if given]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --watch")
+
+    options = {
+        'jobs': args.jobs,
+        'use_cache': args.cache and not args.no_cache,
+        'use_git_index': args.git_index,
+        'respect_gitignore': not args.no_gitignore,
+        'sample': args.sample,
+        'file_budget': args.file_budget,
+        'confidence': args.confidence,
+    }
+
+    if args.batch:
+        directories = list(args.directories)
+        if args.paths_from:
+            stream = sys.stdin if args.paths_from == '-' else open(args.paths_from, 'r')
+            with stream:
+                directories.extend(line.strip() for line in stream if line.strip())
+
+        if not directories:
+            print("❌ No directories given for --batch", file=sys.stderr)
+            return 1
+
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            return run_batch(directories, {**options, 'permissions': args.permissions},
+                             max(1, args.workers), output)
+        finally:
+            if args.output:
+                output.close()
+
+    if len(args.directories) > 1:
+        print("❌ Multiple directories require --batch", file=sys.stderr)
+        return 1
+
+    directory = Path(args.directories[0] if args.directories else '.').resolve()
 
     if not directory.exists():
         print(f"❌ Directory not found: {directory}", file=sys.stderr)
@@ -301,7 +2227,14 @@ def main():
         print(f"❌ Not a directory: {directory}", file=sys.stderr)
         return 1
 
-    detector = ProjectDetector(directory)
+    detector = ProjectDetector(directory, **options)
+
+    if args.workspace:
+        return run_workspace(detector, args)
+
+    if args.watch:
+        return run_watch(detector, args)
+
     detected_types, metadata = detector.detect_all()
 
     if args.json:
@@ -323,6 +2256,12 @@ def main():
 
     # Human-readable output
     print(f"📁 Scanning: {directory}")
+    scan_stats = metadata['scan_stats']
+    if 'cache_hits' in scan_stats:
+        print(f"   Cache: {scan_stats['cache_hits']} hit(s), {scan_stats['cache_misses']} miss(es)")
+    if 'sampled_files' in scan_stats:
+        print(f"   Sampled {scan_stats['sampled_files']} file(s), "
+              f"ranking confidence {scan_stats['confidence']:.1%}")
     print()
 
     if not detected_types:
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Permission Query Client for Claude Code
+
+Sends detect, validate and evaluate queries to permission_daemon.py over
+its Unix domain socket. When no daemon is running the query is answered
+in this process instead, with the same results. The client itself only
+imports the standard library; the detection and validation modules are
+loaded on demand for the in-process fallback.
+
+Usage:
+    permission_client.py detect ~/src/app --permissions
+    permission_client.py validate ~/.claude/settings.json
+    permission_client.py evaluate Bash "npm test" --cwd ~/src/app
+    permission_client.py status
+    permission_client.py stop
+"""
+
+import sys
+import json
+import socket
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+
+SOCKET_PATH = Path.home() / '.claude' / 'permissions.sock'
+
+# Handler answering in-process when no daemon is running, built on first use
+_local_handler = None
+
+
+def connect(socket_path: Path, timeout: Optional[float]) -> Optional[socket.socket]:
+    """
+    Connect to a running daemon.
+
+    Args:
+        socket_path: Daemon socket
+        timeout: Socket timeout in seconds (None to block)
+
+    Returns:
+        Connected socket, or None if no daemon is listening
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def answer_locally(request: Dict) -> Dict:
+    """Answer a request in this process, as the daemon would."""
+    global _local_handler
+
+    if _local_handler is None:
+        from permission_daemon import QueryHandler
+        # Nothing up front: a one-off answer only loads what its command uses
+        _local_handler = QueryHandler(preload=False)
+
+    response = _local_handler.handle(request)
+    _local_handler.save()
+    return {**response, 'daemon': False}
+
+
+def query(request: Dict, socket_path: Path = SOCKET_PATH, timeout: Optional[float] = 60.0,
+          fallback: bool = True) -> Dict:
+    """
+    Send a request to the daemon, answering it in-process if none is running.
+
+    Args:
+        request: Request with a 'command' key
+        socket_path: Daemon socket
+        timeout: Seconds to wait for the daemon's answer
+        fallback: Answer in-process when the daemon is unreachable
+
+    Returns:
+        Response dictionary ('ok' plus 'result' or 'error'); 'daemon'
+        tells whether the daemon answered
+    """
+    sock = connect(socket_path, timeout)
+    if sock is not None:
+        try:
+            with sock:
+                sock.sendall(json.dumps(request).encode() + b'\n')
+                line = sock.makefile('rb').readline()
+            if line:
+                return {**json.loads(line), 'daemon': True}
+        except (OSError, ValueError):
+            pass
+
+    if not fallback:
+        return {'ok': False, 'error': f"No daemon listening on {socket_path}", 'daemon': False}
+    return answer_locally(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Query the permissions daemon (answers in-process if none is running)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s detect ~/src/app --permissions
+  %(prog)s validate ~/.claude/settings.json .claude/settings.json
+  %(prog)s evaluate Bash "git push" --cwd ~/src/app
+  %(prog)s stop
+        """
+    )
+    parser.add_argument(
+        '--socket',
+        type=Path,
+        default=SOCKET_PATH,
+        help='Unix socket path (default: ~/.claude/permissions.sock)'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Answer in this process even if a daemon is running'
+    )
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help='Report whether a daemon is running')
+    subparsers.add_parser('stop', help='Stop a running daemon')
+
+    detect = subparsers.add_parser('detect', help='Detect project type')
+    detect.add_argument('directory', nargs='?', default='.', help='Directory to scan')
+    detect.add_argument('--permissions', action='store_true', help='Include recommended permissions')
+    detect.add_argument('--cache', action='store_true',
+                        help='Reuse unchanged directory listings from ~/.cache/claude-permissions/')
+
+    validate = subparsers.add_parser('validate', help='Validate settings files')
+    validate.add_argument('files', nargs='+', help='Settings files')
+
+    evaluate = subparsers.add_parser('evaluate', help='Decide a tool call')
+    evaluate.add_argument('tool', help='Tool name, e.g. Bash or Read')
+    evaluate.add_argument('argument', nargs='?', default='', help='Tool argument (command, path, ...)')
+    evaluate.add_argument('--cwd', default='.', help='Project directory (default: current directory)')
+    evaluate.add_argument('--settings', action='append', metavar='FILE',
+                          help='Settings file to use instead of the project hierarchy')
+
+    args = parser.parse_args()
+    socket_path = args.socket.expanduser()
+
+    if args.command in ('status', 'stop'):
+        response = query({'command': 'ping' if args.command == 'status' else 'stop'},
+                         socket_path, 5.0, fallback=False)
+        if not response['ok']:
+            print(f"⚪ {response['error']}")
+            return 1
+        state = 'running' if args.command == 'status' else 'stopping'
+        print(f"🟢 Daemon {state} (pid {response['result']['pid']}) on {socket_path}")
+        return 0
+
+    # Paths are resolved here: the daemon has its own working directory
+    if args.command == 'detect':
+        requests = [{
+            'command': 'detect',
+            'directory': str(Path(args.directory).expanduser().resolve()),
+            'permissions': args.permissions,
+            'cache': args.cache,
+        }]
+    elif args.command == 'validate':
+        requests = [
+            {'command': 'validate', 'file': str(Path(path).expanduser().resolve())}
+            for path in args.files
+        ]
+    else:
+        request = {
+            'command': 'evaluate',
+            'tool': args.tool,
+            'argument': args.argument,
+            'cwd': str(Path(args.cwd).expanduser().resolve()),
+        }
+        if args.settings:
+            request['settings'] = [str(Path(path).expanduser().resolve()) for path in args.settings]
+        requests = [request]
+
+    exit_code = 0
+    for request in requests:
+        response = answer_locally(request) if args.no_daemon else query(request, socket_path)
+
+        if not response['ok']:
+            print(f"❌ {response['error']}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        print(json.dumps(response['result'], indent=2))
+        if args.command == 'validate' and not response['result']['valid']:
+            exit_code = 1
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Permission Query Daemon for Claude Code
+
+Serves detect, validate and evaluate queries from one long-lived process
+listening on a Unix domain socket, so project templates, security
+scanners, compiled rule sets and the validation cache stay loaded between
+calls. Query it with permission_client.py, which answers in-process when
+no daemon is running.
+
+Protocol: one JSON request per line, answered by one JSON line:
+    {"command": "evaluate", "tool": "Bash", "argument": "npm test", "cwd": "/repo"}
+    {"ok": true, "result": {"decision": "allow", "rule": "Bash(npm test)"}}
+
+Commands: ping, detect (directory, permissions, cache), validate (file),
+evaluate (tool and argument, or tool_name and tool_input; cwd or
+settings) and stop.
+
+Usage:
+    permission_daemon.py &
+    permission_daemon.py --socket /tmp/permissions.sock --no-cache
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from permission_client import SOCKET_PATH, connect
+from permission_engine import PermissionEngine
+from permission_hook import RuleSetCache, settings_sources, tool_argument
+
+# detect_project and validate_config are imported by the queries that use
+# them, so an in-process evaluate (permission_client.py) never loads them
+
+
+class QueryHandler:
+    """
+    Answers daemon queries, holding the state that is kept warm between them.
+
+    Compiled rule sets are kept per list of settings files and rebuilt when
+    one of the files changes (mtime/size), like the hook's on-disk cache.
+    Detection results are kept per directory in an in-memory DetectionCache
+    and revalidated directory by directory (mtime/inode) on every query,
+    so an unchanged tree is only stat()ed.
+    """
+
+    # Seconds between writes of new validation results
+    SAVE_INTERVAL = 30.0
+
+    # Directories whose detection results are kept warm (least recently
+    # queried ones are dropped beyond this)
+    MAX_DETECTIONS = 64
+
+    def __init__(self, use_cache: bool = True, preload: bool = True):
+        """
+        Initialize handler.
+
+        Args:
+            use_cache: Reuse and record validation results in ValidationCache
+            preload: Load reference data, scanners and the validation cache
+                up front; otherwise each is loaded by the first query that
+                needs it (a one-off answer only pays for its own command)
+        """
+        self.use_cache = use_cache
+        self.validation_cache = None
+        self.validation_loaded = False
+
+        self.engines: Dict[Tuple[str, ...], Tuple[List, PermissionEngine]] = {}
+        self.detections: Dict[Tuple[str, bool], Tuple[threading.Lock, object]] = {}
+        self.lock = threading.RLock()
+        self.saved_at = time.monotonic()
+
+        if preload:
+            from detect_project import TemplateIndex
+            from validate_config import PermissionValidator
+
+            # Load reference data and build the security scanners up front
+            self._load_validation_cache()
+            TemplateIndex.load()
+            PermissionValidator.security_scanner()
+            PermissionValidator.coverage_scanner()
+
+    def _load_validation_cache(self):
+        """Load the validation cache the first time it is needed."""
+        with self.lock:
+            if self.validation_loaded:
+                return
+            if self.use_cache:
+                from validate_config import ValidationCache
+
+                self.validation_cache = ValidationCache()
+                self.validation_cache.load()
+            self.validation_loaded = True
+
+    def handle(self, request: Dict) -> Dict:
+        """
+        Answer one request.
+
+        Args:
+            request: Parsed request with a 'command' key
+
+        Returns:
+            {'ok': True, 'result': ...} or {'ok': False, 'error': message}
+        """
+        commands = {
+            'ping': self.ping,
+            'detect': self.detect,
+            'validate': self.validate,
+            'evaluate': self.evaluate,
+        }
+
+        name = request.get('command') if isinstance(request, dict) else None
+        command = commands.get(name)
+        if command is None:
+            return {'ok': False, 'error': f"Unknown command: {name!r}"}
+
+        try:
+            return {'ok': True, 'result': command(request)}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    def ping(self, request: Dict) -> Dict:
+        """Process id of the answering process."""
+        return {'pid': os.getpid()}
+
+    def detect(self, request: Dict) -> Dict:
+        """
+        Detect the project type of request['directory'].
+
+        Results are kept in memory between queries. The detection cache
+        file under ~/.cache/claude-permissions/ is only read and written
+        when request['cache'] is true; nothing is written to the project.
+        """
+        from detect_project import DetectionCache, ProjectDetector
+
+        directory = Path(request.get('directory') or '.').expanduser().resolve()
+        if not directory.is_dir():
+            raise NotADirectoryError(f"Not a directory: {directory}")
+
+        key = (str(directory), bool(request.get('cache', False)))
+        with self.lock:
+            entry = self.detections.pop(key, None)
+            if entry is None:
+                cache = DetectionCache(DetectionCache.path_for(directory) if key[1] else None, {'gitignore': True})
+                cache.load()
+                entry = (threading.Lock(), cache)
+            # Reinserted last: the dict is kept in least recently used order
+            self.detections[key] = entry
+            while len(self.detections) > self.MAX_DETECTIONS:
+                del self.detections[next(iter(self.detections))]
+
+        # One walk at a time per directory; the cache records a single walk
+        with entry[0]:
+            detector = ProjectDetector(directory, cache=entry[1])
+            detected_types, metadata = detector.detect_all()
+        result = {
+            'directory': str(directory),
+            'detected_types': detected_types,
+            'metadata': metadata,
+        }
+
+        if request.get('permissions'):
+            allow, deny = detector.get_permissions_for_types(detected_types)
+            result['permissions'] = {
+                'allowedTools': allow,
+                'deny': deny
+            }
+        return result
+
+    def validate(self, request: Dict) -> Dict:
+        """Validate the settings file request['file']."""
+        from validate_config import PermissionValidator
+
+        # The validation cache is shared by all connections
+        self._load_validation_cache()
+        with self.lock:
+            validator = PermissionValidator(self.validation_cache)
+            valid = validator.validate_settings_file(Path(request['file']).expanduser())
+            self._save_periodically()
+
+        return {
+            'file': request['file'],
+            'valid': valid,
+            'errors': validator.errors,
+            'warnings': validator.warnings,
+            'info': validator.info,
+            'cached': validator.last_cached,
+        }
+
+    def evaluate(self, request: Dict) -> Dict:
+        """
+        Decide a tool call.
+
+        The call is given either as 'tool' and 'argument', or as a hook
+        event's 'tool_name' and 'tool_input'. Rules come from the settings
+        files in 'settings', or from the hierarchy of 'cwd'.
+        """
+        cwd = Path(request.get('cwd') or os.getcwd()).expanduser()
+        if request.get('settings'):
+            sources = [Path(path).expanduser() for path in request['settings']]
+        else:
+            sources = settings_sources(cwd)
+
+        tool = request.get('tool') or request.get('tool_name', '')
+        if 'tool_input' in request:
+            argument = tool_argument(tool, request['tool_input'] or {}, cwd)
+        else:
+            argument = request.get('argument', '')
+
+        decision, rule = self.engine(sources).evaluate(tool, argument)
+        return {'decision': decision, 'rule': rule}
+
+    def engine(self, sources: List[Path]) -> PermissionEngine:
+        """Compiled rule set of settings files, rebuilt if any changed."""
+        cache = RuleSetCache(sources)
+        key = tuple(str(path) for path in sources)
+        signature = cache.signature()
+
+        entry = self.engines.get(key)
+        if entry is None or entry[0] != signature:
+            entry = self.engines[key] = (signature, cache.build())
+        return entry[1]
+
+    def _save_periodically(self):
+        if time.monotonic() - self.saved_at >= self.SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """Write new validation results."""
+        with self.lock:
+            if self.validation_cache is not None:
+                self.validation_cache.save()
+            self.saved_at = time.monotonic()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads JSON lines from a connection and answers each of them."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Invalid request: {e}"}
+            else:
+                if isinstance(request, dict) and request.get('command') == 'stop':
+                    response = {'ok': True, 'result': {'pid': os.getpid()}}
+                    # shutdown() blocks until serve_forever returns; answer
+                    # first and let another thread stop the server
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    response = self.server.queries.handle(request)
+
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+
+def serve(socket_path: Path = SOCKET_PATH, use_cache: bool = True) -> int:
+    """
+    Run the daemon until stopped.
+
+    Args:
+        socket_path: Unix socket to listen on
+        use_cache: Reuse and record validation results in ValidationCache
+
+    Returns:
+        Exit code
+    """
+    if not hasattr(socketserver, 'UnixStreamServer'):
+        print("❌ Unix domain sockets are not available on this platform", file=sys.stderr)
+        return 1
+
+    if socket_path.exists():
+        sock = connect(socket_path, 1.0)
+        if sock is not None:
+            sock.close()
+            print(f"❌ Daemon already running on {socket_path}", file=sys.stderr)
+            return 1
+        # Left behind by a daemon that did not shut down cleanly
+        socket_path.unlink()
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    queries = QueryHandler(use_cache)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    # Only the owner may query: answers reveal project layout and settings
+    umask = os.umask(0o177)
+    try:
+        server = Server(str(socket_path), _RequestHandler)
+    finally:
+        os.umask(umask)
+    server.queries = queries
+
+    print(f"🔌 Listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queries.save()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
+
+    print("👋 Daemon stopped", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Long-lived daemon answering detect/validate/evaluate queries'
+    )
+    parser.add_argument(
+        '--socket',
+        type=Path,
+        default=SOCKET_PATH,
+        help='Unix socket path (default: ~/.claude/permissions.sock)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not use the validation cache'
+    )
+
+    args = parser.parse_args()
+    return serve(args.socket.expanduser(), not args.no_cache)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
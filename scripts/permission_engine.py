@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""
+Permission Decision Engine for Claude Code
+
+Compiles allowedTools and deny rules into per-tool matchers and answers
+whether a tool call would be allowed, denied, or need a prompt.
+
+Deny rules win over allow rules, and a call that neither list matches is
+'ask'. When several rules of the deciding list match, the one listed
+first is reported. Patterns follow the tool-specific syntax described in
+rule_patterns.py.
+
+Arguments are decided the way Claude Code sees them, not as raw strings:
+a Bash command is split into its subcommands (at &&, ||, ;, |, &,
+newlines, $(...), `...` and subshells), and is denied if any of them is
+denied but allowed only if all of them are. Each subcommand is matched
+as shell words (normalize_command in rule_patterns.py), so 'npm  "publish"'
+is 'npm publish'; one whose words depend on an expansion ('npm $CMD') is
+only allowed by a rule naming it exactly. File paths are normalized
+('src/../secrets/k' is 'secrets/k'), and a path leaving the project
+('../x') is never allowed. Callers pass the raw command or path.
+
+Usage:
+    permission_engine.py ~/.claude/settings.json Bash "npm test"
+    permission_engine.py .claude/settings.json Read src/app.py --json
+
+    from permission_engine import PermissionEngine
+
+    engine = PermissionEngine(['Bash(npm:*)'], ['Bash(npm publish:*)'])
+    engine.evaluate('Bash', 'npm publish')   # -> ('deny', 'Bash(npm publish:*)')
+"""
+
+import re
+import sys
+import json
+import argparse
+import posixpath
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from rule_patterns import (
+    PATH_TOOLS, GlobPattern, command_words, compile_pattern, normalize_command, parse_rule
+)
+
+
+def glob_regex(glob: GlobPattern) -> str:
+    """
+    Translate a compiled rule pattern into an equivalent regular expression.
+
+    Mirrors the tokenization of GlobPattern._build so the regex accepts
+    exactly the strings the automaton does.
+
+    Args:
+        glob: Compiled pattern
+
+    Returns:
+        Regex source (to be used with re.DOTALL and fullmatch)
+    """
+    source = glob.source
+    paths = glob.paths
+    parts = []
+    index = 0
+    length = len(source)
+
+    while index < length:
+        char = source[index]
+
+        if char == '*':
+            end = index
+            while end < length and source[end] == '*':
+                end += 1
+            crosses = not paths or end - index > 1
+
+            if paths and crosses and source.startswith('/', end):
+                # '**/' matches zero or more whole directories
+                parts.append('(?:.*/)?')
+                index = end + 1
+            else:
+                parts.append('.*' if crosses else '[^/]*')
+                index = end
+            continue
+
+        if char == '?':
+            parts.append('[^/]' if paths else '.')
+            index += 1
+        elif char == '[' and ']' in source[index + 2:]:
+            close = source.index(']', index + 2)
+            body = source[index + 1:close]
+            negated = body[:1] in ('!', '^')
+            if negated:
+                body = body[1:]
+
+            members = set()
+            position = 0
+            while position < len(body):
+                if position + 2 < len(body) and body[position + 1] == '-':
+                    low, high = ord(body[position]), ord(body[position + 2])
+                    members.update(chr(code) for code in range(low, min(high, low + 255) + 1))
+                    position += 3
+                else:
+                    members.add(body[position])
+                    position += 1
+
+            # In path patterns no character class ever matches '/'
+            if paths:
+                if negated:
+                    members.add('/')
+                else:
+                    members.discard('/')
+
+            escaped = ''.join(re.escape(member) for member in sorted(members))
+            if negated:
+                parts.append(f'[^{escaped}]' if escaped else '.')
+            else:
+                parts.append(f'[{escaped}]' if escaped else '(?!)')
+            index = close + 1
+        else:
+            parts.append(re.escape(char))
+            index += 1
+
+    return ''.join(parts)
+
+
+# Characters that may make a command more than one simple command
+_COMPOUND_CHARS = re.compile(r'[;&|\n`$(){}!]')
+
+# Leading words that do not change which program a subcommand runs
+_COMMAND_PREFIXES = {'{', '}', '(', ')', '!', 'if', 'then', 'else', 'elif', 'fi',
+                     'while', 'until', 'do', 'done', 'time'}
+
+# Leading variable assignments ('FOO=1 cmd')
+_ASSIGNMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=[^\s\'"`$;&|()]*\s+')
+
+
+def _simple_command(text: str) -> str:
+    """Strip whitespace, grouping keywords and variable assignments from a subcommand."""
+    text = text.strip()
+    while text:
+        word, _, rest = text.partition(' ')
+        if word in _COMMAND_PREFIXES:
+            text = rest.strip()
+            continue
+        match = _ASSIGNMENT.match(text)
+        if match:
+            text = text[match.end():]
+            continue
+        break
+    # A subshell group's contents are subcommands of their own
+    if text.startswith('(') and text.endswith(')'):
+        return ''
+    return text
+
+
+def split_command(command: str) -> List[str]:
+    """
+    Split a shell command into the simple commands it runs.
+
+    Splits at &&, ||, ;, |, & and newlines, and treats the contents of
+    $(...), `...`, <(...), >(...) and (...) subshells as commands of their
+    own (the enclosing command keeps them as written). Single-quoted text
+    is never split; inside double quotes only substitutions are.
+
+    Args:
+        command: Bash command line
+
+    Returns:
+        Non-empty subcommands in order of appearance
+    """
+    if not _COMPOUND_CHARS.search(command):
+        simple = _simple_command(command)
+        return [simple] if simple else []
+
+    segments: List[str] = []
+    # One open command per nesting level: [text, closing char, in double quotes]
+    stack = [[[], None, False]]
+    index = 0
+    length = len(command)
+
+    def finish(level):
+        segments.append(''.join(level[0]))
+        level[0] = []
+
+    def append(text, levels=None):
+        for level in stack if levels is None else levels:
+            level[0].append(text)
+
+    while index < length:
+        char = command[index]
+        level = stack[-1]
+        quoted = level[2]
+
+        if char == '\\':
+            append(command[index:index + 2])
+            index += 2
+            continue
+
+        if char == "'" and not quoted:
+            end = command.find("'", index + 1)
+            end = length if end < 0 else end + 1
+            append(command[index:end])
+            index = end
+            continue
+
+        if char == '"':
+            level[2] = not quoted
+            append(char)
+            index += 1
+            continue
+
+        # Arithmetic expansion runs nothing
+        if command.startswith('$((', index):
+            end = command.find('))', index)
+            end = length if end < 0 else end + 2
+            append(command[index:end])
+            index = end
+            continue
+
+        # Substitutions run commands, inside double quotes too
+        two = command[index:index + 2]
+        if two in ('$(', '<(', '>('):
+            append(two)
+            stack.append([[], ')', False])
+            index += 2
+            continue
+        if char == '`':
+            if level[1] == '`':
+                finish(stack.pop())
+                append(char)
+            else:
+                append(char)
+                stack.append([[], '`', False])
+            index += 1
+            continue
+
+        if quoted:
+            append(char)
+            index += 1
+            continue
+
+        if char == '(':
+            append(char)
+            stack.append([[], ')', False])
+            index += 1
+            continue
+        if char == ')' and level[1] == ')':
+            finish(stack.pop())
+            append(char)
+            index += 1
+            continue
+
+        # Separators end the current command; enclosing ones keep them verbatim
+        if two in ('&&', '||', ';;', '|&'):
+            finish(level)
+            append(two, stack[:-1])
+            index += 2
+            continue
+        if char in ';|\n' or (char == '&' and command[index - 1:index] not in ('>', '<')
+                               and command[index + 1:index + 2] != '>'):
+            finish(level)
+            append(char, stack[:-1])
+            index += 1
+            continue
+
+        append(char)
+        index += 1
+
+    while stack:
+        finish(stack.pop())
+
+    return [simple for simple in map(_simple_command, segments) if simple]
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize a file path argument lexically.
+
+    Args:
+        path: Path as given to a file tool, relative to the project or absolute
+
+    Returns:
+        Path without '.', '..' or repeated '/' segments ('' stays ''); a
+        relative result starting with '..' leaves the project
+    """
+    if not path:
+        return path
+    return posixpath.normpath(path)
+
+
+def escapes_project(path: str) -> bool:
+    """Whether a normalized relative path points outside the project."""
+    return path == '..' or path.startswith('../')
+
+
+class ToolMatcher:
+    """
+    The rules of one list (allow or deny) for one tool, split by how they
+    can be matched: bare tool names, exact arguments, argument prefixes and
+    general globs. Globs are grouped by their literal prefix into one
+    combined regex per group, so an argument is only run against the
+    regexes of groups whose prefix it starts with. Each group's regex is
+    compiled the first time an argument reaches it.
+
+    Positions refer to the rule's index in its list, so the earliest
+    matching rule can be reported whichever matcher finds it.
+    """
+
+    def __init__(self, tool: str):
+        """
+        Initialize matcher.
+
+        Args:
+            tool: Tool the rules belong to
+        """
+        self.tool = tool
+        self.paths = tool in PATH_TOOLS
+        self.broad: Optional[int] = None
+        self.literals: Dict[str, int] = {}
+
+        # Prefix rules hashed by prefix length; a lookup probes one slice
+        # of the argument per distinct length
+        self.prefixes: Dict[int, Dict[str, int]] = {}
+        self.lengths: List[int] = []
+
+        self.globs: Dict[str, List[Tuple[int, str]]] = {}
+        self.regexes: Dict[int, Dict[str, list]] = {}
+        self.glob_lengths: List[int] = []
+
+    def add(self, pattern: str, position: int):
+        """
+        Add a rule pattern.
+
+        Args:
+            pattern: Pattern inside the rule's parentheses ('' for bare rules)
+            position: Index of the rule in its list (added in increasing order)
+        """
+        if not pattern.strip():
+            if self.broad is None:
+                self.broad = position
+            return
+
+        glob = compile_pattern(self.tool, pattern)
+        if glob.literal:
+            self.literals.setdefault(glob.source, position)
+            return
+
+        # A pattern that is a literal followed only by a directory-crossing
+        # '*' matches exactly the arguments starting with that literal
+        rest = glob.source[len(glob.prefix):]
+        if rest.strip('*') == '' and (not self.paths or len(rest) > 1):
+            self.prefixes.setdefault(len(glob.prefix), {}).setdefault(glob.prefix, position)
+            return
+
+        self.globs.setdefault(glob.prefix, []).append((position, glob_regex(glob)))
+
+    def compile(self):
+        """Finish construction once every rule has been added."""
+        self.lengths = sorted(self.prefixes)
+
+        for prefix, globs in self.globs.items():
+            # Alternatives are tried in order, so the match is the
+            # earliest rule of the group
+            source = '|'.join(f'(?P<r{position}>{regex})' for position, regex in globs)
+            self.regexes.setdefault(len(prefix), {})[prefix] = [globs[0][0], source]
+        self.glob_lengths = sorted(self.regexes)
+
+    def to_dict(self) -> Dict:
+        """
+        Compiled form as plain dicts, lists, strings and integers (suitable
+        for marshal), restored with from_dict() without re-parsing rules.
+        """
+        return {
+            'tool': self.tool,
+            'broad': self.broad,
+            'literals': self.literals,
+            'prefixes': self.prefixes,
+            'regexes': {
+                length: {
+                    prefix: [first, regex if isinstance(regex, str) else regex.pattern]
+                    for prefix, (first, regex) in groups.items()
+                }
+                for length, groups in self.regexes.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ToolMatcher':
+        """Restore a matcher saved with to_dict()."""
+        matcher = cls(data['tool'])
+        matcher.broad = data['broad']
+        matcher.literals = data['literals']
+        matcher.prefixes = data['prefixes']
+        matcher.lengths = sorted(matcher.prefixes)
+        matcher.regexes = data['regexes']
+        matcher.glob_lengths = sorted(matcher.regexes)
+        return matcher
+
+    def match(self, argument: str) -> Optional[int]:
+        """
+        Find the earliest rule matching an argument.
+
+        Args:
+            argument: Tool argument (command, path, ...)
+
+        Returns:
+            Index of the rule in its list, or None if no rule matches
+        """
+        if self.paths and argument.startswith('./'):
+            argument = argument[2:]
+
+        best = self.broad
+
+        position = self.literals.get(argument)
+        if position is not None and (best is None or position < best):
+            best = position
+
+        size = len(argument)
+        for length in self.lengths:
+            if length > size:
+                break
+            position = self.prefixes[length].get(argument[:length])
+            if position is not None and (best is None or position < best):
+                best = position
+
+        for length in self.glob_lengths:
+            if length > size:
+                break
+            group = self.regexes[length].get(argument[:length])
+            if group is None or (best is not None and best < group[0]):
+                continue
+            regex = group[1]
+            if isinstance(regex, str):
+                regex = group[1] = re.compile(regex, re.DOTALL)
+            match = regex.fullmatch(argument)
+            if match is not None:
+                position = int(match.lastgroup[1:])
+                if best is None or position < best:
+                    best = position
+
+        return best
+
+
+class PermissionEngine:
+    """Decides tool calls against compiled allowedTools and deny lists."""
+
+    def __init__(self, allow_rules: List[str], deny_rules: List[str]):
+        """
+        Compile rule lists.
+
+        Args:
+            allow_rules: allowedTools rules
+            deny_rules: deny rules
+        """
+        self.allow_rules = list(allow_rules)
+        self.deny_rules = list(deny_rules)
+        self.allow = self._compile(self.allow_rules)
+        self.deny = self._compile(self.deny_rules)
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> 'PermissionEngine':
+        """
+        Build an engine from parsed settings JSON.
+
+        Args:
+            settings: Settings dictionary with an optional 'permissions' key
+        """
+        permissions = settings.get('permissions', {})
+        return cls(permissions.get('allowedTools', []), permissions.get('deny', []))
+
+    def tools(self) -> List[str]:
+        """Tools with at least one allow or deny rule."""
+        return sorted(set(self.allow) | set(self.deny))
+
+    def to_dict(self, tool: Optional[str] = None) -> Dict:
+        """
+        Compiled rule set as plain data (see ToolMatcher.to_dict).
+
+        Args:
+            tool: Only include this tool's rules; an engine restored from
+                the result decides calls of that tool alone
+        """
+        if tool is None:
+            return {
+                'allow_rules': self.allow_rules,
+                'deny_rules': self.deny_rules,
+                'allow': {name: matcher.to_dict() for name, matcher in self.allow.items()},
+                'deny': {name: matcher.to_dict() for name, matcher in self.deny.items()},
+            }
+
+        # Rule lists become {position: rule} so positions stay valid
+        return {
+            'allow_rules': {position: rule for position, rule in enumerate(self.allow_rules)
+                            if parse_rule(rule)[0] == tool},
+            'deny_rules': {position: rule for position, rule in enumerate(self.deny_rules)
+                           if parse_rule(rule)[0] == tool},
+            'allow': {tool: self.allow[tool].to_dict()} if tool in self.allow else {},
+            'deny': {tool: self.deny[tool].to_dict()} if tool in self.deny else {},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PermissionEngine':
+        """Restore an engine saved with to_dict()."""
+        engine = cls.__new__(cls)
+        engine.allow_rules = data['allow_rules']
+        engine.deny_rules = data['deny_rules']
+        engine.allow = {tool: ToolMatcher.from_dict(matcher) for tool, matcher in data['allow'].items()}
+        engine.deny = {tool: ToolMatcher.from_dict(matcher) for tool, matcher in data['deny'].items()}
+        return engine
+
+    @staticmethod
+    def _compile(rules: List[str]) -> Dict[str, ToolMatcher]:
+        matchers: Dict[str, ToolMatcher] = {}
+        for position, rule in enumerate(rules):
+            tool, pattern = parse_rule(rule)
+            matcher = matchers.get(tool)
+            if matcher is None:
+                matcher = matchers[tool] = ToolMatcher(tool)
+            matcher.add(pattern, position)
+
+        for matcher in matchers.values():
+            matcher.compile()
+        return matchers
+
+    def evaluate(self, tool: str, argument: str = '') -> Tuple[str, Optional[str]]:
+        """
+        Decide a tool call.
+
+        Bash commands are decided per subcommand and file paths after
+        normalization (see the module docstring).
+
+        Args:
+            tool: Tool name, e.g. 'Bash'
+            argument: Tool argument, e.g. the command or file path
+
+        Returns:
+            Tuple of (decision, rule): decision is 'allow', 'deny' or 'ask',
+            rule is the deciding rule (None for 'ask')
+        """
+        if tool == 'Bash' and argument:
+            return self._evaluate_command(argument)
+
+        if tool in PATH_TOOLS and argument:
+            argument = normalize_path(argument)
+            if escapes_project(argument):
+                decision, rule = self._evaluate_one(tool, argument)
+                return (decision, rule) if decision == 'deny' else ('ask', None)
+
+        return self._evaluate_one(tool, argument)
+
+    def _evaluate_command(self, command: str) -> Tuple[str, Optional[str]]:
+        """Decide a Bash command from its subcommands."""
+        segments = split_command(command)
+        if not segments:
+            return self._evaluate_one('Bash', command)
+
+        # Subcommands as shell words: (text, static)
+        words = []
+        for segment in segments:
+            parts, static = command_words(segment)
+            words.append((' '.join(parts), static))
+        whole = normalize_command(command)
+
+        matcher = self.deny.get('Bash')
+        if matcher is not None:
+            # The whole line too, for deny rules written against it
+            for text in (command, whole, *segments, *(text for text, _ in words)):
+                position = matcher.match(text)
+                if position is not None:
+                    return ('deny', self.deny_rules[position])
+
+        matcher = self.allow.get('Bash')
+        if matcher is None:
+            return ('ask', None)
+
+        # A compound command listed verbatim was allowed as a whole
+        position = matcher.literals.get(whole)
+        if position is not None and len(segments) > 1:
+            return ('allow', self.allow_rules[position])
+
+        rule = None
+        for text, static in words:
+            if static:
+                position = matcher.match(text)
+            else:
+                # What an expansion runs is unknown here: only a rule naming
+                # the text exactly, or all of Bash, allows it
+                position = matcher.literals.get(text)
+                if matcher.broad is not None and (position is None or matcher.broad < position):
+                    position = matcher.broad
+            if position is None:
+                return ('ask', None)
+            if rule is None:
+                rule = self.allow_rules[position]
+        return ('allow', rule)
+
+    def _evaluate_one(self, tool: str, argument: str) -> Tuple[str, Optional[str]]:
+        """Decide a single argument against the tool's deny, then allow rules."""
+        matcher = self.deny.get(tool)
+        if matcher is not None:
+            position = matcher.match(argument)
+            if position is not None:
+                return ('deny', self.deny_rules[position])
+
+        matcher = self.allow.get(tool)
+        if matcher is not None:
+            position = matcher.match(argument)
+            if position is not None:
+                return ('allow', self.allow_rules[position])
+
+        return ('ask', None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Decide a tool call against Claude Code permission settings',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ~/.claude/settings.json Bash "git push origin main"
+  %(prog)s .claude/settings.json Read src/app.py --json
+        """
+    )
+
+    parser.add_argument('settings', help='Settings file to evaluate against')
+    parser.add_argument('tool', help='Tool name, e.g. Bash or Read')
+    parser.add_argument('argument', nargs='?', default='', help='Tool argument (command, path, ...)')
+    parser.add_argument('--json', action='store_true', help='Output as JSON')
+
+    args = parser.parse_args()
+
+    try:
+        with open(Path(args.settings).expanduser(), 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read settings: {e}", file=sys.stderr)
+        return 2
+
+    decision, rule = PermissionEngine.from_settings(settings).evaluate(args.tool, args.argument)
+
+    if args.json:
+        print(json.dumps({'decision': decision, 'rule': rule}))
+    else:
+        icons = {'allow': '✅', 'deny': '🚫', 'ask': '❓'}
+        print(f"{icons[decision]} {decision}" + (f" ({rule})" if rule else ''))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
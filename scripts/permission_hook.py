@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+PreToolUse Permission Hook for Claude Code
+
+Decides tool calls from a PreToolUse hook using the merged allowedTools
+and deny rules of every settings file that applies to the project. The
+compiled rule set is kept under ~/.cache/claude-permissions/hook/ (never
+in ~/.claude) and rebuilt only when one of those settings files changes,
+so a call costs a few stat() calls, one unmarshal and a couple of
+dictionary lookups.
+
+Hook configuration (.claude/settings.json):
+    "hooks": {
+      "PreToolUse": [{
+        "matcher": "*",
+        "hooks": [{"type": "command", "command": "python3 /path/to/scripts/permission_hook.py"}]
+      }]
+    }
+
+Usage:
+    echo '{"tool_name": "Bash", "tool_input": {"command": "npm test"}, "cwd": "."}' | permission_hook.py
+    permission_hook.py --settings team.json --ask < event.json
+"""
+
+import os
+import gc
+import sys
+import json
+import struct
+import marshal
+import hashlib
+import argparse
+from pathlib import Path
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Union
+
+from cache_paths import cache_directory
+from permission_engine import PermissionEngine
+from rule_patterns import PATH_TOOLS
+
+
+def settings_sources(cwd: Path) -> List[Path]:
+    """
+    Settings files that apply to a project, highest priority first.
+
+    Args:
+        cwd: Project directory of the Claude Code session
+    """
+    return [
+        cwd / '.claude' / 'settings.local.json',
+        cwd / '.claude' / 'settings.json',
+        Path.home() / '.claude' / 'settings.json',
+        Path.home() / '.claude.json',
+    ]
+
+
+def tool_argument(tool: str, tool_input: Dict, cwd: Union[Path, str, None] = None) -> str:
+    """
+    Extract the argument rules are matched against from a tool call.
+
+    Args:
+        tool: Tool name
+        tool_input: Tool input from the hook event
+        cwd: Project directory; paths inside it are made relative
+
+    Returns:
+        Command for Bash, normalized path for file tools ('..' segments
+        resolved, so a path leaving the project keeps its leading '..'),
+        'domain:<host>' for WebFetch, the query for WebSearch and '' for
+        anything else
+    """
+    if tool == 'Bash':
+        return tool_input.get('command', '')
+
+    if tool in PATH_TOOLS:
+        path = tool_input.get('file_path') or tool_input.get('notebook_path') or ''
+        if not path:
+            return path
+        # Resolve '..' before stripping the project, so '<cwd>/src/../secrets/k'
+        # is matched as 'secrets/k' and '<cwd>/../x' stays outside it
+        path = os.path.normpath(path)
+        if cwd is not None and os.path.isabs(path) and os.path.isabs(str(cwd)):
+            root = os.path.join(os.path.normpath(str(cwd)), '')
+            if path.startswith(root):
+                path = path[len(root):]
+        return path
+
+    if tool == 'WebFetch':
+        host = urlsplit(tool_input.get('url', '')).hostname
+        return f"domain:{host}" if host else ''
+
+    if tool == 'WebSearch':
+        return tool_input.get('query', '')
+
+    return ''
+
+
+class RuleSetCache:
+    """
+    Compiled rule set of a list of settings files.
+
+    The cache records each source's modification time and size; any
+    difference (including a file appearing or disappearing) triggers a
+    rebuild from the settings files.
+
+    The file holds a small header followed by one segment per tool, so a
+    call only loads the rules of the tool being decided. Everything is
+    stored with marshal, which loads several times faster than JSON; its
+    format is specific to the Python version, so that is recorded too.
+    """
+
+    DIRECTORY = cache_directory() / 'hook'
+    VERSION = 3
+
+    # Header size prefix
+    LENGTH = struct.Struct('<I')
+
+    def __init__(self, sources: List[Path], directory: Optional[Path] = None):
+        """
+        Initialize rule set cache.
+
+        Args:
+            sources: Settings files, highest priority first
+            directory: Cache directory (default: ~/.cache/claude-permissions/hook)
+        """
+        self.sources = sources
+        key = hashlib.sha256('\0'.join(str(path) for path in sources).encode()).hexdigest()[:16]
+        self.path = (directory or self.DIRECTORY) / f'{key}.marshal'
+
+    def signature(self) -> List:
+        """Modification time and size of every source (None if missing)."""
+        signature = []
+        for path in self.sources:
+            try:
+                stat = path.stat()
+                signature.append([str(path), stat.st_mtime_ns, stat.st_size])
+            except OSError:
+                signature.append([str(path), None, None])
+        return signature
+
+    def load(self, signature: List, tool: str) -> Optional[PermissionEngine]:
+        """
+        Load the cached rules of one tool.
+
+        Args:
+            signature: Current signature() of the sources
+            tool: Tool to be decided
+
+        Returns:
+            Engine deciding calls of that tool, or None if the cache is
+            missing, unreadable or built from different sources
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                size, = self.LENGTH.unpack(f.read(self.LENGTH.size))
+                header = marshal.loads(f.read(size))
+                if not isinstance(header, dict) or header.get('version') != self.VERSION:
+                    return None
+                if header.get('python') != tuple(sys.version_info[:2]) or header.get('sources') != signature:
+                    return None
+
+                segment = header['segments'].get(tool)
+                if segment is None:
+                    return PermissionEngine([], [])
+                f.seek(segment[0])
+                return PermissionEngine.from_dict(marshal.loads(f.read(segment[1])))
+        except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error):
+            return None
+
+    def build(self) -> PermissionEngine:
+        """Compile the merged allowedTools and deny rules of all sources."""
+        allow_rules: List[str] = []
+        deny_rules: List[str] = []
+
+        for path in self.sources:
+            try:
+                with open(path, 'r') as f:
+                    settings = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Skipping {path}: {e}", file=sys.stderr)
+                continue
+
+            permissions = settings.get('permissions', {}) if isinstance(settings, dict) else {}
+            allow_rules.extend(permissions.get('allowedTools', []))
+            deny_rules.extend(permissions.get('deny', []))
+
+        return PermissionEngine(allow_rules, deny_rules)
+
+    def save(self, signature: List, engine: PermissionEngine):
+        """Write the compiled rule set, ignoring failures."""
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            segments = [(tool, marshal.dumps(engine.to_dict(tool))) for tool in engine.tools()]
+
+            def header(offset: int) -> bytes:
+                table = {}
+                for tool, data in segments:
+                    table[tool] = [offset, len(data)]
+                    offset += len(data)
+                return marshal.dumps({
+                    'version': self.VERSION,
+                    'python': tuple(sys.version_info[:2]),
+                    'sources': signature,
+                    'segments': table,
+                })
+
+            # Segment offsets depend on the header size; marshal writes
+            # small ints at a fixed width, so this settles at once
+            start = self.LENGTH.size
+            prefix = header(start)
+            while self.LENGTH.size + len(prefix) != start:
+                start = self.LENGTH.size + len(prefix)
+                prefix = header(start)
+
+            with open(tmp_path, 'wb') as f:
+                f.write(self.LENGTH.pack(len(prefix)))
+                f.write(prefix)
+                for _, data in segments:
+                    f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    def engine(self, tool: str) -> PermissionEngine:
+        """
+        Engine for deciding calls of a tool, rebuilt and saved if any
+        source changed.
+
+        Args:
+            tool: Tool to be decided
+        """
+        # Stat before reading, so an edit made while building shows up as
+        # a changed signature on the next call
+        signature = self.signature()
+        engine = self.load(signature, tool)
+        if engine is None:
+            engine = self.build()
+            self.save(signature, engine)
+        return engine
+
+
+def decide(event: Dict, sources: Optional[List[Path]] = None, cache_dir: Optional[Path] = None,
+           use_cache: bool = True, ask: bool = False) -> Optional[Dict]:
+    """
+    Decide a PreToolUse event.
+
+    Bash commands are decided per subcommand and file paths after
+    resolving '..' (see PermissionEngine.evaluate): a call is allowed only
+    if every part of it is.
+
+    Args:
+        event: Hook input (tool_name, tool_input, cwd)
+        sources: Settings files to use instead of the project's hierarchy
+        cache_dir: Directory for compiled rule sets
+        use_cache: Reuse the compiled rule set when sources are unchanged
+        ask: Also report 'ask' when no rule matches, instead of deferring
+            to Claude Code's own permission handling
+
+    Returns:
+        Hook output, or None to leave the decision to Claude Code
+    """
+    cwd = Path(event.get('cwd') or os.getcwd())
+    cache = RuleSetCache(sources if sources is not None else settings_sources(cwd), cache_dir)
+    tool = event.get('tool_name', '')
+    engine = cache.engine(tool) if use_cache else cache.build()
+    decision, rule = engine.evaluate(tool, tool_argument(tool, event.get('tool_input') or {}, cwd))
+
+    if decision == 'ask' and not ask:
+        return None
+
+    if decision == 'deny':
+        reason = f"Denied by rule '{rule}'"
+    elif decision == 'allow':
+        reason = f"Allowed by rule '{rule}'"
+    else:
+        reason = "No permission rule matches"
+
+    return {
+        'hookSpecificOutput': {
+            'hookEventName': 'PreToolUse',
+            'permissionDecision': decision,
+            'permissionDecisionReason': reason,
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='PreToolUse hook deciding tool calls from Claude Code permission settings'
+    )
+
+    parser.add_argument(
+        '--settings',
+        action='append',
+        type=Path,
+        metavar='FILE',
+        help='Settings file to use instead of the project hierarchy (can be used multiple times)'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        help='Directory for compiled rule sets (default: ~/.cache/claude-permissions/hook)'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Compile the settings on every call'
+    )
+
+    parser.add_argument(
+        '--ask',
+        action='store_true',
+        help="Answer 'ask' when no rule matches instead of deferring to Claude Code"
+    )
+
+    args = parser.parse_args()
+
+    # A hook process lives for one call; collecting cycles while the rule
+    # set is unmarshalled would only add latency
+    gc.disable()
+
+    try:
+        event = json.load(sys.stdin)
+    except ValueError as e:
+        print(f"❌ Invalid hook input: {e}", file=sys.stderr)
+        return 1
+
+    if not isinstance(event, dict):
+        print("❌ Invalid hook input: expected a JSON object", file=sys.stderr)
+        return 1
+
+    output = decide(event, args.settings, args.cache_dir, not args.no_cache, args.ask)
+    if output is not None:
+        print(json.dumps(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
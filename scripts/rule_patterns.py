@@ -0,0 +1,979 @@
+#!/usr/bin/env python3
+"""
+Rule Pattern Indexing for Claude Code Permissions
+
+Parses permission rules once into per-tool indexes, and compiles rule
+patterns into finite automata so overlap between two rules is decided
+exactly rather than guessed from their text.
+
+Pattern syntax depends on the tool:
+    Read/Write/Edit/NotebookEdit  gitignore-style paths: '*' and '?' stop
+                                  at '/', '**' crosses directories, and a
+                                  pattern without '/' matches at any depth
+    Bash                          '*' matches anything; a trailing ':*'
+                                  matches any command with that prefix;
+                                  whitespace, quotes and escapes are
+                                  normalized (see normalize_command)
+    Other tools                   '*' matches anything
+
+Usage:
+    from rule_patterns import RuleIndex, patterns_overlap
+
+    index = RuleIndex(['Bash(npm test)', 'Read(src/**)'])
+    index.exact_matches('Bash', 'npm test')
+    patterns_overlap('Write', 'src/**', '**/*.key')   # -> 'src/x.key'
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from collections import deque
+from typing import List, Dict, Iterator, Tuple, Optional, FrozenSet
+
+
+def parse_rule(rule: str) -> Tuple[str, str]:
+    """
+    Split a permission rule into its tool and pattern.
+
+    Args:
+        rule: Permission rule string, e.g. 'Bash(npm test)'
+
+    Returns:
+        Tuple of (tool, pattern); the pattern is '' for bare tool names
+    """
+    rule = rule.strip()
+    if '(' not in rule:
+        return (rule, '')
+    tool, pattern = rule.split('(', 1)
+    return (tool.strip(), pattern.rstrip(')'))
+
+
+PATH_TOOLS = {'Read', 'Write', 'Edit', 'NotebookEdit'}
+
+# Commands made of plain words separated by single spaces need no tokenizing
+_PLAIN_COMMAND = re.compile(r'[^\s\'"\\$`{}]+(?: [^\s\'"\\$`{}]+)*')
+
+# Characters a literal word is quoted for, so it reads back as one word
+# and is never mistaken for an expansion
+_UNSAFE_WORD = re.compile(r'[\s\'"\\$`]')
+
+
+def _quote_word(word: str) -> str:
+    """Quote a literal word if needed ('it's' -> 'it'\\''s')."""
+    if word and not _UNSAFE_WORD.search(word):
+        return word
+    return "'" + word.replace("'", "'\\''") + "'"
+
+
+def command_words(command: str) -> Tuple[List[str], bool]:
+    """
+    Split a simple command into words the way the shell reads it.
+
+    Whitespace runs separate words, and quotes and backslash escapes are
+    removed from literal words ('npm  "pub"\\lish' is ['npm', 'publish']);
+    a literal word that needs quoting to stay one word is re-quoted in a
+    single canonical way. Words whose text the shell only knows once it
+    runs them - with '$' (variables, $(...), $'...') or a backtick outside
+    single quotes, or brace expansion like 'a{b,c}' - are kept as written.
+
+    Args:
+        command: Simple command, e.g. one element of split_command() in
+            permission_engine.py, or a Bash rule pattern
+
+    Returns:
+        Tuple of (words, static); static is False if any word is an
+        expansion or a quote is left open
+    """
+    if _PLAIN_COMMAND.fullmatch(command):
+        return (command.split(' '), True)
+
+    words: List[str] = []
+    static = True
+    index = 0
+    length = len(command)
+
+    while index < length:
+        if command[index].isspace():
+            index += 1
+            continue
+
+        start = index
+        word: List[str] = []
+        expands = False
+        brace = -1
+        while index < length and not command[index].isspace():
+            char = command[index]
+            if char == '\\':
+                # Backslash-newline joins lines; anything else is taken literally
+                if command[index + 1:index + 2] != '\n':
+                    word.append(command[index + 1:index + 2])
+                index += 2
+            elif char == "'":
+                end = command.find("'", index + 1)
+                if end < 0:
+                    expands = True
+                    end = length
+                word.append(command[index + 1:end])
+                index = end + 1
+            elif char == '"':
+                index += 1
+                while index < length and command[index] != '"':
+                    char = command[index]
+                    if char == '\\' and command[index + 1:index + 2] in ('$', '`', '"', '\\', '\n'):
+                        if command[index + 1] != '\n':
+                            word.append(command[index + 1])
+                        index += 2
+                        continue
+                    if char in '$`':
+                        expands = True
+                    word.append(char)
+                    index += 1
+                if index >= length:
+                    expands = True
+                index += 1
+            else:
+                if char in '$`':
+                    expands = True
+                elif char == '{':
+                    brace = len(word)
+                elif char == '}' and brace >= 0:
+                    body = ''.join(word[brace:])
+                    if ',' in body or '..' in body:
+                        expands = True
+                word.append(char)
+                index += 1
+
+        if expands:
+            static = False
+            words.append(command[start:index])
+        else:
+            words.append(_quote_word(''.join(word)))
+
+    return (words, static)
+
+
+def normalize_command(command: str) -> str:
+    """
+    Canonical text of a simple command or Bash rule pattern.
+
+    Commands that run the same words normalize to the same text:
+    'npm  publish', 'npm\\tpublish', 'npm "publish"' and 'npm pub\\lish'
+    are all 'npm publish'. Bash rule patterns are compiled from this form
+    and commands are matched in it, so whitespace, quoting and escapes
+    cannot make a command slip past a rule.
+    """
+    return ' '.join(command_words(command)[0])
+
+
+def normalize_pattern(tool: str, pattern: str) -> str:
+    """
+    Canonical spelling of a rule pattern, the form rules are matched in.
+
+    Surrounding whitespace is dropped; Bash patterns are rewritten as
+    shell words (normalize_command) with 'cmd :*' as the equivalent
+    'cmd *', and path patterns lose leading './'. Two patterns with the
+    same canonical spelling match exactly the same arguments.
+
+    Args:
+        tool: Tool the pattern belongs to
+        pattern: Pattern text inside the rule's parentheses
+
+    Returns:
+        Canonical pattern ('' only for an empty or blank pattern)
+    """
+    pattern = pattern.strip()
+    if tool == 'Bash':
+        pattern = normalize_command(pattern)
+        if pattern.endswith(' :*'):
+            pattern = pattern[:-3] + ' *'
+    elif tool in PATH_TOOLS:
+        while pattern.startswith('./') and len(pattern) > 2:
+            pattern = pattern[2:]
+    return pattern
+
+
+# Characters tried first when an example needs a character that no
+# pattern mentions, so examples stay readable
+_FILLER_CHARS = 'xyzabcdefghijklmnopqrstuvw0123456789_'
+
+# Transition predicates of compiled patterns
+_ANY = ('any',)        # any character
+_SEGMENT = ('seg',)    # any character except '/'
+
+
+def _accepts(predicate: Tuple, char: str) -> bool:
+    """Return True if a transition predicate accepts a character."""
+    kind = predicate[0]
+    if kind == 'lit':
+        return char == predicate[1]
+    if kind == 'any':
+        return True
+    if kind == 'seg':
+        return char != '/'
+    # Character class: ('class', chars, negated, matches_slash)
+    if char == '/' and not predicate[3]:
+        return False
+    return (char in predicate[1]) != predicate[2]
+
+
+class GlobPattern:
+    """
+    A rule pattern compiled into a nondeterministic finite automaton.
+
+    States are numbered from 0 (start) to the accepting state, which is
+    always the last one. Use compile_pattern() rather than constructing
+    instances directly, so each distinct pattern is compiled only once.
+    Call build() before using the automaton directly.
+    """
+
+    def __init__(self, tool: str, pattern: str):
+        """
+        Compile a pattern.
+
+        Args:
+            tool: Tool the pattern belongs to (selects the syntax)
+            pattern: Pattern text inside the rule's parentheses
+        """
+        self.tool = tool
+        self.pattern = pattern
+        self.paths = tool in PATH_TOOLS
+        self.source = self._effective_pattern(pattern)
+
+        # Literal text every match starts/ends with, used to prune pairs
+        # that cannot overlap before running the automata
+        self.prefix = self._literal_prefix(self.source)
+        self.suffix = self._literal_prefix(self.source[::-1], reverse=True)[::-1]
+        if self.paths and self.suffix.startswith('/') and self.source[:-len(self.suffix)].endswith('**'):
+            self.suffix = self.suffix[1:]  # '**/' may match nothing at all
+
+        # Patterns without wildcards match exactly one string (their source)
+        self.literal = self.prefix == self.source
+
+        # The automaton itself is built on first use; most patterns in a
+        # large rule set are never compared against anything
+        self.edges: Optional[List[List[Tuple[Tuple, int]]]] = None
+
+    def build(self):
+        """Build the automaton if it hasn't been built yet."""
+        if self.edges is not None:
+            return
+
+        self.edges = [[]]
+        self.epsilon: List[List[int]] = [[]]
+        self.chars = set()
+
+        self._build(self.source)
+        self.accept = len(self.edges) - 1
+        self._closures = [self._closure_of(state) for state in range(len(self.edges))]
+
+        # Determinized lazily: each distinct state set gets a small integer
+        # id, with transitions memoized per (id, character)
+        self._ids: Dict[FrozenSet[int], int] = {}
+        self._sets: List[FrozenSet[int]] = []
+        self.accepting: List[bool] = []
+        self.moves: Dict[Tuple[int, str], int] = {}
+        self._next_chars: Dict[int, Optional[List[str]]] = {}
+
+        self.start = self._intern(self._closures[0])
+        self.dead = self._intern(frozenset())
+
+        self._universal: Dict[int, bool] = {}
+        self._shortest: Dict[int, str] = {}
+
+    def _effective_pattern(self, pattern: str) -> str:
+        """Rewrite tool-specific shorthand into plain glob syntax."""
+        pattern = normalize_pattern(self.tool, pattern)
+        if self.paths:
+            if pattern.startswith('./'):
+                pattern = pattern[2:]
+            if pattern.endswith('/'):
+                pattern += '**'
+            if pattern and '/' not in pattern:
+                pattern = '**/' + pattern
+        elif self.tool == 'Bash':
+            if pattern.endswith(':*'):
+                pattern = pattern[:-2] + '*'
+        return pattern
+
+    @staticmethod
+    def _literal_prefix(text: str, reverse: bool = False) -> str:
+        """Text before the first wildcard character."""
+        stops = '*?]' if reverse else '*?['
+        for index, char in enumerate(text):
+            if char in stops:
+                return text[:index]
+        return text
+
+    def _new_state(self) -> int:
+        self.edges.append([])
+        self.epsilon.append([])
+        return len(self.edges) - 1
+
+    def _build(self, source: str):
+        """Thompson-style construction; each token links the current state to a new one."""
+        current = 0
+        index = 0
+        length = len(source)
+
+        while index < length:
+            char = source[index]
+
+            if char == '*':
+                end = index
+                while end < length and source[end] == '*':
+                    end += 1
+                crosses = not self.paths or end - index > 1
+
+                if self.paths and crosses and source.startswith('/', end):
+                    # '**/' matches zero or more whole directories
+                    loop = self._new_state()
+                    after = self._new_state()
+                    self.epsilon[current].extend((after, loop))
+                    self.edges[loop].append((_ANY, loop))
+                    self.edges[loop].append((('lit', '/'), after))
+                    self.chars.add('/')
+                    current = after
+                    index = end + 1
+                    continue
+
+                self.edges[current].append((_ANY if crosses else _SEGMENT, current))
+                after = self._new_state()
+                self.epsilon[current].append(after)
+                current = after
+                index = end
+                continue
+
+            if char == '?':
+                predicate = _SEGMENT if self.paths else _ANY
+                index += 1
+            elif char == '[' and ']' in source[index + 2:]:
+                close = source.index(']', index + 2)
+                body = source[index + 1:close]
+                negated = body[:1] in ('!', '^')
+                if negated:
+                    body = body[1:]
+
+                members = set()
+                position = 0
+                while position < len(body):
+                    if position + 2 < len(body) and body[position + 1] == '-':
+                        low, high = ord(body[position]), ord(body[position + 2])
+                        members.update(chr(code) for code in range(low, min(high, low + 255) + 1))
+                        position += 3
+                    else:
+                        members.add(body[position])
+                        position += 1
+
+                self.chars.update(members)
+                predicate = ('class', frozenset(members), negated, not self.paths)
+                index = close + 1
+            else:
+                self.chars.add(char)
+                predicate = ('lit', char)
+                index += 1
+
+            after = self._new_state()
+            self.edges[current].append((predicate, after))
+            current = after
+
+    def _closure_of(self, state: int) -> FrozenSet[int]:
+        """States reachable from state through epsilon transitions."""
+        seen = {state}
+        pending = [state]
+        while pending:
+            for target in self.epsilon[pending.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+        return frozenset(seen)
+
+    def _intern(self, states: FrozenSet[int]) -> int:
+        """Return the id of a determinized state (a set of NFA states)."""
+        state_id = self._ids.get(states)
+        if state_id is None:
+            state_id = self._ids[states] = len(self._sets)
+            self._sets.append(states)
+            self.accepting.append(self.accept in states)
+        return state_id
+
+    def move(self, state_id: int, char: str) -> int:
+        """Determinized state after reading one character (subset construction)."""
+        key = (state_id, char)
+        result = self.moves.get(key)
+        if result is None:
+            targets = set()
+            for state in self._sets[state_id]:
+                for predicate, target in self.edges[state]:
+                    if _accepts(predicate, char):
+                        targets |= self._closures[target]
+            result = self.moves[key] = self._intern(frozenset(targets))
+        return result
+
+    def next_chars(self, state_id: int) -> Optional[List[str]]:
+        """
+        Characters with a transition out of a determinized state.
+
+        Returns:
+            Sorted literal characters, or None if a wildcard or character
+            class means any character may have one
+        """
+        try:
+            return self._next_chars[state_id]
+        except KeyError:
+            pass
+
+        chars = set()
+        for state in self._sets[state_id]:
+            for predicate, _ in self.edges[state]:
+                if predicate[0] != 'lit':
+                    chars = None
+                    break
+                chars.add(predicate[1])
+            if chars is None:
+                break
+
+        result = self._next_chars[state_id] = sorted(chars) if chars is not None else None
+        return result
+
+    def walk(self, text: str) -> int:
+        """Determinized state after reading text from the start."""
+        # The literal prefix is a chain of single-character states, so the
+        # state after k of its characters is simply state k
+        length = min(len(text), len(self.prefix))
+        while length and text[:length] != self.prefix[:length]:
+            length -= 1
+
+        state_id = self._intern(self._closures[length])
+        for char in text[length:]:
+            state_id = self.move(state_id, char)
+        return state_id
+
+    def universal(self, state_id: int) -> bool:
+        """Return True if every continuation from a state is accepted."""
+        result = self._universal.get(state_id)
+        if result is not None:
+            return result
+
+        alphabet = _alphabet(self)
+        seen = {state_id}
+        pending = [state_id]
+        result = True
+
+        while pending:
+            current = pending.pop()
+            if not self.accepting[current]:
+                result = False
+                break
+            for char in alphabet:
+                target = self.move(current, char)
+                if target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+
+        self._universal[state_id] = result
+        return result
+
+    def shortest_accepted(self, state_id: int) -> str:
+        """Shortest continuation accepted from a (live) state."""
+        result = self._shortest.get(state_id)
+        if result is not None:
+            return result
+
+        alphabet = _alphabet(self)
+        parents = {state_id: None}
+        pending = deque([state_id])
+        result = ''
+
+        while pending:
+            current = pending.popleft()
+            if self.accepting[current]:
+                text = []
+                while parents[current] is not None:
+                    current, char = parents[current]
+                    text.append(char)
+                result = ''.join(reversed(text))
+                break
+
+            chars = self.next_chars(current)
+            for char in (alphabet if chars is None else chars):
+                target = self.move(current, char)
+                if target != self.dead and target not in parents:
+                    parents[target] = (current, char)
+                    pending.append(target)
+
+        self._shortest[state_id] = result
+        return result
+
+    def matches(self, text: str) -> bool:
+        """Return True if the pattern matches the whole text."""
+        if self.literal:
+            return text == self.source
+
+        self.build()
+        state_id = self.start
+        dead = self.dead
+        for char in text:
+            # Characters the pattern never mentions all behave alike
+            if char not in self.chars and char != '/':
+                char = '\0'
+            state_id = self.move(state_id, char)
+            if state_id == dead:
+                return False
+        return self.accepting[state_id]
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(tool: str, pattern: str) -> GlobPattern:
+    """Compile a rule pattern, reusing earlier compilations."""
+    return GlobPattern(tool, pattern)
+
+
+def _alphabet(*patterns: GlobPattern) -> List[str]:
+    """
+    Characters worth trying when searching built automata.
+
+    Every character a pattern mentions, '/', plus one filler character
+    standing in for all the characters none of them mention.
+    """
+    mentioned = {'/'}
+    for glob in patterns:
+        mentioned |= glob.chars
+    filler = next((char for char in _FILLER_CHARS if char not in mentioned), '\0')
+    return sorted(mentioned) + [filler]
+
+
+def _advance(first: GlobPattern, second: GlobPattern, need_first: bool) -> Optional[Tuple[str, int, int]]:
+    """
+    Walk both automata through text every relevant string must start with.
+
+    Every string B accepts starts with B's literal prefix (and, when A
+    must accept too, with A's), so that stretch needs no searching.
+
+    Returns:
+        Tuple of (forced_text, state_a, state_b), or None if no string
+        can get past it
+    """
+    first.build()
+    second.build()
+
+    forced = second.prefix
+    if need_first:
+        if not _literals_compatible(first.prefix, second.prefix):
+            return None
+        if len(first.prefix) > len(forced):
+            forced = first.prefix
+
+    state_a = first.walk(forced)
+    state_b = second.walk(forced)
+
+    if state_b == second.dead or (need_first and state_a == first.dead):
+        return None
+    return (forced, state_a, state_b)
+
+
+def _search(first: GlobPattern, second: GlobPattern, start: Tuple[str, int, int],
+            need_first: bool, goal) -> Optional[str]:
+    """
+    Breadth-first search of the product of two determinized automata.
+
+    Args:
+        first: Automaton A
+        second: Automaton B (must stay alive on every explored path)
+        start: Result of _advance() for the two automata
+        need_first: Prune paths on which A has no states left
+        goal: Callable(a_accepts, b_accepts) -> bool
+
+    Returns:
+        Shortest text reaching a goal state, or None if none exists
+    """
+    alphabet = _alphabet(first, second)
+
+    accepting_a = first.accepting
+    accepting_b = second.accepting
+    moves_a = first.moves
+    moves_b = second.moves
+    dead_a = first.dead
+    dead_b = second.dead
+
+    forced, state_a, state_b = start
+    node = (state_a, state_b)
+    parents = {node: None}
+    pending = deque([node])
+
+    while pending:
+        node = pending.popleft()
+        state_a, state_b = node
+
+        if goal(accepting_a[state_a], accepting_b[state_b]):
+            text = []
+            while parents[node] is not None:
+                node, char = parents[node]
+                text.append(char)
+            return forced + ''.join(reversed(text))
+
+        # Only characters B can read keep the search alive
+        chars = second.next_chars(state_b)
+        if chars is None and need_first:
+            chars = first.next_chars(state_a)
+
+        for char in (alphabet if chars is None else chars):
+            next_b = moves_b.get((state_b, char))
+            if next_b is None:
+                next_b = second.move(state_b, char)
+            if next_b == dead_b:
+                continue
+
+            next_a = moves_a.get((state_a, char))
+            if next_a is None:
+                next_a = first.move(state_a, char)
+            if need_first and next_a == dead_a:
+                continue
+
+            successor = (next_a, next_b)
+            if successor not in parents:
+                parents[successor] = (node, char)
+                pending.append(successor)
+
+    return None
+
+
+@lru_cache(maxsize=65536)
+def patterns_overlap(tool: str, first: str, second: str) -> Optional[str]:
+    """
+    Decide whether two patterns of a tool match a common argument.
+
+    Returns:
+        The shortest argument both match, or None if they are disjoint
+    """
+    first_glob = compile_pattern(tool, first)
+    second_glob = compile_pattern(tool, second)
+
+    for literal, other in ((first_glob, second_glob), (second_glob, first_glob)):
+        if literal.literal:
+            return literal.source if other.matches(literal.source) else None
+
+    start = _advance(first_glob, second_glob, True)
+    if start is None:
+        return None
+
+    # Once one side accepts anything (e.g. 'src/**' past 'src/'), the
+    # answer depends only on the other side and is shared across pairs
+    forced, state_a, state_b = start
+    if first_glob.universal(state_a):
+        return forced + second_glob.shortest_accepted(state_b)
+    if second_glob.universal(state_b):
+        return forced + first_glob.shortest_accepted(state_a)
+
+    return _search(
+        first_glob, second_glob, start,
+        True, lambda a_accepts, b_accepts: a_accepts and b_accepts
+    )
+
+
+@lru_cache(maxsize=65536)
+def pattern_covers(tool: str, general: str, specific: str) -> bool:
+    """
+    Decide whether every argument matched by specific is matched by general.
+
+    Searches for an argument specific accepts and general rejects.
+    """
+    general_glob = compile_pattern(tool, general)
+    specific_glob = compile_pattern(tool, specific)
+
+    if specific_glob.literal:
+        return general_glob.matches(specific_glob.source)
+
+    start = _advance(general_glob, specific_glob, False)
+    if start is None:
+        return True
+
+    _, state_a, state_b = start
+    if general_glob.universal(state_a):
+        return True
+    if specific_glob.universal(state_b):
+        return False
+
+    return _search(
+        general_glob, specific_glob, start,
+        False, lambda a_accepts, b_accepts: b_accepts and not a_accepts
+    ) is None
+
+
+def rule_covers(tool: str, general: str, specific: str) -> bool:
+    """
+    Decide whether one rule of a tool matches everything another does.
+
+    Like pattern_covers, with '' standing for a bare tool rule, which
+    matches every argument.
+    """
+    if not general:
+        return True
+    if not specific:
+        glob = compile_pattern(tool, general)
+        if glob.prefix:
+            return False
+        glob.build()
+        return glob.universal(glob.start)
+    return pattern_covers(tool, general, specific)
+
+
+def _literals_compatible(first: str, second: str) -> bool:
+    """Return True if one string is a prefix of the other."""
+    return first.startswith(second) or second.startswith(first)
+
+
+class PrefixIndex:
+    """
+    Literal strings (such as pattern prefixes) indexed for prefix queries.
+
+    Answers "which stored keys are a prefix of this text, or have this
+    text as a prefix" without visiting unrelated keys: the former by
+    hashing each prefix of the text, the latter as a range of the sorted
+    keys, which is where a trie would find them too.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, int]] = []
+        self._keys: Optional[List[str]] = None
+        self._positions: List[int] = []
+        self._by_key: Dict[str, List[int]] = {}
+
+    def add(self, key: str, position: int):
+        """
+        Store a key.
+
+        Args:
+            key: Literal text to store
+            position: Value reported when the key is found
+        """
+        self._entries.append((key, position))
+        self._by_key.setdefault(key, []).append(position)
+        self._keys = None
+
+    def _range(self, text: str) -> Tuple[int, int]:
+        """Index range of sorted keys starting with text."""
+        if self._keys is None:
+            self._entries.sort()
+            self._keys = [key for key, _ in self._entries]
+            self._positions = [position for _, position in self._entries]
+        return (bisect_left(self._keys, text), bisect_left(self._keys, text + '\U0010ffff'))
+
+    def count(self, text: str) -> int:
+        """Number of positions compatible() would return."""
+        low, high = self._range(text)
+        by_key = self._by_key
+        return high - low + sum(len(by_key.get(text[:length], ())) for length in range(len(text)))
+
+    def compatible(self, text: str) -> List[List[int]]:
+        """
+        Positions of keys that are a prefix of text or extend it.
+
+        Returns:
+            Chunks of positions (some owned by the index; do not modify)
+        """
+        low, high = self._range(text)
+        chunks = [self._positions[low:high]]
+        by_key = self._by_key
+        for length in range(len(text)):
+            positions = by_key.get(text[:length])
+            if positions:
+                chunks.append(positions)
+        return chunks
+
+
+class ToolBucket:
+    """Rules of a single tool, indexed by pattern."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.positions: List[int] = []
+        self.exact: Dict[str, List[int]] = {}
+        self.broad: List[int] = []
+        self.globs: Dict[int, GlobPattern] = {}
+        self.prefixes = PrefixIndex()
+        self.suffixes = PrefixIndex()
+
+        # Patterns without a literal prefix, the only ones that can match
+        # every argument
+        self.unanchored: List[int] = []
+
+    def add(self, pattern: str, position: int):
+        """Index the rule at position with the given pattern."""
+        self.positions.append(position)
+        self.exact.setdefault(pattern, []).append(position)
+        if not pattern:
+            self.broad.append(position)
+            return
+
+        glob = compile_pattern(self.tool, pattern)
+        self.globs[position] = glob
+        self.prefixes.add(glob.prefix, position)
+        self.suffixes.add(glob.suffix[::-1], position)
+        if not glob.prefix:
+            self.unanchored.append(position)
+
+    def overlap_candidates(self, glob: GlobPattern) -> Iterator[int]:
+        """
+        Positions of non-empty-pattern rules that might overlap glob.
+
+        Two patterns can only match a common argument if their literal
+        prefixes agree and their literal suffixes agree; the index giving
+        fewer candidates is used and the other condition checked directly.
+        """
+        prefix = glob.prefix
+        suffix = glob.suffix
+
+        if self.prefixes.count(prefix) <= self.suffixes.count(suffix[::-1]):
+            chunks, by_prefix = self.prefixes.compatible(prefix), True
+        else:
+            chunks, by_prefix = self.suffixes.compatible(suffix[::-1]), False
+
+        globs = self.globs
+        for chunk in chunks:
+            for position in chunk:
+                other = globs[position]
+                if by_prefix:
+                    compatible = other.suffix.endswith(suffix) or suffix.endswith(other.suffix)
+                else:
+                    compatible = other.prefix.startswith(prefix) or prefix.startswith(other.prefix)
+                if compatible:
+                    yield position
+
+
+class RuleIndex:
+    """
+    Permission rules parsed once and bucketed by tool.
+
+    Each bucket offers exact-pattern hash lookup, the list of broad
+    (pattern-less) rules, and literal prefix/suffix indexes for finding the
+    rules whose pattern might overlap another. Rules are identified by
+    their position in the original list.
+    """
+
+    def __init__(self, rules: List[str]):
+        """
+        Build the index.
+
+        Args:
+            rules: Permission rule strings
+        """
+        self.rules = list(rules)
+        self.parsed: List[Tuple[str, str]] = []
+        self.buckets: Dict[str, ToolBucket] = {}
+
+        for position, rule in enumerate(self.rules):
+            tool, pattern = parse_rule(rule)
+            self.parsed.append((tool, pattern))
+
+            bucket = self.buckets.get(tool)
+            if bucket is None:
+                bucket = self.buckets[tool] = ToolBucket(tool)
+            bucket.add(pattern, position)
+
+    def bucket(self, tool: str) -> Optional[ToolBucket]:
+        """Return the bucket for a tool, or None if it has no rules."""
+        return self.buckets.get(tool)
+
+    def exact_matches(self, tool: str, pattern: str) -> List[int]:
+        """Positions of rules with exactly this tool and pattern."""
+        bucket = self.buckets.get(tool)
+        if bucket is None:
+            return []
+        return bucket.exact.get(pattern, [])
+
+    def covering(self, tool: str, pattern: str) -> List[int]:
+        """
+        Positions of rules matching everything that a rule matches.
+
+        Only rules that can overlap the given one are compared, found
+        through the bucket's prefix/suffix indexes (a rule matching
+        nothing at all is covered by anything, but is not reported).
+
+        Args:
+            tool: Tool of the rule
+            pattern: Pattern of the rule ('' for a bare tool rule)
+
+        Returns:
+            Sorted positions, including rules identical to the given one
+        """
+        bucket = self.buckets.get(tool)
+        if bucket is None:
+            return []
+
+        if not pattern:
+            candidates = bucket.unanchored
+        else:
+            candidates = bucket.overlap_candidates(compile_pattern(tool, pattern))
+
+        covering = list(bucket.broad)
+        for position in candidates:
+            if rule_covers(tool, self.parsed[position][1], pattern):
+                covering.append(position)
+        return sorted(covering)
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton finding many literal needles in one pass.
+
+    Scanning costs O(len(text) + hits) however many needles there are.
+    """
+
+    def __init__(self, needles: List[str]):
+        """
+        Build the automaton.
+
+        Args:
+            needles: Strings to search for; results refer to list positions
+        """
+        self.needles = list(needles)
+
+        # State 0 is the root; goto[state] maps a character to a state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+
+        for position, needle in enumerate(self.needles):
+            if not needle:
+                continue
+            state = 0
+            for char in needle:
+                target = self._goto[state].get(char)
+                if target is None:
+                    target = len(self._goto)
+                    self._goto[state][char] = target
+                    self._goto.append({})
+                    self._output.append([])
+                state = target
+            self._output[state].append(position)
+
+        # Failure links in breadth-first order; outputs of the failure state
+        # are merged in so scanning never has to follow output chains
+        self._fail = [0] * len(self._goto)
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, target in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[target] = link if link != target else 0
+                self._output[target] = self._output[target] + self._output[self._fail[target]]
+                pending.append(target)
+
+    def find_all(self, text: str) -> set:
+        """Return the positions of all needles occurring in text."""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Tool Call Replay Simulator for Claude Code Permissions
+
+Replays a JSONL log of tool calls against a candidate rule set and the
+current settings, and reports how each would have decided the calls and
+where they differ. The candidate is either settings files or a profile
+from assets/permission_profiles.json; a profile is merged into the
+current rules the way apply_permissions.py would add it.
+
+Log records are PreToolUse hook events ({"tool_name", "tool_input",
+"cwd"}) or plain {"tool", "argument"} objects, one per line. Logs are
+split into byte ranges that worker processes read and decide on their
+own, so memory stays constant however long the log is.
+
+Usage:
+    simulate_permissions.py calls.jsonl --profile development
+    simulate_permissions.py logs/*.jsonl --candidate new.json --current .claude/settings.json
+    simulate_permissions.py calls.jsonl --profile ci-cd --workers 8 --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from apply_permissions import PermissionManager
+from permission_engine import PermissionEngine
+from permission_hook import RuleSetCache, settings_sources, tool_argument
+
+
+# Bytes of log handed to a worker at a time
+CHUNK_BYTES = 4 << 20
+
+# Distinct calls whose decisions a worker remembers (logs repeat a lot)
+DECISION_CACHE_SIZE = 100_000
+
+
+def parse_call(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Extract the tool and argument of one log record.
+
+    Args:
+        line: JSON text of the record
+
+    Returns:
+        Tuple of (tool, argument), or None if the record is not a tool call
+    """
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+
+    if 'tool_name' in record:
+        tool = record['tool_name']
+        tool_input = record.get('tool_input')
+        if not isinstance(tool, str) or not isinstance(tool_input, dict):
+            return None
+        cwd = record.get('cwd')
+        argument = tool_argument(tool, tool_input, cwd if isinstance(cwd, str) else None)
+    elif 'tool' in record:
+        tool = record['tool']
+        argument = record.get('argument', '')
+    else:
+        return None
+
+    if not isinstance(tool, str) or not isinstance(argument, str):
+        return None
+    return (tool, argument)
+
+
+def iter_chunks(paths: List[Path], chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Split log files into byte ranges ending at line boundaries.
+
+    Args:
+        paths: Log files
+        chunk_bytes: Approximate size of each range
+
+    Yields:
+        Tuples of (file_index, chunk_index, offset, length)
+    """
+    for file_index, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            chunk_index = 0
+            while offset < size:
+                f.seek(min(offset + chunk_bytes, size))
+                if f.tell() < size:
+                    f.readline()
+                end = f.tell()
+                yield (file_index, chunk_index, offset, end - offset)
+                offset = end
+                chunk_index += 1
+
+
+# Per-process state of replay workers, set up once by _init_worker
+_engines: Tuple[Optional[PermissionEngine], Optional[PermissionEngine]] = (None, None)
+_paths: List[str] = []
+
+
+def _init_worker(paths: List[str], current: Tuple[List[str], List[str]], candidate: Tuple[List[str], List[str]]):
+    """Compile both rule sets once per worker process."""
+    global _engines, _paths
+    _engines = (PermissionEngine(*current), PermissionEngine(*candidate))
+    _paths = paths
+
+
+def _replay_chunk(file_index: int, chunk_index: int, offset: int, length: int, examples: int) -> Dict:
+    """
+    Decide every call in one byte range of a log.
+
+    Returns:
+        Chunk summary: line count, malformed records, decision transitions
+        (current, candidate) -> count, rules behind changed decisions, and
+        up to `examples` changed calls
+    """
+    current, candidate = _engines
+    with open(_paths[file_index], 'rb') as f:
+        f.seek(offset)
+        data = f.read(length).decode('utf-8', 'replace')
+
+    decisions: Dict[Tuple[str, str], Tuple] = {}
+    transitions: Counter = Counter()
+    rules: Counter = Counter()
+    samples = []
+    malformed = 0
+    # Records are separated by '\n' only: JSON text may contain other
+    # line separators such as U+2028
+    lines = data[:-1].split('\n') if data.endswith('\n') else data.split('\n')
+
+    for line_index, line in enumerate(lines):
+        if not line.strip():
+            continue
+
+        call = parse_call(line)
+        if call is None:
+            malformed += 1
+            continue
+
+        decided = decisions.get(call)
+        if decided is None:
+            if len(decisions) >= DECISION_CACHE_SIZE:
+                decisions.clear()
+            decided = decisions[call] = (current.evaluate(*call), candidate.evaluate(*call))
+
+        (before, before_rule), (after, after_rule) = decided
+        transitions[(before, after)] += 1
+        if before == after:
+            continue
+
+        # Blame the candidate rule that decided the call, or else the
+        # current rule the candidate no longer has
+        rules[('candidate', after_rule) if after_rule else ('current', before_rule)] += 1
+        if len(samples) < examples:
+            samples.append((file_index, chunk_index, line_index, call[0], call[1],
+                            before, before_rule, after, after_rule))
+
+    return {
+        'file_index': file_index,
+        'chunk_index': chunk_index,
+        'lines': len(lines),
+        'malformed': malformed,
+        'transitions': transitions,
+        'rules': rules,
+        'samples': samples,
+    }
+
+
+def simulate(paths: List[Path], current: Tuple[List[str], List[str]], candidate: Tuple[List[str], List[str]],
+             workers: int = 1, examples: int = 10, chunk_bytes: int = CHUNK_BYTES) -> Dict:
+    """
+    Replay logs against the current and candidate rule sets.
+
+    Args:
+        paths: JSONL log files
+        current: (allow, deny) rules in effect today
+        candidate: (allow, deny) rules under evaluation
+        workers: Number of worker processes (1 replays in-process)
+        examples: Changed calls to keep as examples (earliest in the logs)
+        chunk_bytes: Bytes of log per work item
+
+    Returns:
+        Summary with 'calls', 'malformed', 'current'/'candidate' decision
+        counts, 'transitions', 'rules' and 'examples'
+    """
+    names = [str(path) for path in paths]
+    transitions: Counter = Counter()
+    rules: Counter = Counter()
+    chunk_lines: Dict[Tuple[int, int], int] = {}
+    samples: List[Tuple] = []
+    malformed = 0
+
+    def merge(summary: Dict):
+        nonlocal samples, malformed
+        transitions.update(summary['transitions'])
+        rules.update(summary['rules'])
+        malformed += summary['malformed']
+        chunk_lines[(summary['file_index'], summary['chunk_index'])] = summary['lines']
+        if summary['samples']:
+            samples = sorted(samples + summary['samples'])[:examples]
+
+    chunks = iter_chunks(paths, chunk_bytes)
+    if workers == 1:
+        _init_worker(names, current, candidate)
+        for chunk in chunks:
+            merge(_replay_chunk(*chunk, examples))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(names, current, candidate)
+        ) as executor:
+            # A few chunks in flight per worker keeps them busy without
+            # queueing the whole log
+            pending = set()
+            for chunk in chunks:
+                if len(pending) >= workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        merge(future.result())
+                pending.add(executor.submit(_replay_chunk, *chunk, examples))
+            for future in pending:
+                merge(future.result())
+
+    # Line numbers of examples: lines in earlier chunks of the same file
+    def line_number(file_index: int, chunk_index: int, line_index: int) -> int:
+        return 1 + line_index + sum(chunk_lines[(file_index, index)] for index in range(chunk_index))
+
+    current_counts: Counter = Counter()
+    candidate_counts: Counter = Counter()
+    for (before, after), count in transitions.items():
+        current_counts[before] += count
+        candidate_counts[after] += count
+
+    return {
+        'calls': sum(transitions.values()),
+        'malformed': malformed,
+        'current': {decision: current_counts[decision] for decision in ('allow', 'deny', 'ask')},
+        'candidate': {decision: candidate_counts[decision] for decision in ('allow', 'deny', 'ask')},
+        'transitions': {
+            f"{before}->{after}": count
+            for (before, after), count in sorted(transitions.items()) if before != after
+        },
+        'rules': [
+            {'source': source, 'rule': rule, 'calls': count}
+            for (source, rule), count in rules.most_common()
+        ],
+        'examples': [
+            {
+                'file': names[file_index],
+                'line': line_number(file_index, chunk_index, line_index),
+                'tool': tool,
+                'argument': argument,
+                'current': {'decision': before, 'rule': before_rule},
+                'candidate': {'decision': after, 'rule': after_rule},
+            }
+            for file_index, chunk_index, line_index, tool, argument, before, before_rule, after, after_rule
+            in samples
+        ],
+    }
+
+
+def load_rules(paths: List[Path]) -> Tuple[List[str], List[str]]:
+    """Merged (allow, deny) rules of settings files, highest priority first."""
+    engine = RuleSetCache(paths).build()
+    return (engine.allow_rules, engine.deny_rules)
+
+
+def print_report(summary: Dict, elapsed: float, workers: int, rules: int):
+    """Print a human-readable simulation summary."""
+    calls = summary['calls']
+    rate = calls / elapsed if elapsed > 0 else 0.0
+    print(f"📼 Replayed {calls:,} tool call(s) in {elapsed:.2f}s ({rate * 60:,.0f}/min, {workers} workers)")
+    if summary['malformed']:
+        print(f"   ⚠️  Skipped {summary['malformed']:,} malformed record(s)")
+    print()
+
+    for label in ('current', 'candidate'):
+        counts = summary[label]
+        print(f"   {label:<9}: " + ', '.join(f"{counts[decision]:,} {decision}" for decision in ('allow', 'deny', 'ask')))
+
+    changed = sum(summary['transitions'].values())
+    share = changed / calls if calls else 0.0
+    print()
+    print(f"🔀 Changed decisions: {changed:,} ({share:.1%})")
+    for transition, count in summary['transitions'].items():
+        before, after = transition.split('->')
+        print(f"   {before} → {after}: {count:,}")
+
+    if summary['rules']:
+        print()
+        print("📋 Rules behind the changes:")
+        for entry in summary['rules'][:rules]:
+            print(f"   {entry['calls']:>10,}  {entry['rule']} ({entry['source']})")
+
+    if summary['examples']:
+        print()
+        print("🔎 Examples:")
+        for example in summary['examples']:
+            argument = f"({example['argument']})" if example['argument'] else ''
+            print(f"   {example['file']}:{example['line']}  {example['tool']}{argument}: "
+                  f"{example['current']['decision']} → {example['candidate']['decision']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay logged tool calls against candidate permission settings',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s calls.jsonl --profile development
+  %(prog)s logs/*.jsonl --candidate new.json --current .claude/settings.json
+  %(prog)s calls.jsonl --profile ci-cd --workers 8 --json
+        """
+    )
+
+    parser.add_argument('logs', nargs='+', type=Path, metavar='log', help='JSONL tool call logs')
+
+    candidate = parser.add_mutually_exclusive_group(required=True)
+    candidate.add_argument('--profile',
+                           help='Profile from assets/permission_profiles.json, merged into the current rules')
+    candidate.add_argument('--candidate', action='append', type=Path, metavar='FILE',
+                           help='Candidate settings file (can be used multiple times)')
+
+    parser.add_argument(
+        '--current',
+        action='append',
+        type=Path,
+        metavar='FILE',
+        help='Current settings file (default: settings hierarchy of the working directory)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Worker processes (default: CPU count)'
+    )
+
+    parser.add_argument(
+        '--examples',
+        type=int,
+        default=10,
+        help='Changed calls to show (default: 10)'
+    )
+
+    parser.add_argument(
+        '--rules',
+        type=int,
+        default=10,
+        help='Rules behind changes to show (default: 10)'
+    )
+
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Output the summary as JSON'
+    )
+
+    args = parser.parse_args()
+
+    for path in args.logs + (args.candidate or []) + (args.current or []):
+        if not path.is_file():
+            print(f"❌ File not found: {path}", file=sys.stderr)
+            return 1
+
+    current_rules = load_rules(args.current or settings_sources(Path.cwd()))
+
+    if args.profile:
+        manager = PermissionManager()
+        profile_rules = manager.load_profile(args.profile)
+        if profile_rules == ([], []):
+            return 1
+
+        # Applying a profile adds to the current rules, it does not replace them
+        merged = manager.merge_settings(
+            {'permissions': {'allowedTools': list(current_rules[0]), 'deny': list(current_rules[1])}},
+            *profile_rules
+        )
+        candidate_rules = (merged['permissions']['allowedTools'], merged['permissions']['deny'])
+    else:
+        candidate_rules = load_rules(args.candidate)
+
+    workers = max(1, args.workers)
+    start = time.perf_counter()
+    summary = simulate(args.logs, current_rules, candidate_rules, workers, max(0, args.examples))
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        summary['elapsed_s'] = round(elapsed, 3)
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary, elapsed, workers, args.rules)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
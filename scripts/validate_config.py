@@ -7,13 +7,136 @@ Validates permission rules for syntax errors, conflicts, and security issues.
 Usage:
     validate_config.py <settings-file>
     validate_config.py --check-conflicts ~/.claude/settings.json
+    validate_config.py --format sarif --output audit.sarif ~/src 'repos/*/.claude/settings*.json'
 """
 
+import os
+import re
 import json
 import sys
+import glob
+import time
+import hashlib
 import argparse
 from pathlib import Path
-from typing import List, Dict, Tuple, Set
+from typing import Iterator, List, Dict, Tuple, Set, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache_paths import cache_directory
+from rule_patterns import (
+    AhoCorasick, RuleIndex, compile_pattern, parse_rule, patterns_overlap, pattern_covers, rule_covers
+)
+
+
+class ValidationCache:
+    """
+    On-disk cache of validation results keyed by settings file content.
+
+    Keys combine the file's SHA-256 with a fingerprint of the validator
+    code and its reference data, so changing either invalidates every
+    entry; unchanged files get their previous results without re-analysis.
+    The file lives in the shared cache directory (cache_paths.py), not in
+    ~/.claude.
+    """
+
+    PATH = cache_directory() / 'validate.json'
+    VERSION = 1
+
+    # Least recently used entries beyond this are dropped on save
+    MAX_ENTRIES = 5000
+
+    FINGERPRINT_FILES = (
+        Path(__file__),
+        Path(__file__).parent / 'rule_patterns.py',
+        Path(__file__).parent.parent / 'references' / 'security_patterns.json',
+    )
+
+    _fingerprint: Optional[str] = None
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize validation cache.
+
+        Args:
+            path: Cache file location (default: ~/.cache/claude-permissions/validate.json)
+        """
+        self.path = path or self.PATH
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+
+    @classmethod
+    def fingerprint(cls) -> str:
+        """Hash of the validator code and reference data, computed once per process."""
+        if cls._fingerprint is None:
+            digest = hashlib.sha256(str(cls.VERSION).encode())
+            for path in cls.FINGERPRINT_FILES:
+                try:
+                    digest.update(path.read_bytes())
+                except OSError:
+                    digest.update(b'missing')
+            cls._fingerprint = digest.hexdigest()
+        return cls._fingerprint
+
+    def _key(self, content_digest: str) -> str:
+        return hashlib.sha256(f'{self.fingerprint()}:{content_digest}'.encode()).hexdigest()
+
+    def load(self):
+        """Load entries from disk, ignoring a missing or unreadable cache."""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') == self.VERSION:
+            self.entries = data.get('entries', {})
+
+    def get(self, content_digest: str) -> Optional[Dict]:
+        """
+        Return cached results for file content, or None.
+
+        Args:
+            content_digest: SHA-256 hex digest of the settings file
+        """
+        entry = self.entries.get(self._key(content_digest))
+        if entry is not None:
+            entry['used'] = int(time.time())
+        return entry
+
+    def put(self, content_digest: str, result: Dict):
+        """
+        Remember validation results for file content.
+
+        Args:
+            content_digest: SHA-256 hex digest of the settings file
+            result: 'valid', 'errors', 'warnings' and 'info' of the validation
+        """
+        self.entries[self._key(content_digest)] = {**result, 'used': int(time.time())}
+        self.dirty = True
+
+    def save(self):
+        """Write the cache if new results were added."""
+        if not self.dirty:
+            return
+
+        entries = self.entries
+        if len(entries) > self.MAX_ENTRIES:
+            recent = sorted(entries, key=lambda key: entries[key]['used'], reverse=True)
+            entries = {key: entries[key] for key in recent[:self.MAX_ENTRIES]}
+
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.VERSION, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            # Unwritable home directory: validation still works, just uncached
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
 
 
 class PermissionValidator:
@@ -34,7 +157,43 @@ class PermissionValidator:
         '| bash', '| sh', '--force', 'DELETE', 'DROP'
     ]
 
-    def __init__(self):
+    RECOMMENDED_DENIES = {
+        'Read(.env*)': 'Environment files',
+        'Read(*.key)': 'Private key files',
+        'Read(*.pem)': 'Certificate files',
+        'Bash(rm *)': 'Dangerous rm command',
+        'Bash(sudo *)': 'Sudo privilege escalation',
+    }
+
+    SECURITY_PATTERNS_PATH = Path(__file__).parent.parent / 'references' / 'security_patterns.json'
+
+    # Shortest literal worth scanning for when a reference pattern is
+    # reduced to its longest wildcard-free fragment
+    MIN_FRAGMENT_LENGTH = 3
+
+    # Scanners shared by all validators, built on first use
+    _security_scanner = None
+    _coverage_scanner = None
+
+    def __init__(self, cache: Optional[ValidationCache] = None):
+        """
+        Initialize validator.
+
+        Args:
+            cache: Loaded ValidationCache consulted by validate_settings_file
+        """
+        self.cache = cache
+        self.errors = []
+        self.warnings = []
+        self.info = []
+
+        # Content hash of the last file validated, and whether its results
+        # came from the cache
+        self.last_digest: Optional[str] = None
+        self.last_cached = False
+
+    def reset(self):
+        """Clear collected results so the validator can check another file."""
         self.errors = []
         self.warnings = []
         self.info = []
@@ -94,34 +253,108 @@ class PermissionValidator:
             self.errors.append(f"Parse error in '{rule}': {e}")
             return False
 
+    @classmethod
+    def load_security_patterns(cls) -> List[Tuple[str, str]]:
+        """
+        Load the categorized deny rules from references/security_patterns.json.
+
+        Returns:
+            List of (category, rule) tuples; empty if the file is missing
+        """
+        try:
+            with open(cls.SECURITY_PATTERNS_PATH, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+
+        patterns = []
+        for category, content in data.items():
+            if category.startswith('_') or not isinstance(content, dict):
+                continue
+            for rule in content.get('patterns', []):
+                patterns.append((category, rule))
+        return patterns
+
+    @classmethod
+    def security_scanner(cls) -> Tuple[AhoCorasick, List[Tuple]]:
+        """
+        Multi-pattern scanner over all security keywords, built once.
+
+        Needles are the lowercased SENSITIVE_PATTERNS and DANGEROUS_COMMANDS,
+        plus the longest literal fragment of every reference pattern.
+
+        Returns:
+            Tuple of (scanner, needle_info); needle_info[i] describes needle i
+            as (rank, order, kind, payload), rank and order giving report order
+        """
+        if cls._security_scanner is None:
+            needles = []
+            info = []
+
+            for order, pattern in enumerate(cls.SENSITIVE_PATTERNS):
+                needles.append(pattern.lower())
+                info.append((0, order, 'sensitive', pattern))
+
+            for order, cmd in enumerate(cls.DANGEROUS_COMMANDS):
+                needles.append(cmd.lower())
+                info.append((1, order, 'dangerous', cmd))
+
+            for order, (category, rule) in enumerate(cls.load_security_patterns()):
+                tool, pattern = parse_rule(rule)
+                fragment = max(re.split(r'[*?\[\]]', pattern), key=len)
+                if len(fragment) >= cls.MIN_FRAGMENT_LENGTH:
+                    needles.append(fragment.lower())
+                    info.append((2, order, 'reference', (category, rule, tool, pattern)))
+
+            cls._security_scanner = (AhoCorasick(needles), info)
+
+        return cls._security_scanner
+
     def check_security_issues(self, rule: str, is_deny: bool = False):
         """
         Check for potential security issues in a permission rule.
 
+        The rule is scanned once for every known security keyword; hits are
+        reported in the order of the keyword lists.
+
         Args:
             rule: Permission rule string
             is_deny: Whether this is a deny rule
         """
         rule_lower = rule.lower()
+        scanner, info = self.security_scanner()
+        hits = sorted(info[position] for position in scanner.find_all(rule_lower))
+        if not hits:
+            return
+
+        is_bash = 'Bash(' in rule or 'bash(' in rule_lower
+
+        for _, _, kind, payload in hits:
+
+            # Check for sensitive file patterns in allow rules
+            if kind == 'sensitive' and not is_deny:
+                self.warnings.append(
+                    f"Potentially sensitive pattern in allow rule: '{rule}' (contains '{payload}')"
+                )
 
-        # Check for sensitive file patterns in allow rules
-        if not is_deny:
-            for pattern in self.SENSITIVE_PATTERNS:
-                if pattern in rule_lower:
+            # Check for dangerous commands
+            elif kind == 'dangerous' and is_bash:
+                if is_deny:
+                    self.info.append(f"✓ Good practice: Denying dangerous operation: '{rule}'")
+                else:
                     self.warnings.append(
-                        f"Potentially sensitive pattern in allow rule: '{rule}' (contains '{pattern}')"
+                        f"⚠️  Dangerous command pattern in allow rule: '{rule}' (contains '{payload}')"
                     )
 
-        # Check for dangerous commands
-        if 'Bash(' in rule or 'bash(' in rule_lower:
-            for cmd in self.DANGEROUS_COMMANDS:
-                if cmd.lower() in rule_lower:
-                    if is_deny:
-                        self.info.append(f"✓ Good practice: Denying dangerous operation: '{rule}'")
-                    else:
-                        self.warnings.append(
-                            f"⚠️  Dangerous command pattern in allow rule: '{rule}' (contains '{cmd}')"
-                        )
+            # Check allow rules against the reference deny patterns; the
+            # keyword hit is confirmed on the compiled patterns
+            elif kind == 'reference' and not is_deny:
+                category, reference, tool, pattern = payload
+                allow_tool, allow_pattern = parse_rule(rule)
+                if allow_tool == tool and allow_pattern and patterns_overlap(tool, allow_pattern, pattern) is not None:
+                    self.warnings.append(
+                        f"Allow rule '{rule}' overlaps {category.replace('_', ' ')} rule '{reference}'"
+                    )
 
     def check_conflicts(self, allow_rules: List[str], deny_rules: List[str]) -> List[str]:
         """
@@ -136,69 +369,153 @@ class PermissionValidator:
         """
         conflicts = []
 
-        # Convert rules to comparable format
-        def normalize_rule(rule: str) -> Tuple[str, str]:
-            """Return (tool, pattern) tuple."""
-            if '(' not in rule:
-                return (rule, '')
-            tool, pattern = rule.split('(', 1)
-            return (tool, pattern.rstrip(')'))
-
-        # Check each allow rule against deny rules
-        for allow in allow_rules:
-            allow_tool, allow_pattern = normalize_rule(allow)
-
-            for deny in deny_rules:
-                deny_tool, deny_pattern = normalize_rule(deny)
-
-                # Same tool
-                if allow_tool == deny_tool:
-                    # Exact match
-                    if allow_pattern == deny_pattern:
-                        conflicts.append(
-                            f"Exact conflict: '{allow}' is both allowed and denied"
-                        )
-                    # Empty pattern conflicts (allow/deny all)
-                    elif not allow_pattern or not deny_pattern:
-                        conflicts.append(
-                            f"Broad conflict: '{allow}' vs '{deny}'"
-                        )
-                    # Pattern overlap (basic check)
-                    elif allow_pattern and deny_pattern:
-                        # Check for obvious overlaps
-                        if allow_pattern in deny_pattern or deny_pattern in allow_pattern:
-                            self.warnings.append(
-                                f"Potential overlap: '{allow}' and '{deny}' may conflict"
-                            )
+        # Parse each list once; rules are referred to by list position
+        allow_index = RuleIndex(allow_rules)
+        deny_index = RuleIndex(deny_rules)
+
+        for allow_pos, allow in enumerate(allow_rules):
+            allow_tool, allow_pattern = allow_index.parsed[allow_pos]
+            bucket = deny_index.bucket(allow_tool)
+            if bucket is None:
+                continue
+
+            # Empty pattern conflicts (allow/deny all)
+            if not allow_pattern:
+                for deny_pos in bucket.positions:
+                    deny = deny_rules[deny_pos]
+                    if not deny_index.parsed[deny_pos][1]:
+                        conflicts.append(f"Exact conflict: '{allow}' is both allowed and denied")
+                    else:
+                        conflicts.append(f"Broad conflict: '{allow}' vs '{deny}'")
+                continue
+
+            exact = bucket.exact.get(allow_pattern, [])
+            for deny_pos in sorted(exact + bucket.broad):
+                if deny_index.parsed[deny_pos][1]:
+                    conflicts.append(f"Exact conflict: '{allow}' is both allowed and denied")
+                else:
+                    conflicts.append(f"Broad conflict: '{allow}' vs '{deny_rules[deny_pos]}'")
+
+            # Pattern overlap, decided on the compiled patterns
+            allow_glob = compile_pattern(allow_tool, allow_pattern)
+            for deny_pos in sorted(set(bucket.overlap_candidates(allow_glob)).difference(exact)):
+                deny = deny_rules[deny_pos]
+                deny_pattern = deny_index.parsed[deny_pos][1]
+
+                example = patterns_overlap(allow_tool, allow_pattern, deny_pattern)
+                if example is None:
+                    continue
+
+                if pattern_covers(allow_tool, deny_pattern, allow_pattern):
+                    self.warnings.append(
+                        f"Allow rule '{allow}' has no effect: everything it matches is denied by '{deny}'"
+                    )
+                else:
+                    self.warnings.append(
+                        f"Potential overlap: '{allow}' and '{deny}' both match '{example}'"
+                    )
 
         return conflicts
 
-    def check_deny_coverage(self, deny_rules: List[str]):
+    @staticmethod
+    def _redundant_rules(index: RuleIndex) -> Dict[int, int]:
         """
-        Check if important security deny rules are present.
+        Rules of a list that a broader rule of the same list already covers.
+
+        A rule is redundant if another rule covers it without being
+        covered in turn, or covers it as an equivalent rule listed
+        earlier. Removing every redundant rule keeps the decisions the
+        same, since each is covered by a rule that stays.
+
+        Returns:
+            Mapping of redundant rule position -> position of a covering
+            rule that is not itself redundant
+        """
+        covering = {}
+        for position, (tool, pattern) in enumerate(index.parsed):
+            covering[position] = [other for other in index.covering(tool, pattern) if other != position]
+
+        redundant = {}
+        for position, others in covering.items():
+            tool, pattern = index.parsed[position]
+            for other in others:
+                if other < position or not rule_covers(tool, pattern, index.parsed[other][1]):
+                    redundant[position] = other
+                    break
+
+        # Point at a rule that stays (one exists: coverage is transitive)
+        for position in redundant:
+            redundant[position] = next(
+                (other for other in covering[position] if other not in redundant), redundant[position]
+            )
+        return redundant
+
+    def check_redundancy(self, allow_rules: List[str], deny_rules: List[str]):
+        """
+        Find rules that can be removed without changing any decision.
+
+        Reports rules covered by a broader rule of the same list, and
+        counts allow rules fully shadowed by deny rules (reported as
+        conflicts by check_conflicts).
 
         Args:
+            allow_rules: List of allow rules
             deny_rules: List of deny rules
         """
-        recommended_denies = {
-            'Read(.env*)': 'Environment files',
-            'Read(*.key)': 'Private key files',
-            'Read(*.pem)': 'Certificate files',
-            'Bash(rm *)': 'Dangerous rm command',
-            'Bash(sudo *)': 'Sudo privilege escalation',
+        allow_index = RuleIndex(allow_rules)
+        deny_index = RuleIndex(deny_rules)
+
+        removable = {}
+        for label, rules, index in (('Allow', allow_rules, allow_index), ('Deny', deny_rules, deny_index)):
+            redundant = self._redundant_rules(index)
+            removable[label] = set(redundant)
+            for position, cover in sorted(redundant.items()):
+                if rules[cover] == rules[position]:
+                    self.warnings.append(f"{label} rule '{rules[position]}' is listed more than once")
+                else:
+                    self.warnings.append(
+                        f"{label} rule '{rules[position]}' is redundant: already covered by '{rules[cover]}'"
+                    )
+
+        shadowed = {
+            position for position, (tool, pattern) in enumerate(allow_index.parsed)
+            if deny_index.covering(tool, pattern)
         }
 
-        deny_str = ' '.join(deny_rules)
+        total = len(allow_rules) + len(deny_rules)
+        count = len(removable['Allow'] | shadowed) + len(removable['Deny'])
+        if count:
+            self.info.append(
+                f"Rule set can shrink by {count} of {total} rule(s) ({count / total:.0%}): "
+                f"{len(removable['Allow'])} redundant allow, {len(removable['Deny'])} redundant deny, "
+                f"{len(shadowed)} allow shadowed by deny"
+            )
+
+    @classmethod
+    def coverage_scanner(cls) -> AhoCorasick:
+        """Scanner over the patterns of RECOMMENDED_DENIES, built once."""
+        if cls._coverage_scanner is None:
+            cls._coverage_scanner = AhoCorasick(
+                [parse_rule(pattern)[1] for pattern in cls.RECOMMENDED_DENIES]
+            )
+        return cls._coverage_scanner
 
-        for pattern, description in recommended_denies.items():
-            # Simple substring check
-            found = False
-            for deny in deny_rules:
-                if pattern.split('(')[1].rstrip(')') in deny:
-                    found = True
-                    break
+    def check_deny_coverage(self, deny_rules: List[str]):
+        """
+        Check if important security deny rules are present.
+
+        Args:
+            deny_rules: List of deny rules
+        """
+        scanner = self.coverage_scanner()
+
+        # One pass per deny rule finds every recommended pattern it mentions
+        found = set()
+        for deny in deny_rules:
+            found |= scanner.find_all(deny)
 
-            if not found:
+        for position, (pattern, description) in enumerate(self.RECOMMENDED_DENIES.items()):
+            if position not in found:
                 self.info.append(
                     f"💡 Consider adding deny rule for {description}: {pattern}"
                 )
@@ -207,21 +524,66 @@ class PermissionValidator:
         """
         Validate entire settings file.
 
+        Results for content validated before are taken from the cache,
+        if one was given.
+
         Args:
             file_path: Path to settings file
 
         Returns:
             True if valid, False if errors found
         """
+        self.last_digest = None
+        self.last_cached = False
+
         # Check file exists
         if not file_path.exists():
             self.errors.append(f"File not found: {file_path}")
             return False
 
-        # Read JSON
         try:
-            with open(file_path, 'r') as f:
-                settings = json.load(f)
+            data = file_path.read_bytes()
+        except Exception as e:
+            self.errors.append(f"Error reading file: {e}")
+            return False
+
+        self.last_digest = hashlib.sha256(data).hexdigest()
+
+        if self.cache is not None:
+            cached = self.cache.get(self.last_digest)
+            if cached is not None:
+                self.errors.extend(cached['errors'])
+                self.warnings.extend(cached['warnings'])
+                self.info.extend(cached['info'])
+                self.last_cached = True
+                return cached['valid']
+
+        marks = (len(self.errors), len(self.warnings), len(self.info))
+        valid = self.validate_settings_data(data)
+
+        if self.cache is not None:
+            self.cache.put(self.last_digest, {
+                'valid': valid,
+                'errors': self.errors[marks[0]:],
+                'warnings': self.warnings[marks[1]:],
+                'info': self.info[marks[2]:],
+            })
+
+        return valid
+
+    def validate_settings_data(self, data: bytes) -> bool:
+        """
+        Validate the contents of a settings file.
+
+        Args:
+            data: Raw file contents
+
+        Returns:
+            True if valid, False if errors found
+        """
+        # Parse JSON
+        try:
+            settings = json.loads(data)
         except json.JSONDecodeError as e:
             self.errors.append(f"Invalid JSON: {e}")
             return False
@@ -261,6 +623,10 @@ class PermissionValidator:
                 for conflict in conflicts:
                     self.errors.append(f"Conflict: {conflict}")
 
+        # Check for rules that add nothing
+        if allow_rules or deny_rules:
+            self.check_redundancy(allow_rules, deny_rules)
+
         # Check deny coverage
         if allow_rules:  # Only suggest denies if there are allows
             self.check_deny_coverage(deny_rules)
@@ -301,6 +667,224 @@ class PermissionValidator:
             print(f"❌ Validation failed - {len(self.errors)} error(s), {len(self.warnings)} warning(s)")
 
 
+# Directories never searched for settings files
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', 'venv', '.venv', 'dist', 'build'}
+
+# Per-process validator of batch workers, set up once by _init_batch_worker
+_batch_validator: Optional[PermissionValidator] = None
+
+
+def find_settings_files(paths: List[str]) -> List[Path]:
+    """
+    Expand command line paths into settings files.
+
+    Args:
+        paths: Files, directories (searched for .claude/settings*.json)
+            and glob patterns
+
+    Returns:
+        Sorted, de-duplicated list of files
+    """
+    found = set()
+
+    for path in paths:
+        if glob.has_magic(path):
+            found.update(Path(match) for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+            continue
+
+        if not os.path.isdir(path):
+            found.add(Path(path))  # Missing files are reported by validation
+            continue
+
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            if os.path.basename(root) == '.claude':
+                found.update(
+                    Path(root) / name for name in files
+                    if name.startswith('settings') and name.endswith('.json')
+                )
+
+    return sorted(found)
+
+
+def _init_batch_worker(use_cache: bool):
+    """Build the validator and its shared scanners once per worker process."""
+    global _batch_validator
+    cache = None
+    if use_cache:
+        # Workers only read the cache; the parent process writes it
+        cache = ValidationCache()
+        cache.load()
+    _batch_validator = PermissionValidator(cache)
+    PermissionValidator.security_scanner()
+    PermissionValidator.coverage_scanner()
+
+
+def _validate_file(path: Path) -> Dict:
+    """Validate one settings file with the worker's validator."""
+    validator = _batch_validator
+    validator.reset()
+
+    start = time.perf_counter()
+    valid = validator.validate_settings_file(path)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'file': str(path),
+        'valid': valid,
+        'errors': validator.errors,
+        'warnings': validator.warnings,
+        'info': validator.info,
+        'sha256': validator.last_digest,
+        'cached': validator.last_cached,
+        'elapsed_ms': round(elapsed * 1000, 3),
+    }
+
+
+def sarif_report(records: List[Dict], verbose: bool = False) -> Dict:
+    """
+    Build a SARIF 2.1.0 log from batch validation records.
+
+    Errors and warnings become results at the matching level (info
+    messages as notes when verbose); per-file timings are kept as
+    artifact properties.
+    """
+    levels = [('errors', 'error', 'permission-error'), ('warnings', 'warning', 'permission-warning')]
+    if verbose:
+        levels.append(('info', 'note', 'permission-info'))
+
+    results = []
+    artifacts = []
+
+    for index, record in enumerate(records):
+        uri = Path(record['file']).as_posix()
+        artifacts.append({
+            'location': {'uri': uri},
+            'properties': {'valid': record['valid'], 'elapsedMs': record['elapsed_ms']}
+        })
+
+        for key, level, rule_id in levels:
+            for message in record[key]:
+                results.append({
+                    'ruleId': rule_id,
+                    'level': level,
+                    'message': {'text': message},
+                    'locations': [{
+                        'physicalLocation': {'artifactLocation': {'uri': uri, 'index': index}}
+                    }]
+                })
+
+    return {
+        'version': '2.1.0',
+        '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+        'runs': [{
+            'tool': {
+                'driver': {
+                    'name': 'validate_config',
+                    'rules': [
+                        {'id': 'permission-error', 'shortDescription': {'text': 'Invalid permission configuration'}},
+                        {'id': 'permission-warning', 'shortDescription': {'text': 'Risky permission configuration'}},
+                        {'id': 'permission-info', 'shortDescription': {'text': 'Permission configuration note'}},
+                    ]
+                }
+            },
+            'artifacts': artifacts,
+            'results': results,
+        }]
+    }
+
+
+def iter_validate(files: List[Path], workers: int, use_cache: bool = True) -> Iterator[Dict]:
+    """
+    Validate many settings files across a process pool.
+
+    Each worker keeps one validator, so interpreter startup and scanner
+    construction are paid per worker rather than per file.
+
+    Args:
+        files: Settings files to validate
+        workers: Number of worker processes (1 validates in-process)
+        use_cache: Reuse and record results in the ValidationCache
+
+    Yields:
+        One record per file (file, valid, errors, warnings, info, sha256,
+        cached, elapsed_ms), in completion order
+    """
+    if workers == 1:
+        _init_batch_worker(use_cache)
+        cache = _batch_validator.cache
+        for path in files:
+            yield _validate_file(path)
+    else:
+        cache = None
+        if use_cache:
+            cache = ValidationCache()
+            cache.load()
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(use_cache,)
+        ) as executor:
+            futures = [executor.submit(_validate_file, path) for path in files]
+            for future in as_completed(futures):
+                record = future.result()
+                if cache is not None and record['sha256'] and not record['cached']:
+                    cache.put(record['sha256'], {
+                        key: record[key] for key in ('valid', 'errors', 'warnings', 'info')
+                    })
+                yield record
+
+    if cache is not None:
+        cache.save()
+
+
+def run_batch(files: List[Path], workers: int, output, fmt: str,
+              verbose: bool = False, use_cache: bool = True) -> int:
+    """
+    Validate many settings files across a process pool and report on them.
+
+    Args:
+        files: Settings files to validate
+        workers: Number of worker processes (1 validates in-process)
+        output: Text stream receiving the report
+        fmt: 'jsonl' (one record per file, in completion order) or 'sarif'
+        verbose: Include info messages in SARIF output
+        use_cache: Reuse and record results in the ValidationCache
+
+    Returns:
+        Exit code (1 if any file failed validation)
+    """
+    start = time.perf_counter()
+    records = []
+
+    def emit(record: Dict):
+        records.append(record)
+        if fmt == 'jsonl':
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+
+    for record in iter_validate(files, workers, use_cache):
+        emit(record)
+
+    if fmt == 'sarif':
+        records.sort(key=lambda record: record['file'])
+        json.dump(sarif_report(records, verbose), output, indent=2)
+        output.write('\n')
+
+    failed = sum(1 for record in records if not record['valid'])
+    cached = sum(1 for record in records if record['cached'])
+    elapsed = time.perf_counter() - start
+    rate = len(files) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"📊 {len(files)} file(s) in {elapsed:.2f}s "
+        f"({rate:.1f}/s, {workers} workers, {cached} cached, {failed} invalid)",
+        file=sys.stderr
+    )
+
+    return 1 if failed else 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Validate Claude Code permission configuration',
@@ -308,9 +892,10 @@ def main():
     )
 
     parser.add_argument(
-        'file',
-        type=Path,
-        help='Path to settings.json file to validate'
+        'paths',
+        nargs='+',
+        metavar='file',
+        help='Settings file to validate; several files, directories or globs for batch mode'
     )
 
     parser.add_argument(
@@ -325,12 +910,68 @@ def main():
         help='Only check for conflicts between allow and deny rules'
     )
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Re-validate every file instead of reusing ~/.cache/claude-permissions/validate.json'
+    )
+
+    parser.add_argument(
+        '--format',
+        choices=['text', 'jsonl', 'sarif'],
+        default='text',
+        help='Output format (default: text; jsonl/sarif validate in batch mode)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar='N',
+        help='Batch mode: number of worker processes (default: CPU count)'
+    )
+
+    parser.add_argument(
+        '--output',
+        metavar='FILE',
+        help='Batch mode: write the report to FILE instead of stdout'
+    )
+
     args = parser.parse_args()
 
-    validator = PermissionValidator()
+    single = (
+        len(args.paths) == 1
+        and not glob.has_magic(args.paths[0])
+        and not os.path.isdir(args.paths[0])
+    )
+
+    if not single or args.format != 'text':
+        files = find_settings_files(args.paths)
+        if not files:
+            print("❌ No settings files found", file=sys.stderr)
+            return 1
+
+        fmt = 'jsonl' if args.format == 'text' else args.format
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            return run_batch(files, max(1, min(args.workers, len(files))), output, fmt,
+                             args.verbose, not args.no_cache)
+        finally:
+            if args.output:
+                output.close()
+
+    cache = None
+    if not args.no_cache:
+        cache = ValidationCache()
+        cache.load()
+
+    validator = PermissionValidator(cache)
 
     # Validate the file
-    is_valid = validator.validate_settings_file(args.file)
+    is_valid = validator.validate_settings_file(Path(args.paths[0]))
+
+    if cache is not None:
+        cache.save()
 
     # Print results
     validator.print_results(verbose=args.verbose)